@@ -0,0 +1,226 @@
+import contextlib
+import json
+from functools import partial
+import starlette.responses
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.routing import Route
+from werkzeug.http import http_date
+from dgs import app as flask_app
+from models import db, Player, Course, Layout, LayoutHole, Round, Scorecard, HoleScore, PlayerLayoutStats
+import database
+
+
+# Read-only statistics API served over ASGI:
+#
+#   uvicorn asgi:app --port 8000
+#
+# The routes answer like their counterparts in dgs.py and query the same models, but through
+# SQLAlchemy's asyncio engine, so one process keeps serving other clients while a query waits
+# for the database. The database URL, profile and pool come from the Flask configuration.
+
+# Async driver for each backend of the Flask app
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+
+def create_engine(flask_app):
+    with flask_app.app_context():
+        url = db.engine.url  # relative SQLite paths are already resolved to the instance folder
+    engine = create_async_engine(
+        url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()]),
+        **flask_app.config.get('DATABASE_POOLS', {}).get(None, {}),
+    )
+    if url.get_backend_name() == 'sqlite':
+        pragmas = database.profile_pragmas(flask_app.config)
+        if pragmas:
+            event.listen(engine.sync_engine, 'connect', partial(database.apply_pragmas, pragmas))
+    return engine
+
+
+engine = create_engine(flask_app)
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+
+class JSONResponse(starlette.responses.JSONResponse):
+    # Same body as Flask's jsonify: sorted keys and HTTP dates
+    def render(self, content):
+        return json.dumps(content, default=http_date, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+async def find_by_name(session, model, name):
+    return (await session.execute(select(model).filter_by(name=name).limit(1))).scalar()
+
+
+async def find_layout(session, course_name, layout_name):
+    return (
+        await session.execute(
+            select(Layout)
+            .join(Course, Course.id == Layout.course_id)
+            .where(Course.name == course_name, Layout.name == layout_name)
+            .limit(1)
+        )
+    ).scalar()
+
+
+#%%
+# Routes
+
+
+async def hole_scores(request):
+    scorecard_id = request.path_params['scorecard_id']
+    async with Session() as session:
+        if await session.get(Scorecard, scorecard_id) is None:
+            raise HTTPException(404, "Scorecard not found")
+        rows = await session.execute(
+            select(HoleScore.hole_number, HoleScore.strokes, LayoutHole.par, Layout.name, Course.name)
+            .select_from(HoleScore)
+            .join(Scorecard, Scorecard.id == HoleScore.scorecard_id)
+            .join(Layout, Layout.id == Scorecard.layout_id)
+            .join(Course, Course.id == Layout.course_id)
+            .outerjoin(
+                LayoutHole,
+                (LayoutHole.layout_id == Scorecard.layout_id) & (LayoutHole.hole_number == HoleScore.hole_number),
+            )
+            .where(HoleScore.scorecard_id == scorecard_id)
+            .order_by(HoleScore.hole_number)
+        )
+        return JSONResponse(
+            [
+                {
+                    'hole_number': hole_number,
+                    'strokes': strokes,
+                    'par': par,
+                    'layout_name': layout_name,
+                    'course_name': course_name,
+                }
+                for hole_number, strokes, par, layout_name, course_name in rows
+            ]
+        )
+
+
+async def par(request):
+    async with Session() as session:
+        layout = await find_layout(session, request.path_params['course_name'], request.path_params['layout_name'])
+        if layout is None:
+            return JSONResponse({'error': 'Layout not found'}, status_code=404)
+        pars = await session.scalars(
+            select(LayoutHole.par).where(LayoutHole.layout_id == layout.id).order_by(LayoutHole.hole_number)
+        )
+        return JSONResponse({'par': list(pars)})
+
+
+async def scorecard_data(request):
+    player_name = request.path_params['player_name']
+    limit = request.path_params['limit']
+    async with Session() as session:
+        player = await find_by_name(session, Player, player_name)
+        layout = await find_layout(session, request.path_params['course_name'], request.path_params['layout_name'])
+        if player is None or layout is None:
+            raise HTTPException(404, "Player, Course, or Layout not found")
+
+        query = (
+            select(
+                Scorecard.id,
+                Scorecard.player_id,
+                Scorecard.round_id,
+                Scorecard.total_score,
+                Scorecard.score_difference,
+                Scorecard.date,
+            )
+            .where(Scorecard.player_id == player.id, Scorecard.layout_id == layout.id)
+            .order_by(Scorecard.score_difference, Scorecard.id)
+        )
+        if limit.lower() != 'all':
+            query = query.limit(int(limit))
+        scorecards = (await session.execute(query)).all()
+
+        # Fetch the hole scores of every returned scorecard in one query
+        strokes_by_scorecard = {scorecard.id: [] for scorecard in scorecards}
+        if strokes_by_scorecard:
+            rows = await session.execute(
+                select(HoleScore.scorecard_id, HoleScore.strokes)
+                .where(HoleScore.scorecard_id.in_(list(strokes_by_scorecard)))
+                .order_by(HoleScore.scorecard_id, HoleScore.hole_number)
+            )
+            for scorecard_id, strokes in rows:
+                strokes_by_scorecard[scorecard_id].append(strokes)
+
+    return JSONResponse(
+        [
+            {
+                'id': scorecard.id,
+                'date': scorecard.date,
+                'player_id': scorecard.player_id,
+                'round_id': scorecard.round_id,
+                'total_score': scorecard.total_score,
+                'score_difference': scorecard.score_difference,
+                'min_score_difference': scorecard.score_difference,
+                'hole_scores': strokes_by_scorecard[scorecard.id],
+            }
+            for scorecard in scorecards
+        ]
+    )
+
+
+async def layouts_for_course(request):
+    async with Session() as session:
+        course = await find_by_name(session, Course, request.path_params['course_name'])
+        if course is None:
+            raise HTTPException(404, "Course not found")
+        names = await session.scalars(select(Layout.name).where(Layout.course_id == course.id))
+        return JSONResponse(list(names))
+
+
+async def courses_for_player(request):
+    async with Session() as session:
+        player = await find_by_name(session, Player, request.path_params['player_name'])
+        if player is None:
+            raise HTTPException(404, "Player not found")
+        course_ids = (
+            select(Layout.course_id)
+            .join(PlayerLayoutStats, PlayerLayoutStats.layout_id == Layout.id)
+            .where(PlayerLayoutStats.player_id == player.id)
+        )
+        names = await session.scalars(select(Course.name).where(Course.id.in_(course_ids)))
+        return JSONResponse(list(names))
+
+
+async def players_for_course_and_layout(request):
+    async with Session() as session:
+        layout = await find_layout(session, request.path_params['course_name'], request.path_params['layout_name'])
+        if layout is None:
+            raise HTTPException(404, "Course or Layout not found")
+        player_ids = select(PlayerLayoutStats.player_id).where(PlayerLayoutStats.layout_id == layout.id)
+        names = await session.scalars(select(Player.name).where(Player.id.in_(player_ids)))
+        return JSONResponse(list(names))
+
+
+async def courses_for_all_players(request):
+    async with Session() as session:
+        names = await session.scalars(select(Course.name).where(Course.id.in_(select(Round.course_id))))
+        return JSONResponse(list(names))
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    await engine.dispose()
+
+
+app = Starlette(
+    routes=[
+        Route('/hole_scores/{scorecard_id:int}', hole_scores),
+        Route('/par/{course_name}/{layout_name}', par),
+        Route('/scorecard_data/{player_name}/{course_name}/{layout_name}/{limit}', scorecard_data),
+        Route('/layouts_for_course/{course_name}', layouts_for_course),
+        Route('/courses_for_player/{player_name}', courses_for_player),
+        Route('/players_for_course_and_layout/{course_name}/{layout_name}', players_for_course_and_layout),
+        Route('/courses_for_all_players/', courses_for_all_players),
+    ],
+    lifespan=lifespan,
+)
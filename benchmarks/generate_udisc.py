@@ -0,0 +1,113 @@
+import argparse
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+
+# Synthetic UDisc scorecard exports for benchmarks.
+#
+# The files have the columns of a real export: one 'Par' row per round followed by a row per
+# player, Hole1-Hole24 with the holes beyond the layout left empty, dates in the
+# '%Y-%m-%d %H%M' format and the rows sorted newest first. Every player has a skill level and a
+# few home courses, so scores and round counts vary like in real data. Example:
+#
+#   python -m benchmarks.generate_udisc synthetic.csv --players 200 --courses 50 --years 5
+
+MAX_HOLES = 24
+DATE_FORMAT = '%Y-%m-%d %H%M'
+HOLE_COLUMNS = [f'Hole{hole_number}' for hole_number in range(1, MAX_HOLES + 1)]
+COLUMNS = ['PlayerName', 'CourseName', 'LayoutName', 'Päivämäärä', 'Kaikki', '+/-'] + HOLE_COLUMNS
+
+PLACES = [
+    'Oittaa', 'Kivikko', 'Tali', 'Laajalahti', 'Keinukallio', 'Pirkkola', 'Kaisaniemi', 'Myllypuro',
+    'Tapanila', 'Malminkartano', 'Siltamäki', 'Kauklahti', 'Leppävaara', 'Tikkurila', 'Jakomäki',
+]
+# Layout names repeat across courses, like in real exports
+LAYOUT_NAMES = ['Main', 'Pro', 'Short', 'Long', 'Winter', 'Red', 'Blue', 'Yellow']
+FIRST_NAMES = [
+    'Sami', 'Esko', 'Mikko', 'Jari', 'Anna', 'Laura', 'Timo', 'Pekka', 'Heidi', 'Juha', 'Kirsi', 'Ville',
+    'Antti', 'Sanna', 'Teemu', 'Maija', 'Olli', 'Riikka', 'Janne', 'Tiina',
+]
+HOLE_COUNTS = [9, 18, 18, 18, 18, 21, 24]
+
+
+def generate(players=20, courses=10, layouts_per_course=2, years=2, rounds_per_week=10,
+             end_date=datetime(2023, 12, 31), seed=0, incomplete_rate=0.01):
+    rng = np.random.default_rng(seed)
+
+    # Layouts: a hole count and par values, mostly 3s
+    layouts = []
+    for course_number in range(courses):
+        course_name = f"{PLACES[course_number % len(PLACES)]} Frisbeegolf {course_number // len(PLACES) + 1}"
+        for layout_name in rng.choice(LAYOUT_NAMES, size=min(layouts_per_course, len(LAYOUT_NAMES)), replace=False):
+            hole_count = int(rng.choice(HOLE_COUNTS))
+            pars = rng.choice([3, 3, 3, 3, 3, 4, 4, 5], size=hole_count)
+            layouts.append((course_name, str(layout_name), pars))
+
+    # Players: strokes over par per hole, and a preference for a few home layouts
+    names = [f"{FIRST_NAMES[i % len(FIRST_NAMES)]}{'' if i < len(FIRST_NAMES) else i // len(FIRST_NAMES) + 1}"
+             for i in range(players)]
+    # UDisc keeps names as typed, trailing spaces included
+    names = [name + ' ' if rng.random() < 0.05 else name for name in names]
+    skills = rng.uniform(-0.1, 0.9, size=players)
+    preferences = rng.dirichlet(np.full(len(layouts), 0.3), size=players)
+
+    # Rounds start between 8:00 and 21:00 on random days of the period
+    round_count = int(years * 52 * rounds_per_week)
+    start_date = end_date - timedelta(days=int(365 * years))
+    days = rng.integers(0, int(365 * years), size=round_count)
+    minutes = rng.integers(8 * 60, 21 * 60, size=round_count)
+
+    rows = []
+    for day, minute in zip(days, minutes):
+        date = (start_date + timedelta(days=int(day), minutes=int(minute))).strftime(DATE_FORMAT)
+        organizer = rng.integers(players)
+        layout_index = rng.choice(len(layouts), p=preferences[organizer])
+        course_name, layout_name, pars = layouts[layout_index]
+        group_size = min(players, int(rng.integers(1, 6)))
+        group = [organizer] + [
+            player for player in rng.choice(players, size=group_size, replace=False) if player != organizer
+        ][:group_size - 1]
+
+        rows.append(['Par', course_name, layout_name, date, int(pars.sum()), None] + pad(pars))
+        for player in group:
+            noise = rng.normal(skills[player], 0.8, size=len(pars))
+            strokes = np.maximum(1, np.rint(pars + noise)).astype(int).tolist()
+            if rng.random() < incomplete_rate:
+                strokes[int(rng.integers(len(strokes)))] = None
+            total = sum(stroke for stroke in strokes if stroke is not None)
+            rows.append([names[player], course_name, layout_name, date, total, total - int(pars.sum())] + pad(strokes))
+
+    df = pd.DataFrame(rows, columns=COLUMNS)
+    for column in ['Kaikki', '+/-'] + HOLE_COLUMNS:
+        df[column] = df[column].astype('Int64')
+    # Newest rounds first; the stable sort keeps the Par row leading each round
+    return df.sort_values('Päivämäärä', ascending=False, kind='stable')
+
+
+def pad(values):
+    values = [None if value is None else int(value) for value in values]
+    return values + [None] * (MAX_HOLES - len(values))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic UDisc scorecard export')
+    parser.add_argument('output')
+    parser.add_argument('--players', type=int, default=20)
+    parser.add_argument('--courses', type=int, default=10)
+    parser.add_argument('--layouts-per-course', type=int, default=2)
+    parser.add_argument('--years', type=float, default=2)
+    parser.add_argument('--rounds-per-week', type=float, default=10)
+    parser.add_argument('--end-date', type=lambda value: datetime.strptime(value, '%Y-%m-%d'),
+                        default=datetime(2023, 12, 31))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df = generate(args.players, args.courses, args.layouts_per_course, args.years, args.rounds_per_week,
+                  args.end_date, args.seed)
+    df.to_csv(args.output, index=False)
+    print(f"Wrote {len(df)} rows to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import argparse
+import http.client
+import json
+import os
+import shlex
+import subprocess
+import threading
+import time
+from urllib.parse import quote, urlsplit
+from benchmarks.read_latency import REPO_ROOT, summarize
+
+
+# Requests/sec and latency of the read-only API served by the WSGI app (dgs.py) and by the
+# ASGI app (asgi.py), under the same concurrent load. Run from the repository root:
+#
+#   python -m benchmarks.load_test --concurrency 32 --seconds 15
+#
+# Both servers are started on the current database, loaded in turn and stopped again.
+# The ASGI side needs `pip install starlette uvicorn aiosqlite`.
+
+SERVERS = {
+    'wsgi': 'flask --app dgs run --port {port} --with-threads',
+    'asgi': 'uvicorn asgi:app --port {port} --log-level warning',
+}
+
+
+def read_paths():
+    # The dashboard's lookups for the players and layouts with the most rounds
+    from dgs import app
+    from models import db, Player, Layout, Course, Scorecard, PlayerLayoutStats
+
+    with app.app_context():
+        pairs = (
+            db.session.query(Player.name, Layout.id, Layout.name, Course.name)
+            .select_from(PlayerLayoutStats)
+            .join(Player, Player.id == PlayerLayoutStats.player_id)
+            .join(Layout, Layout.id == PlayerLayoutStats.layout_id)
+            .join(Course, Course.id == Layout.course_id)
+            .order_by(PlayerLayoutStats.rounds_played.desc())
+            .limit(10)
+            .all()
+        )
+        scorecard_ids = [scorecard_id for scorecard_id, in db.session.query(Scorecard.id).limit(10)]
+
+    paths = ['/courses_for_all_players/']
+    for player_name, layout_id, layout_name, course_name in pairs:
+        player, course, layout = quote(player_name), quote(course_name), quote(layout_name)
+        paths += [
+            f'/layouts_for_course/{course}',
+            f'/players_for_course_and_layout/{course}/{layout}',
+            f'/courses_for_player/{player}',
+            f'/par/{course}/{layout}',
+            f'/scorecard_data/{player}/{course}/{layout}/25',
+        ]
+    paths += [f'/hole_scores/{scorecard_id}' for scorecard_id in scorecard_ids]
+    return paths
+
+
+def wait_until_up(base_url, timeout=30):
+    parts = urlsplit(base_url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=1)
+            connection.request('GET', '/courses_for_all_players/')
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+def load(base_url, paths, concurrency, seconds):
+    # Each client thread keeps one connection open and sends requests back to back
+    parts = urlsplit(base_url)
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client(offset):
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        local_latencies = []
+        local_errors = 0
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                connection.request('GET', paths[i % len(paths)])
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+            local_latencies.append(time.perf_counter() - start)
+            i += 1
+        connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=client, args=(offset,)) for offset in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the WSGI and ASGI read API under load')
+    parser.add_argument('--servers', nargs='+', default=list(SERVERS), choices=list(SERVERS))
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    paths = read_paths()
+    base_url = f'http://127.0.0.1:{args.port}'
+    # Measure the database access, not the response cache of the WSGI app
+    env = dict(os.environ, FLASK_RESPONSE_CACHE_SIZE='0')
+
+    results = {}
+    for name in args.servers:
+        server = subprocess.Popen(
+            shlex.split(SERVERS[name].format(port=args.port)),
+            cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_up(base_url)
+            load(base_url, paths, args.concurrency, 2)  # warm up connections and caches
+            results[name] = load(base_url, paths, args.concurrency, args.seconds)
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{'server':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    for name, summary in results.items():
+        print(
+            f"{name:<8} {summary['requests_per_second']:>8} {summary['p50_ms']:>8} {summary['p95_ms']:>8} "
+            f"{summary['p99_ms']:>8} {summary['max_ms']:>8} {summary['errors']:>7}"
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+
+# Read latency of the dashboard endpoints while an import writes to the database.
+#
+# For each database profile, a scratch copy of the database is filled from the CSV, then
+# reader threads call the read endpoints for a while with the database idle, and again while
+# another process re-imports the CSV in a loop. Run from the repository root:
+#
+#   python -m benchmarks.read_latency --profiles default performance --seconds 20 --readers 4
+#
+# Each profile runs in a fresh interpreter because the app reads its configuration on import.
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def summarize(latencies, errors, seconds):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / seconds, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+    }
+
+
+def read_urls(app):
+    # A mix of the form's requests for the players and layouts with the most rounds
+    from models import db, Player, Layout, Course, PlayerLayoutStats
+
+    with app.app_context():
+        pairs = (
+            db.session.query(Player.id, Player.name, Layout.id, Layout.name, Course.name)
+            .select_from(PlayerLayoutStats)
+            .join(Player, Player.id == PlayerLayoutStats.player_id)
+            .join(Layout, Layout.id == PlayerLayoutStats.layout_id)
+            .join(Course, Course.id == Layout.course_id)
+            .order_by(PlayerLayoutStats.rounds_played.desc())
+            .limit(10)
+            .all()
+        )
+    urls = ['/bootstrap']
+    for player_id, player_name, layout_id, layout_name, course_name in pairs:
+        urls.append(f'/scorecards/{player_id}/{layout_id}?size=50')
+        urls.append(f'/player_stats/{quote(player_name)}/{quote(course_name)}/{quote(layout_name)}')
+    return urls
+
+
+def read_for(app, urls, seconds, readers):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def reader(offset):
+        client = app.test_client()
+        local_latencies = []
+        local_errors = 0
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = client.get(urls[i % len(urls)])
+            local_latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                local_errors += 1
+            i += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=reader, args=(offset,)) for offset in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], seconds)
+
+
+def write_until(app, filename, stop_event, imports):
+    # Re-import every row of the file over and over; each pass upserts the scorecards in
+    # chunks and rebuilds the statistics tables
+    from models import db
+    from data_loader import load_files
+
+    with app.app_context():
+        # Do not reuse connections inherited from the parent process
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+        while not stop_event.is_set():
+            load_files([filename], workers=1, incremental=False)
+            imports.value += 1
+
+
+def run_profile(filename, seconds, readers):
+    # Runs inside the per-profile interpreter started by main()
+    from dgs import app
+    from models import db, Scorecard
+    from data_loader import load_data
+
+    with app.app_context():
+        db.create_all()
+        if Scorecard.query.first() is None:
+            load_data(filename, bulk=True)
+
+    urls = read_urls(app)
+    idle = read_for(app, urls, seconds, readers)
+
+    # Forked, so the writer shares the app without importing it again
+    context = multiprocessing.get_context('fork')
+    stop_event = context.Event()
+    imports = context.Value('i', 0)
+    writer = context.Process(
+        target=write_until, args=(app, filename, stop_event, imports)
+    )
+    writer.start()
+    time.sleep(1)  # let the first import start writing
+    importing = read_for(app, urls, seconds, readers)
+    stop_event.set()
+    writer.join()
+    importing['imports_completed'] = imports.value
+
+    return {'idle': idle, 'importing': importing}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read latency of the dashboard endpoints during an import')
+    parser.add_argument('--profiles', nargs='+', default=['default', 'performance'])
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--csv', default=os.path.join(REPO_ROOT, 'UDisc Scorecards.csv'))
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        result = run_profile(os.path.abspath(args.csv), args.seconds, args.readers)
+        print('RESULT ' + json.dumps(result))
+        return
+
+    results = {}
+    for profile in args.profiles:
+        directory = tempfile.mkdtemp(prefix=f'dgs-bench-{profile}-')
+        try:
+            env = dict(
+                os.environ,
+                FLASK_DATABASE_PROFILE=profile,
+                FLASK_SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(directory, 'statistics.db')}",
+                FLASK_SQLALCHEMY_BINDS=json.dumps({'users': f"sqlite:///{os.path.join(directory, 'users.db')}"}),
+                FLASK_RESPONSE_CACHE_SIZE='0',  # measure the database, not the response cache
+            )
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.read_latency', '--run', profile,
+                 '--seconds', str(args.seconds), '--readers', str(args.readers), '--csv', args.csv],
+                cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            results[profile] = json.loads(output.rsplit('RESULT ', 1)[1])
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"{'profile':<12} {'phase':<10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    for profile, phases in results.items():
+        for phase, summary in phases.items():
+            print(
+                f"{profile:<12} {phase:<10} {summary['requests_per_second']:>8} {summary['p50_ms']:>8} "
+                f"{summary['p95_ms']:>8} {summary['p99_ms']:>8} {summary['max_ms']:>8} {summary['errors']:>7}"
+            )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
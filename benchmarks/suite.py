@@ -0,0 +1,230 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote
+import pandas as pd
+from benchmarks.generate_udisc import generate
+from benchmarks.read_latency import REPO_ROOT, percentile
+
+
+# Benchmark suite: import and endpoint timings on a synthetic UDisc export, as JSON.
+#
+#   python -m benchmarks.suite --players 50 --courses 20 --years 3 --output results.json
+#
+# The suite works on a scratch database and measures
+#   - load_data in each import mode on an empty database,
+#   - re-importing the same file (nothing new) and an export with a month of new rounds,
+#   - every JSON endpoint through the Flask test client, with the response cache off.
+# Compare the JSON of two runs to spot regressions.
+
+IMPORT_MODES = ['bulk', 'stream', 'row']
+# The row-by-row import takes minutes on larger files, so it only runs when asked for
+DEFAULT_IMPORT_MODES = ['bulk', 'stream']
+
+
+def time_call(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def quietly(verbose):
+    # The importers report progress on stdout, which would mix with the JSON
+    return contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+
+def import_benchmarks(app, filename, modes, verbose):
+    from models import db
+    from data_loader import load_data, layout_cache
+
+    rows = len(pd.read_csv(filename, usecols=['PlayerName']))
+    results = {}
+    with app.app_context():
+        for mode in modes:
+            db.drop_all()
+            db.create_all()
+            layout_cache.invalidate()
+            with quietly(verbose):
+                seconds = time_call(load_data, filename, bulk=mode == 'bulk', stream=mode == 'stream')
+            results[mode] = {'seconds': round(seconds, 3), 'rows_per_second': round(rows / seconds)}
+    return results
+
+
+def reimport_benchmarks(app, filename, extended_filename, verbose):
+    # Runs on the database left by the last full import
+    from data_loader import load_data
+
+    results = {}
+    with app.app_context():
+        for name, path in [('unchanged', filename), ('new_rounds', extended_filename)]:
+            with quietly(verbose):
+                seconds = time_call(load_data, path, stream=True)
+            results[name] = {'seconds': round(seconds, 3)}
+    return results
+
+
+def endpoint_paths(app):
+    # One request of each JSON endpoint for the player/layout pair with the most rounds
+    from models import db, Player, Layout, Course, Scorecard, PlayerLayoutStats
+
+    with app.app_context():
+        player_id, player_name, layout_id, layout_name, course_name = (
+            db.session.query(Player.id, Player.name, Layout.id, Layout.name, Course.name)
+            .select_from(PlayerLayoutStats)
+            .join(Player, Player.id == PlayerLayoutStats.player_id)
+            .join(Layout, Layout.id == PlayerLayoutStats.layout_id)
+            .join(Course, Course.id == Layout.course_id)
+            .filter(Player.name != 'Par')
+            .order_by(PlayerLayoutStats.rounds_played.desc())
+            .first()
+        )
+        scorecard_id = (
+            db.session.query(Scorecard.id)
+            .filter(Scorecard.player_id == player_id, Scorecard.layout_id == layout_id)
+            .limit(1)
+            .scalar()
+        )
+
+    player, course, layout = quote(player_name), quote(course_name), quote(layout_name)
+    return {
+        'bootstrap': '/bootstrap',
+        'courses_for_all_players': '/courses_for_all_players/',
+        'layouts_for_course': f'/layouts_for_course/{course}',
+        'courses_for_player': f'/courses_for_player/{player}',
+        'players_for_course_and_layout': f'/players_for_course_and_layout/{course}/{layout}',
+        'par': f'/par/{course}/{layout}',
+        'player_stats': f'/player_stats/{player}/{course}/{layout}',
+        'hole_scores': f'/hole_scores/{scorecard_id}',
+        'scorecard_data': f'/scorecard_data/{player}/{course}/{layout}/all',
+        'scorecards_page': f'/scorecards/{player_id}/{layout_id}?size=50',
+        'scorecards_ndjson': f'/scorecards/{player_id}/{layout_id}?format=ndjson',
+        'ratings': f'/ratings/{player_id}',
+        'ratings_layout': f'/ratings/{player_id}/{layout_id}',
+        'trends_rolling': f'/trends/{player_id}/{layout_id}/rolling',
+        'trends_monthly': f'/trends/{player_id}/{layout_id}/monthly',
+        'trends_seasonal': f'/trends/{player_id}/{layout_id}/seasonal',
+        'hole_analytics': f'/hole_analytics/{layout_id}',
+        'hole_analytics_player': f'/hole_analytics/{layout_id}/{player_id}',
+        'search': f'/search?q={quote(course_name[:4])}',
+        'analytics_hole_averages': f'/analytics/hole_averages/{player}/{course}/{layout}',
+        'analytics_best_rounds': f'/analytics/best_rounds/{player}/{course}/{layout}/10',
+        'analytics_score_distribution': f'/analytics/score_distribution/{course}/{layout}',
+        'analytics_trend': f'/analytics/trend/{player}/{course}/{layout}',
+    }
+
+
+def endpoint_benchmarks(app, repeat, verbose):
+    client = app.test_client()
+    results = {}
+    for name, path in endpoint_paths(app).items():
+        with quietly(verbose):
+            start = time.perf_counter()
+            response = client.get(path)
+            response.get_data()
+            first = time.perf_counter() - start
+            latencies = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                client.get(path).get_data()
+                latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        results[name] = {
+            'status': response.status_code,
+            'bytes': len(response.get_data()),
+            'first_ms': round(first * 1000, 3),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        }
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time imports and endpoints on a synthetic UDisc export')
+    parser.add_argument('--players', type=int, default=20)
+    parser.add_argument('--courses', type=int, default=10)
+    parser.add_argument('--layouts-per-course', type=int, default=2)
+    parser.add_argument('--years', type=float, default=2)
+    parser.add_argument('--rounds-per-week', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--modes', nargs='+', default=DEFAULT_IMPORT_MODES, choices=IMPORT_MODES)
+    parser.add_argument('--repeat', type=int, default=20, help='Timed requests per endpoint')
+    parser.add_argument('--output', help='Write the results to this file instead of stdout')
+    parser.add_argument('--verbose', action='store_true', help='Show the output of the importers')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='dgs-suite-')
+    try:
+        # The app reads these on import
+        os.environ.update(
+            FLASK_SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(directory, 'statistics.db')}",
+            FLASK_SQLALCHEMY_BINDS=json.dumps({'users': f"sqlite:///{os.path.join(directory, 'users.db')}"}),
+            FLASK_RESPONSE_CACHE_SIZE='0',
+            FLASK_SCORE_STORE_SOURCE='database',
+        )
+        from dgs import app
+
+        # The extended export is a later download of the same history with four more weeks of rounds
+        end_date = datetime(2023, 12, 31)
+        base = generate(args.players, args.courses, args.layouts_per_course, args.years, args.rounds_per_week,
+                        end_date, args.seed)
+        later = generate(args.players, args.courses, args.layouts_per_course, 4 / 52, args.rounds_per_week,
+                         end_date + timedelta(weeks=4), args.seed)
+        filename = os.path.join(directory, 'synthetic.csv')
+        extended_filename = os.path.join(directory, 'synthetic_extended.csv')
+        base.to_csv(filename, index=False)
+        pd.concat([later, base]).to_csv(extended_filename, index=False)
+
+        results = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'database_profile': app.config['DATABASE_PROFILE'],
+            },
+            'dataset': {
+                'players': args.players,
+                'courses': args.courses,
+                'layouts_per_course': args.layouts_per_course,
+                'years': args.years,
+                'rounds_per_week': args.rounds_per_week,
+                'seed': args.seed,
+                'rows': len(base),
+                'new_rows': len(later),
+            },
+            'import': import_benchmarks(app, filename, args.modes, args.verbose),
+            'reimport': reimport_benchmarks(app, filename, extended_filename, args.verbose),
+            'endpoints': endpoint_benchmarks(app, args.repeat, args.verbose),
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,68 +1,794 @@
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from models import db, MetaData, Player, Course, Layout, Round, Scorecard, HoleScore
-from models import get_last_processed_timestamp, update_last_processed_timestamp
-
-
+from sqlalchemy import func, or_, text
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, MetaData, ImportProgress, Player, Course, Layout, LayoutHole, Round, Scorecard, HoleScore
+from models import get_last_processed_timestamp, record_import
+from stats import refresh_statistics
+from ratings import refresh_ratings
+from trends import refresh_trends
+from score_map import score_map
+from import_telemetry import telemetry, describe_rows, REJECTED_SAMPLE_LIMIT
+
+
+
+
+# Column names of the per-hole strokes in a UDisc export
+HOLE_COLUMNS = [f'Hole{hole_number}' for hole_number in range(1, 25)]
+
+# Number of CSV rows written per transaction in bulk mode
+BULK_CHUNK_SIZE = 10000
+
+
+def load_data(filename, bulk=False, stream=False):
+    if stream:
+        stream_load_data(filename)
+    elif bulk and is_postgresql():
+        copy_load_data(filename)
+    elif bulk:
+        bulk_load_data(filename)
+    else:
+        row_load_data(filename)
+
+
+def finish_import(last_processed_timestamp, max_processed_timestamp):
+    # Statistics, ratings and trends are refreshed before the import is recorded, so anything that
+    # watches MetaData never sees the new rounds without their statistics. Without a
+    # last_processed_timestamp, e.g. after `import-files --full`, any scorecard may have changed.
+    if max_processed_timestamp is None:
+        return
+    with telemetry.stage('statistics'):
+        refresh_statistics(since=last_processed_timestamp)
+    with telemetry.stage('ratings'):
+        refresh_ratings(since=last_processed_timestamp)
+    with telemetry.stage('trends'):
+        refresh_trends(since=last_processed_timestamp)
+    with telemetry.stage('score_map'):
+        score_map.rebuild()
+    with telemetry.stage('timestamp_update'):
+        record_import(max_processed_timestamp, last_processed_timestamp)
+
+
+def read_chunks(reader):
+    # Yield the chunks of a chunked CSV reader, timing the parse of each one
+    while True:
+        with telemetry.stage('csv_parse'):
+            chunk = next(reader, None)
+        if chunk is None:
+            return
+        yield chunk
 
 
-def load_data(filename):
+def row_load_data(filename):
+    telemetry.start('row', [filename])
     try:
         meta_data = MetaData.query.first()
         if meta_data is None:
             meta_data = MetaData(last_processed_timestamp=datetime.min)
             db.session.add(meta_data)
 
-        df = pd.read_csv(filename)
+        with telemetry.stage('csv_parse'):
+            df = pd.read_csv(filename)
         print('data loaded')
 
         last_processed_timestamp = get_last_processed_timestamp() or datetime.min
 
         # Filter rows based on timestamp
-        df['Päivämäärä'] = pd.to_datetime(df['Päivämäärä'], format='%Y-%m-%d %H%M')
-        df = df[df['Päivämäärä'].apply(lambda x: x.to_pydatetime() >= last_processed_timestamp)]
+        read_rows = len(df)
+        with telemetry.stage('date_conversion'):
+            df['Päivämäärä'] = pd.to_datetime(df['Päivämäärä'], format='%Y-%m-%d %H%M')
+        with telemetry.stage('timestamp_filter'):
+            df = df[df['Päivämäärä'] >= pd.Timestamp(last_processed_timestamp)]
         total_rows = len(df)
+        telemetry.count('read', read_rows)
+        telemetry.count('skipped_before_last_import', read_rows - total_rows)
 
         # Process the filtered rows
         for i, (_, row) in enumerate(df.iterrows(), 1):
-            process_row(row)
+            with telemetry.stage('row_processing'):
+                process_row(row)
             print(f'\rProcessed {i}/{total_rows} rows ({i/total_rows*100:.2f}%)', end='', flush=True)
         
         print()  # Add a newline to ensure proper termination
+        print(f"Layout cache: {layout_cache.stats()}")
+
+        # Update the last processed timestamp
+        if not df.empty:
+            finish_import(last_processed_timestamp, df['Päivämäärä'].max().to_pydatetime())
+
+        # Print counters
+        print(f"Processed {len(df)} rows")
+
     except Exception as e:
-        print(f"Error loading data: {e}")
+        print("Error loading data:", str(e))
+        telemetry.fail(e)
+        db.session.rollback()
+    finally:
+        telemetry.finish(layout_cache=layout_cache.stats())
 
 
 
 
+
+#%%
+# Bulk import: entities are resolved in memory per chunk and written with executemany upserts
+
+
+def bulk_load_data(filename, chunk_size=BULK_CHUNK_SIZE):
+    start_time = time.perf_counter()
+    telemetry.start('bulk', [filename])
+    try:
+        ensure_meta_data()
+
+        with telemetry.stage('csv_parse'):
+            df = pd.read_csv(filename)
+        print('data loaded')
+
+        last_processed_timestamp = get_last_processed_timestamp() or datetime.min
+        df = prepare_chunk(df, last_processed_timestamp)
+        total_rows = len(df)
+
+        # Hole counts are shared between chunks so a layout keeps the same count for the whole import
+        layout_holes = {}
+        for offset in range(0, total_rows, chunk_size):
+            chunk = df.iloc[offset:offset + chunk_size]
+            process_chunk(chunk, layout_holes)
+            done = offset + len(chunk)
+            print(f'\rProcessed {done}/{total_rows} rows ({done/total_rows*100:.2f}%)', end='', flush=True)
+        print()
+
         # Update the last processed timestamp
         if not df.empty:
-            max_processed_timestamp = df['Päivämäärä'].max().to_pydatetime()
-            update_last_processed_timestamp(max_processed_timestamp)
+            finish_import(last_processed_timestamp, df['Päivämäärä'].max().to_pydatetime())
 
-        # Print counters
-        print(f"Processed {len(df)} rows")
+        elapsed = time.perf_counter() - start_time
+        rate = total_rows / elapsed if elapsed > 0 else 0
+        print(f"Processed {total_rows} rows in {elapsed:.2f}s ({rate:.0f} rows/sec)")
+
+    except Exception as e:
+        print("Error loading data:", str(e))
+        telemetry.fail(e)
+        db.session.rollback()
+    finally:
+        telemetry.finish()
+
+
+#%%
+# Streaming import: the CSV is read in fixed-size chunks and progress is checkpointed per chunk
+
+
+def stream_load_data(filename, chunk_size=BULK_CHUNK_SIZE):
+    start_time = time.perf_counter()
+    telemetry.start('stream', [filename])
+    try:
+        ensure_meta_data()
+        last_processed_timestamp = get_last_processed_timestamp() or datetime.min
+
+        # Resume after the last committed chunk if the same file was interrupted before
+        file_size = os.path.getsize(filename)
+        progress = ImportProgress.query.filter_by(filename=filename).first()
+        if progress is None or progress.file_size != file_size:
+            if progress is not None:
+                db.session.delete(progress)
+                db.session.commit()
+            progress = ImportProgress(filename=filename, file_size=file_size, rows_committed=0)
+            db.session.add(progress)
+            db.session.commit()
+        elif progress.rows_committed:
+            print(f"Resuming {filename} after row {progress.rows_committed}")
+
+        reader = pd.read_csv(
+            filename,
+            chunksize=chunk_size,
+            skiprows=range(1, progress.rows_committed + 1),
+        )
+
+        layout_holes = {}
+        imported_rows = 0
+        for raw_chunk in read_chunks(reader):
+            chunk = prepare_chunk(raw_chunk, last_processed_timestamp)
+
+            # The checkpoint is committed in the same transaction as the chunk itself
+            progress.rows_committed += len(raw_chunk)
+            if not chunk.empty:
+                chunk_max = chunk['Päivämäärä'].max().to_pydatetime()
+                if progress.max_timestamp is None or chunk_max > progress.max_timestamp:
+                    progress.max_timestamp = chunk_max
+            process_chunk(chunk, layout_holes)
+
+            imported_rows += len(chunk)
+            print(f'\rProcessed {progress.rows_committed} rows, imported {imported_rows}', end='', flush=True)
+        print()
+
+        # Update the last processed timestamp once the whole file is in
+        finish_import(last_processed_timestamp, progress.max_timestamp)
+        db.session.delete(progress)
+        db.session.commit()
+
+        elapsed = time.perf_counter() - start_time
+        rate = imported_rows / elapsed if elapsed > 0 else 0
+        print(f"Processed {imported_rows} rows in {elapsed:.2f}s ({rate:.0f} rows/sec)")
+
+    except Exception as e:
+        print("Error loading data:", str(e))
+        telemetry.fail(e)
+        db.session.rollback()
+    finally:
+        telemetry.finish()
+
+
+#%%
+# Multi-file import: exports are parsed in a process pool and written by this process only
+
+
+def parse_file(filename, last_processed_timestamp):
+    # Runs in a worker process, so it must not touch the database. Telemetry recorded here
+    # stays in the worker, so the number of rows read is returned with the rows.
+    raw = pd.read_csv(filename)
+    df = prepare_chunk(raw, last_processed_timestamp)
+    columns = ['PlayerName', 'CourseName', 'LayoutName', 'Päivämäärä', 'Kaikki', '+/-'] + HOLE_COLUMNS
+    return df[columns].astype({column: 'float32' for column in HOLE_COLUMNS}), len(raw)
+
+
+def load_files(filenames, workers=None, incremental=True, chunk_size=BULK_CHUNK_SIZE):
+    # With incremental=False every row is upserted, which matters when the exports of
+    # different members cover different periods
+    start_time = time.perf_counter()
+    telemetry.start('files', filenames)
+    try:
+        ensure_meta_data()
+        last_processed_timestamp = get_last_processed_timestamp() or datetime.min
+        row_filter_timestamp = last_processed_timestamp if incremental else datetime.min
+
+        layout_holes = {}
+        imported_rows = 0
+        max_timestamp = None
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Results come back in file order, so the writer stays deterministic
+            batches = executor.map(parse_file, filenames, [row_filter_timestamp] * len(filenames))
+            for filename in filenames:
+                # Time spent waiting for the parsers
+                with telemetry.stage('csv_parse'):
+                    df, read_rows = next(batches)
+                telemetry.count('read', read_rows)
+                telemetry.count('skipped_before_last_import', read_rows - len(df))
+                for offset in range(0, len(df), chunk_size):
+                    process_chunk(df.iloc[offset:offset + chunk_size], layout_holes)
+                if not df.empty:
+                    file_max = df['Päivämäärä'].max().to_pydatetime()
+                    max_timestamp = file_max if max_timestamp is None else max(max_timestamp, file_max)
+                imported_rows += len(df)
+                print(f"Imported {len(df)} rows from {filename}")
+
+        finish_import(last_processed_timestamp if incremental else None, max_timestamp)
+
+        elapsed = time.perf_counter() - start_time
+        rate = imported_rows / elapsed if elapsed > 0 else 0
+        print(f"Processed {imported_rows} rows from {len(filenames)} files in {elapsed:.2f}s ({rate:.0f} rows/sec)")
 
     except Exception as e:
         print("Error loading data:", str(e))
+        telemetry.fail(e)
         db.session.rollback()
+    finally:
+        telemetry.finish()
+
+
+def ensure_meta_data():
+    if MetaData.query.first() is None:
+        db.session.add(MetaData(last_processed_timestamp=datetime.min))
+        db.session.commit()
 
 
+def prepare_chunk(df, last_processed_timestamp):
+    # Parse the dates and keep the rows at or after the last processed timestamp
+    with telemetry.stage('date_conversion'):
+        dates = pd.to_datetime(df['Päivämäärä'], format='%Y-%m-%d %H%M')
+    with telemetry.stage('timestamp_filter'):
+        kept = df.assign(**{'Päivämäärä': dates})[dates >= pd.Timestamp(last_processed_timestamp)]
+    telemetry.count('read', len(df))
+    telemetry.count('skipped_before_last_import', len(df) - len(kept))
+    return kept.assign(PlayerName=kept['PlayerName'].str.strip())
 
 
+def process_chunk(chunk, layout_holes):
+    # Everything written for one chunk is committed in a single transaction
+    try:
+        if chunk.empty:
+            db.session.commit()
+            return
+        chunk = chunk.copy()
+
+        with telemetry.stage('entity_resolution'):
+            player_ids = resolve_names(Player, chunk['PlayerName'].unique())
+            course_ids = resolve_names(Course, chunk['CourseName'].unique())
+            chunk['player_id'] = chunk['PlayerName'].map(player_ids)
+            chunk['course_id'] = chunk['CourseName'].map(course_ids)
+
+            layout_ids = resolve_layouts(chunk[['course_id', 'LayoutName']].drop_duplicates())
+            chunk['layout_id'] = [
+                layout_ids[key] for key in zip(chunk['course_id'], chunk['LayoutName'])
+            ]
+
+        with telemetry.stage('layout_pars'):
+            update_layout_pars(chunk, layout_holes)
+
+        with telemetry.stage('entity_resolution'):
+            round_ids = resolve_rounds(chunk[['course_id', 'layout_id', 'Päivämäärä']].drop_duplicates())
+            chunk['round_id'] = [
+                round_ids[key]
+                for key in zip(chunk['layout_id'], chunk['Päivämäärä'].dt.to_pydatetime())
+            ]
+
+        chunk = drop_incomplete_rows(chunk, layout_holes)
+        upsert_scorecards(chunk, layout_holes)
+
+        with telemetry.stage('commit'):
+            db.session.commit()
+    except Exception as e:
+        print("Error processing chunk:", str(e))
+        db.session.rollback()
+        raise e
+
+
+def upsert(model, rows, keys, update_columns=()):
+    # INSERT ... ON CONFLICT on the model's natural key. Conflicting rows update the given
+    # columns only when a value actually changed, so re-importing the same rows writes nothing.
+    if not rows:
+        return
+    statement = dialect_insert(model.__table__)
+    if update_columns:
+        table = model.__table__
+        statement = statement.on_conflict_do_update(
+            index_elements=keys,
+            set_={column: statement.excluded[column] for column in update_columns},
+            where=or_(*[table.c[column] != statement.excluded[column] for column in update_columns]),
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=keys)
+    db.session.execute(statement, rows)
+
+
+def is_postgresql():
+    return db.session.get_bind().dialect.name == 'postgresql'
+
+
+def dialect_insert(table):
+    # SQLite and PostgreSQL spell ON CONFLICT the same way, but each dialect has its own insert()
+    if is_postgresql():
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def resolve_names(model, names):
+    # Map each name to its id, inserting the names that are not in the table yet
+    names = [str(name) for name in names]
+    upsert(model, [{'name': name} for name in names], ['name'])
+    return dict(db.session.query(model.name, model.id).filter(model.name.in_(names)))
+
+
+def resolve_layouts(layouts):
+    # Map each (course_id, layout name) pair to a layout id, inserting the new layouts
+    upsert(
+        Layout,
+        [
+            {'course_id': int(course_id), 'name': name}
+            for course_id, name in zip(layouts['course_id'], layouts['LayoutName'])
+        ],
+        ['course_id', 'name'],
+    )
+    return {
+        (course_id, name): layout_id
+        for layout_id, course_id, name in db.session.query(Layout.id, Layout.course_id, Layout.name)
+        .filter(Layout.course_id.in_(layouts['course_id'].unique().tolist()))
+    }
+
+
+def resolve_rounds(rounds):
+    # Map each (layout_id, date) pair to a round id, inserting the new rounds
+    dates = rounds['Päivämäärä'].dt.to_pydatetime()
+    upsert(
+        Round,
+        [
+            {'course_id': int(course_id), 'layout_id': int(layout_id), 'date': date}
+            for course_id, layout_id, date in zip(rounds['course_id'], rounds['layout_id'], dates)
+        ],
+        ['layout_id', 'date'],
+    )
+    return {
+        (layout_id, date): round_id
+        for round_id, layout_id, date in db.session.query(Round.id, Round.layout_id, Round.date)
+        .filter(
+            Round.layout_id.in_(rounds['layout_id'].unique().tolist()),
+            Round.date.between(min(dates), max(dates)),
+        )
+    }
+
+
+def update_layout_pars(chunk, layout_holes):
+    # The last 'Par' row of each layout wins, like it does when rows are processed one by one
+    par_rows = chunk[chunk['PlayerName'] == 'Par'].drop_duplicates('layout_id', keep='last')
+    for layout_id, holes in zip(par_rows['layout_id'], par_rows[HOLE_COLUMNS].to_numpy()):
+        layout_id = int(layout_id)
+        par_values = [int(par) for par in holes if pd.notna(par)]
+        upsert(
+            LayoutHole,
+            [
+                {'layout_id': layout_id, 'hole_number': hole_number, 'par': par}
+                for hole_number, par in enumerate(par_values, start=1)
+            ],
+            ['layout_id', 'hole_number'],
+            ['par'],
+        )
+        db.session.execute(
+            LayoutHole.__table__.delete().where(
+                LayoutHole.layout_id == layout_id, LayoutHole.hole_number > len(par_values)
+            )
+        )
+        layout_cache.invalidate(layout_id)
+
+    # The hole count of a layout comes from its par values, or from the first row seen without them
+    unknown = [layout_id for layout_id in chunk['layout_id'].unique() if layout_id not in layout_holes]
+    if unknown:
+        stored_hole_counts = dict(
+            db.session.query(LayoutHole.layout_id, func.count(LayoutHole.hole_number))
+            .filter(LayoutHole.layout_id.in_([int(i) for i in unknown]))
+            .group_by(LayoutHole.layout_id)
+        )
+        first_rows = chunk.drop_duplicates('layout_id').set_index('layout_id')[HOLE_COLUMNS]
+        for layout_id in unknown:
+            layout_holes[layout_id] = (
+                stored_hole_counts.get(layout_id) or int(first_rows.loc[layout_id].notna().sum())
+            )
+
+
+def drop_incomplete_rows(chunk, layout_holes):
+    # Rows with missing strokes within the layout's holes are skipped
+    hole_counts = chunk['layout_id'].map(layout_holes).to_numpy()
+    within_layout = np.arange(1, len(HOLE_COLUMNS) + 1) <= hole_counts[:, None]
+    missing_holes = chunk[HOLE_COLUMNS].isna().to_numpy() & within_layout
+    missing = missing_holes.any(axis=1)
+    if missing.any():
+        samples = describe_rows(chunk[missing].head(REJECTED_SAMPLE_LIMIT), missing_holes[missing])
+        telemetry.reject('missing_holes', int(missing.sum()), samples)
+    return chunk[~missing]
+
+
+def upsert_scorecards(chunk, layout_holes):
+    # Within a chunk the last row of a (player, round) pair wins, like it does row by row
+    cards = chunk.drop_duplicates(['player_id', 'round_id'], keep='last')
+    telemetry.count('superseded', len(chunk) - len(cards))
+    telemetry.count('imported', len(cards))
+    if cards.empty:
+        return
+    with telemetry.stage('scorecard_upsert'):
+        scorecard_ids = upsert_scorecard_rows(cards)
+    cards = cards.assign(scorecard_id=[
+        scorecard_ids[key] for key in zip(cards['player_id'], cards['round_id'])
+    ])
+    with telemetry.stage('hole_insert'):
+        upsert_hole_scores(cards, layout_holes)
+
+
+def upsert_scorecard_rows(cards):
+    # Returns the scorecard id of each (player_id, round_id) pair
+
+    is_par = (cards['PlayerName'] == 'Par').to_numpy()
+    total_scores = np.where(is_par, 0, cards['Kaikki'].fillna(0).to_numpy())
+    score_differences = cards['+/-'].fillna(0).to_numpy()
+    upsert(
+        Scorecard,
+        [
+            {
+                'player_id': int(player_id),
+                'round_id': int(round_id),
+                'layout_id': int(layout_id),
+                'total_score': int(total_score),
+                'score_difference': int(score_difference),
+                'date': date,
+            }
+            for player_id, round_id, layout_id, total_score, score_difference, date in zip(
+                cards['player_id'], cards['round_id'], cards['layout_id'],
+                total_scores, score_differences, cards['Päivämäärä'].dt.to_pydatetime(),
+            )
+        ],
+        ['player_id', 'round_id'],
+        ['total_score', 'score_difference'],
+    )
+
+    return {
+        (player_id, round_id): scorecard_id
+        for scorecard_id, player_id, round_id in db.session.query(
+            Scorecard.id, Scorecard.player_id, Scorecard.round_id
+        ).filter(Scorecard.round_id.in_(cards['round_id'].unique().tolist()))
+    }
+
+
+def upsert_hole_scores(cards, layout_holes):
+    # One HoleScore row per played hole of the layout
+    hole_scores = cards.melt(
+        id_vars=['scorecard_id', 'layout_id'], value_vars=HOLE_COLUMNS,
+        var_name='hole', value_name='strokes',
+    )
+    hole_scores['hole_number'] = hole_scores['hole'].str[len('Hole'):].astype(int)
+    hole_scores = hole_scores[hole_scores['hole_number'] <= hole_scores['layout_id'].map(layout_holes)]
+    upsert(
+        HoleScore,
+        [
+            {'scorecard_id': int(scorecard_id), 'hole_number': int(hole_number), 'strokes': int(strokes)}
+            for scorecard_id, hole_number, strokes in zip(
+                hole_scores['scorecard_id'], hole_scores['hole_number'], hole_scores['strokes']
+            )
+        ],
+        ['scorecard_id', 'hole_number'],
+        ['strokes'],
+    )
+
+
+#%%
+# PostgreSQL bulk import: the file is copied into a staging table with COPY and merged into the
+# tables with set-based statements, all in one transaction. The merge follows the chunked
+# import: the last 'Par' row of a layout sets its par values, incomplete cards are skipped and
+# the last row of a (player, round) pair wins.
+
+
+STAGING_COLUMNS = ['PlayerName', 'CourseName', 'LayoutName', 'Päivämäärä', 'Kaikki', '+/-'] + HOLE_COLUMNS
+STAGING_HOLES = ', '.join(f'hole{hole_number}' for hole_number in range(1, len(HOLE_COLUMNS) + 1))
+
+CREATE_STAGING_TABLE = f"""
+    CREATE TEMPORARY TABLE staging_row (
+        row_number bigint NOT NULL,
+        player_name text NOT NULL,
+        course_name text NOT NULL,
+        layout_name text NOT NULL,
+        date timestamp NOT NULL,
+        total_score integer,
+        score_difference integer,
+        {', '.join(f'hole{hole_number} integer' for hole_number in range(1, len(HOLE_COLUMNS) + 1))}
+    ) ON COMMIT DROP
+"""
+
+MERGE_STATEMENTS = [
+    "INSERT INTO player (name) SELECT DISTINCT player_name FROM staging_row ON CONFLICT (name) DO NOTHING",
+    "INSERT INTO course (name) SELECT DISTINCT course_name FROM staging_row ON CONFLICT (name) DO NOTHING",
+    """
+    INSERT INTO layout (course_id, name)
+    SELECT DISTINCT course.id, staging_row.layout_name
+    FROM staging_row JOIN course ON course.name = staging_row.course_name
+    ON CONFLICT (course_id, name) DO NOTHING
+    """,
+    # Every row with its ids and its strokes as an array
+    f"""
+    CREATE TEMPORARY TABLE staging_card ON COMMIT DROP AS
+    SELECT staging_row.row_number, staging_row.player_name, player.id AS player_id, course.id AS course_id,
+           layout.id AS layout_id, staging_row.date, staging_row.total_score, staging_row.score_difference,
+           ARRAY[{STAGING_HOLES}] AS holes
+    FROM staging_row
+    JOIN player ON player.name = staging_row.player_name
+    JOIN course ON course.name = staging_row.course_name
+    JOIN layout ON layout.course_id = course.id AND layout.name = staging_row.layout_name
+    """,
+    """
+    CREATE TEMPORARY TABLE staging_par ON COMMIT DROP AS
+    SELECT DISTINCT ON (layout_id) layout_id, array_remove(holes, NULL) AS pars
+    FROM staging_card WHERE player_name = 'Par'
+    ORDER BY layout_id, row_number DESC
+    """,
+    """
+    INSERT INTO layout_hole (layout_id, hole_number, par)
+    SELECT staging_par.layout_id, hole.hole_number, hole.par
+    FROM staging_par CROSS JOIN LATERAL unnest(staging_par.pars) WITH ORDINALITY AS hole(par, hole_number)
+    ON CONFLICT (layout_id, hole_number) DO UPDATE SET par = excluded.par
+    WHERE layout_hole.par <> excluded.par
+    """,
+    """
+    DELETE FROM layout_hole USING staging_par
+    WHERE layout_hole.layout_id = staging_par.layout_id AND layout_hole.hole_number > cardinality(staging_par.pars)
+    """,
+    # The hole count of a layout comes from its par values, or from the first row seen without them
+    """
+    CREATE TEMPORARY TABLE staging_layout ON COMMIT DROP AS
+    SELECT first_row.layout_id, COALESCE(stored.hole_count, first_row.hole_count) AS hole_count
+    FROM (
+        SELECT DISTINCT ON (layout_id) layout_id, cardinality(array_remove(holes, NULL)) AS hole_count
+        FROM staging_card ORDER BY layout_id, row_number
+    ) AS first_row
+    LEFT JOIN (
+        SELECT layout_id, CAST(count(*) AS integer) AS hole_count FROM layout_hole GROUP BY layout_id
+    ) AS stored ON stored.layout_id = first_row.layout_id
+    """,
+    """
+    INSERT INTO round (course_id, layout_id, date)
+    SELECT DISTINCT course_id, layout_id, date FROM staging_card
+    ON CONFLICT (layout_id, date) DO NOTHING
+    """,
+    # Complete cards only, the last row of each (player, round) pair
+    """
+    CREATE TEMPORARY TABLE staging_scorecard ON COMMIT DROP AS
+    SELECT DISTINCT ON (staging_card.player_id, round.id)
+           staging_card.player_id, round.id AS round_id, staging_card.layout_id, staging_card.date,
+           CASE WHEN staging_card.player_name = 'Par' THEN 0 ELSE COALESCE(staging_card.total_score, 0) END
+               AS total_score,
+           COALESCE(staging_card.score_difference, 0) AS score_difference,
+           staging_card.holes[1:staging_layout.hole_count] AS holes
+    FROM staging_card
+    JOIN staging_layout ON staging_layout.layout_id = staging_card.layout_id
+    JOIN round ON round.layout_id = staging_card.layout_id AND round.date = staging_card.date
+    WHERE array_position(staging_card.holes[1:staging_layout.hole_count], NULL) IS NULL
+    ORDER BY staging_card.player_id, round.id, staging_card.row_number DESC
+    """,
+    """
+    INSERT INTO scorecard (player_id, round_id, layout_id, total_score, score_difference, date)
+    SELECT player_id, round_id, layout_id, total_score, score_difference, date FROM staging_scorecard
+    ON CONFLICT (player_id, round_id) DO UPDATE
+    SET total_score = excluded.total_score, score_difference = excluded.score_difference
+    WHERE scorecard.total_score <> excluded.total_score OR scorecard.score_difference <> excluded.score_difference
+    """,
+    """
+    INSERT INTO hole_score (scorecard_id, hole_number, strokes)
+    SELECT scorecard.id, hole.hole_number, hole.strokes
+    FROM staging_scorecard
+    JOIN scorecard ON scorecard.player_id = staging_scorecard.player_id
+                  AND scorecard.round_id = staging_scorecard.round_id
+    CROSS JOIN LATERAL unnest(staging_scorecard.holes) WITH ORDINALITY AS hole(strokes, hole_number)
+    ON CONFLICT (scorecard_id, hole_number) DO UPDATE SET strokes = excluded.strokes
+    WHERE hole_score.strokes <> excluded.strokes
+    """,
+]
+
+
+def copy_load_data(filename, chunk_size=BULK_CHUNK_SIZE):
+    start_time = time.perf_counter()
+    telemetry.start('copy', [filename])
+    try:
+        ensure_meta_data()
+        last_processed_timestamp = get_last_processed_timestamp() or datetime.min
+
+        db.session.execute(text(CREATE_STAGING_TABLE))
+        total_rows = 0
+        max_processed_timestamp = None
+        for chunk in read_chunks(pd.read_csv(filename, chunksize=chunk_size)):
+            chunk = prepare_chunk(chunk, last_processed_timestamp)
+            with telemetry.stage('copy'):
+                copy_to_staging(chunk, total_rows)
+            total_rows += len(chunk)
+            if not chunk.empty:
+                chunk_max = chunk['Päivämäärä'].max().to_pydatetime()
+                max_processed_timestamp = max(max_processed_timestamp or chunk_max, chunk_max)
+        print(f"Copied {total_rows} rows in {time.perf_counter() - start_time:.2f}s")
+
+        with telemetry.stage('merge'):
+            for statement in MERGE_STATEMENTS:
+                db.session.execute(text(statement))
+        record_copy_telemetry()
+        with telemetry.stage('commit'):
+            db.session.commit()
+        layout_cache.invalidate()
+
+        finish_import(last_processed_timestamp, max_processed_timestamp)
+
+        elapsed = time.perf_counter() - start_time
+        rate = total_rows / elapsed if elapsed > 0 else 0
+        print(f"Processed {total_rows} rows in {elapsed:.2f}s ({rate:.0f} rows/sec)")
+
+    except Exception as e:
+        print("Error loading data:", str(e))
+        telemetry.fail(e)
+        db.session.rollback()
+    finally:
+        telemetry.finish()
+
+
+# Rows of the staging table that the merge skipped for missing strokes
+REJECTED_STAGING_ROWS = """
+    SELECT staging_row.player_name, staging_row.course_name, staging_row.layout_name, staging_row.date,
+           staging_card.holes[1:staging_layout.hole_count] AS holes
+    FROM staging_card
+    JOIN staging_layout ON staging_layout.layout_id = staging_card.layout_id
+    JOIN staging_row ON staging_row.row_number = staging_card.row_number
+    WHERE array_position(staging_card.holes[1:staging_layout.hole_count], NULL) IS NOT NULL
+    ORDER BY staging_card.row_number
+"""
+
+
+def record_copy_telemetry():
+    # The merge works on the whole file at once, so its row counts are read back from the staging tables
+    rejected = db.session.execute(text(REJECTED_STAGING_ROWS)).all()
+    if rejected:
+        telemetry.reject('missing_holes', len(rejected), [
+            {
+                'player': player,
+                'course': course,
+                'layout': layout,
+                'date': str(date),
+                'missing_holes': [hole_number for hole_number, strokes in enumerate(holes, 1) if strokes is None],
+            }
+            for player, course, layout, date, holes in rejected[:REJECTED_SAMPLE_LIMIT]
+        ])
+    cards = db.session.execute(text("SELECT count(*) FROM staging_scorecard")).scalar()
+    complete = db.session.execute(text("SELECT count(*) FROM staging_card")).scalar() - len(rejected)
+    telemetry.count('imported', cards)
+    telemetry.count('superseded', complete - cards)
+
+
+def copy_to_staging(chunk, first_row_number):
+    # Rows are numbered in file order so the merge can tell which row came last
+    rows = chunk[STAGING_COLUMNS].copy()
+    for column in ['Kaikki', '+/-'] + HOLE_COLUMNS:
+        rows[column] = rows[column].astype('Int64')  # empty fields are NULL in COPY's csv format
+    rows.insert(0, 'row_number', range(first_row_number, first_row_number + len(rows)))
+    buffer = io.StringIO()
+    rows.to_csv(buffer, index=False, header=False, date_format='%Y-%m-%d %H:%M:%S')
+    buffer.seek(0)
+
+    statement = "COPY staging_row FROM STDIN WITH (FORMAT csv)"
+    cursor = db.session.connection().connection.cursor()
+    try:
+        if hasattr(cursor, 'copy_expert'):  # psycopg2
+            cursor.copy_expert(statement, buffer)
+        else:  # psycopg 3
+            with cursor.copy(statement) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
 
 #%%
+# Row-by-row import
+
+
+# Cache of the parsed par values and hole count of each layout, keyed by layout id
+class LayoutCache:
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, layout_id):
+        entry = self.entries.get(layout_id)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        layout = db.session.get(Layout, layout_id)
+        par_values = layout.get_par_values() if layout else []
+        entry = {'par_values': par_values, 'hole_count': len(par_values)}
+        self.entries[layout_id] = entry
+        return entry
+
+    def invalidate(self, layout_id=None):
+        # Drop one layout, or everything when no id is given
+        if layout_id is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(layout_id, None)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries)}
+
+
+layout_cache = LayoutCache()
 
 
 def get_par_for_hole(layout_id, hole_number):
-    layout = Layout.query.get(layout_id)
-    if layout:
-        par_values = layout.get_par_values()
-        if hole_number <= len(par_values):
-            return par_values[hole_number - 1]
+    par_values = layout_cache.get(layout_id)['par_values']
+    if hole_number <= len(par_values):
+        return par_values[hole_number - 1]
     return None
 
-layout_holes = {}  # Dictionary for storing the number of holes for each layout
+
+def get_hole_count(layout_id, row):
+    # Layouts without par values fall back to the number of holes played on this row
+    hole_count = layout_cache.get(layout_id)['hole_count']
+    if hole_count:
+        return hole_count
+    return len([col for col in HOLE_COLUMNS if pd.notna(row[col])])
 
 # counter for rows processed for debugging purposes
 def process_data(data):
@@ -95,11 +821,13 @@ def process_row(row):
             par_values = [int(row[f'Hole{hole_number}']) for hole_number in range(1, 25) if pd.notna(row[f'Hole{hole_number}'])]
             layout.set_par_values(par_values)
             db.session.commit()
+            layout_cache.invalidate(layout.id)
 
-        total_score = row['Kaikki']
+        total_score = int(row['Kaikki'])
         score_difference = row['+/-']
         if pd.isna(score_difference):
             score_difference = 0
+        score_difference = int(score_difference)
 
         # Create or get the round object
         round_obj, _ = Round.get_or_create(
@@ -108,31 +836,36 @@ def process_row(row):
             date=date_object
         )
 
-        # Create a Scorecard instance
+        # Create the player's Scorecard for the round, or update it if the export changed
         scorecard, created = Scorecard.get_or_create(
             player_id=player.id,
             round_id=round_obj.id,
-            layout_id=layout.id,  
-            total_score=total_score,
-            score_difference=score_difference,
-            date=date_object
+            defaults={
+                'layout_id': layout.id,
+                'total_score': total_score,
+                'score_difference': score_difference,
+                'date': date_object,
+            }
         )
+        if (scorecard.total_score, scorecard.score_difference) != (total_score, score_difference):
+            scorecard.total_score = total_score
+            scorecard.score_difference = score_difference
+            db.session.commit()
 
-        # Get the layout ID
-        layout_id = layout.id
-
-        # If the layout ID is not in the dictionary, add it
-        if layout_id not in layout_holes:
-            layout_holes[layout_id] = len([col for col in row.index if col.startswith('Hole') and pd.notna(row[col])])
+        # Get the number of holes for the layout from the cache
+        hole_count = get_hole_count(layout.id, row)
 
         # Check if the player has missing holes within the layout
-        if pd.isna(row[[f'Hole{hole_number}' for hole_number in range(1, layout_holes[layout_id] + 1)]]).any():
-            # If there are missing holes, remove the scorecard and skip the rest of the loop
-            scorecard.delete_instance()
+        missing_holes = pd.isna(row[HOLE_COLUMNS[:hole_count]]).to_numpy(dtype=bool)
+        if missing_holes.any():
+            telemetry.reject('missing_holes', 1, describe_rows(row.to_frame().T, [missing_holes]))
+            # If there are missing holes, remove the new scorecard and skip the rest of the loop
+            if created:
+                db.session.delete(scorecard)
+                db.session.commit()
             return
 
-        # Use the number of holes for the layout from the dictionary
-        for hole_number in range(1, layout_holes[layout_id] + 1):
+        for hole_number in range(1, hole_count + 1):
             strokes = int(row[f'Hole{hole_number}'])
             # Retrieve par value for the hole
             par = get_par_for_hole(layout.id, hole_number)
@@ -142,8 +875,12 @@ def process_row(row):
             hole_score, _ = HoleScore.get_or_create(
                 scorecard_id=scorecard.id,
                 hole_number=hole_number,
-                strokes=strokes                    
+                defaults={'strokes': strokes}
             )
+            if hole_score.strokes != strokes:
+                hole_score.strokes = strokes
+                db.session.commit()
+        telemetry.count('imported', 1)
 
     except Exception as e:
         print("Error processing row:", str(e))
@@ -0,0 +1,64 @@
+from functools import partial
+from sqlalchemy import event
+from models import db
+
+
+# Connection settings for the SQLite databases.
+#
+# A profile is a set of pragmas run on every new connection. 'default' is SQLite's own
+# configuration: a rollback journal, where an import committing a chunk blocks every reader.
+# The journal mode is stored in the database file, so it is set back explicitly.
+# 'performance' switches to write-ahead logging, so readers keep reading the last committed
+# data while an import writes, and relaxes fsyncs to the end of each checkpoint.
+DATABASE_PROFILES = {
+    'default': {
+        'journal_mode': 'DELETE',
+    },
+    'performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',  # safe with WAL; a power loss can only lose the last commits
+        'cache_size': -65536,  # negative values are KiB, so 64 MiB of page cache per connection
+        'mmap_size': 268435456,  # read up to 256 MiB of the file through memory mapping
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,  # milliseconds a writer waits for another writer
+    },
+}
+
+
+def configure_database(app):
+    # Add the pool settings of each bind to the Flask-SQLAlchemy configuration. Called before
+    # db.init_app, which creates the engines.
+    pools = app.config.get('DATABASE_POOLS', {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **pools.get(None, {}),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+    }
+    binds = {}
+    for key, value in app.config.get('SQLALCHEMY_BINDS', {}).items():
+        options = dict(value) if isinstance(value, dict) else {'url': value}
+        binds[key] = {**pools.get(key, {}), **options}
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def profile_pragmas(config):
+    # The pragmas of DATABASE_PROFILE, overridden by SQLITE_PRAGMAS
+    profile = config.get('DATABASE_PROFILE', 'default')
+    if profile not in DATABASE_PROFILES:
+        raise ValueError(f"Unknown DATABASE_PROFILE {profile!r}, expected one of {sorted(DATABASE_PROFILES)}")
+    return {**DATABASE_PROFILES[profile], **config.get('SQLITE_PRAGMAS', {})}
+
+
+def init_app(app):
+    # Run the profile's pragmas on every SQLite connection
+    pragmas = profile_pragmas(app.config)
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite' and pragmas:
+                event.listen(engine, 'connect', partial(apply_pragmas, pragmas))
+
+
+def apply_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
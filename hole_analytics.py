@@ -0,0 +1,155 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from models import db, Player, LayoutHole, Scorecard, HoleScore, get_import_state, is_incremental_import
+from score_store import DISTRIBUTION_MIN, DISTRIBUTION_MAX
+from stats import complete_card
+
+
+# Hole score rows read per batch when a layout is aggregated
+HOLE_BATCH_SIZE = 100000
+
+
+def layout_hole_scores(layout_id):
+    # Hole scores of the real players' complete cards on a layout
+    return (
+        select(Scorecard.player_id, HoleScore.hole_number, HoleScore.strokes)
+        .select_from(HoleScore)
+        .join(Scorecard, Scorecard.id == HoleScore.scorecard_id)
+        .join(Player, Player.id == Scorecard.player_id)
+        .where(Scorecard.layout_id == layout_id, Player.name != 'Par', complete_card())
+    )
+
+
+# Per-hole difficulty, score distributions and strokes gained of every player on a layout.
+#
+# A layout is aggregated on its first request: its hole scores are read in batches, each batch
+# is reduced with vectorized group-bys to sums and counts, and the partial sums are added up.
+# The result stays cached until an import adds scorecards on the layout, which is noticed by
+# polling MetaData.import_generation like the response cache does.
+class HoleAnalytics:
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self.layouts = {}  # layout_id -> LayoutAnalytics
+        self.lock = threading.Lock()
+        self.data_generation = None
+        self.last_check = 0.0
+
+    def init_app(self, app):
+        self.check_interval = app.config.get('HOLE_ANALYTICS_CHECK_INTERVAL', self.check_interval)
+
+    def get(self, layout_id):
+        self.sync()
+        with self.lock:
+            analytics = self.layouts.get(layout_id)
+        if analytics is None:
+            # Computed outside the lock; two requests racing for a layout both compute the same result
+            analytics = LayoutAnalytics.from_database(layout_id)
+            with self.lock:
+                self.layouts[layout_id] = analytics
+        return analytics
+
+    def sync(self):
+        now = time.monotonic()
+        if now - self.last_check < self.check_interval:
+            return
+        self.last_check = now
+
+        _, generation, since = get_import_state()
+        previous = self.data_generation
+        if generation == previous:
+            return
+        self.data_generation = generation
+        if not is_incremental_import(previous, generation, since):
+            with self.lock:
+                self.layouts.clear()
+            return
+
+        touched = db.session.query(Scorecard.layout_id).filter(Scorecard.date >= since).distinct()
+        with self.lock:
+            for (layout_id,) in touched:
+                self.layouts.pop(layout_id, None)
+
+
+class LayoutAnalytics:
+    def __init__(self, layout_id, holes, strokes_gained):
+        self.layout_id = layout_id
+        self.holes = holes  # one dict per hole, ready for JSON
+        self.strokes_gained = strokes_gained  # player_id -> strokes gained per hole
+
+    @classmethod
+    def from_database(cls, layout_id):
+        start_time = time.perf_counter()
+        pars = dict(
+            db.session.query(LayoutHole.hole_number, LayoutHole.par).filter(LayoutHole.layout_id == layout_id)
+        )
+
+        hole_sums = None
+        offset_counts = None
+        player_sums = None
+        with db.engine.connect() as connection:
+            batches = pd.read_sql(layout_hole_scores(layout_id), connection, chunksize=HOLE_BATCH_SIZE)
+            for batch in batches:
+                if pars:
+                    batch = batch[batch['hole_number'] <= len(pars)]
+                batch = batch.assign(squares=batch['strokes'] ** 2)
+                batch_par = batch['hole_number'].map(pars).fillna(0)
+                batch = batch.assign(offset=(batch['strokes'] - batch_par).clip(DISTRIBUTION_MIN, DISTRIBUTION_MAX))
+
+                hole_sums = add(hole_sums, batch.groupby('hole_number').agg(
+                    rounds=('strokes', 'size'), strokes=('strokes', 'sum'), squares=('squares', 'sum'),
+                ))
+                offset_counts = add(offset_counts, batch.groupby(['hole_number', 'offset']).size())
+                player_sums = add(player_sums, batch.groupby(['player_id', 'hole_number'])['strokes'].agg(
+                    ['size', 'sum']
+                ))
+
+        if hole_sums is None or hole_sums.empty:
+            return cls(layout_id, [], {})
+
+        averages = hole_sums['strokes'] / hole_sums['rounds']
+        deviations = np.sqrt(np.maximum(hole_sums['squares'] / hole_sums['rounds'] - averages ** 2, 0))
+        hole_pars = pd.Series(pars, dtype=float).reindex(hole_sums.index)
+        to_par = averages - hole_pars
+        # Hardest first: the most strokes over par, or the most strokes when par is unknown
+        difficulty = to_par.fillna(averages).rank(ascending=False, method='min').astype(int)
+        distributions = offset_counts.unstack(fill_value=0).reindex(
+            columns=range(DISTRIBUTION_MIN, DISTRIBUTION_MAX + 1), fill_value=0
+        )
+
+        holes = [
+            {
+                'hole_number': int(hole_number),
+                'par': None if pd.isna(hole_pars[hole_number]) else int(hole_pars[hole_number]),
+                'rounds': int(hole_sums.at[hole_number, 'rounds']),
+                'average_strokes': float(averages[hole_number]),
+                'average_to_par': None if pd.isna(to_par[hole_number]) else float(to_par[hole_number]),
+                'stdev': float(deviations[hole_number]),
+                'difficulty_rank': int(difficulty[hole_number]),
+                'distribution': distributions.loc[hole_number].astype(int).tolist(),
+            }
+            for hole_number in hole_sums.index
+        ]
+
+        # Strokes gained on a hole: the field average minus the player's average
+        player_averages = (player_sums['sum'] / player_sums['size']).unstack()
+        gained = averages - player_averages
+        strokes_gained = {
+            int(player_id): [None if pd.isna(value) else float(value) for value in row]
+            for player_id, row in zip(gained.index, gained.to_numpy())
+        }
+
+        print(f"Hole analytics of layout {layout_id} computed in {time.perf_counter() - start_time:.2f}s")
+        return cls(layout_id, holes, strokes_gained)
+
+
+def add(total, partial):
+    # Add the partial sums of a batch to the running totals, aligning on the index
+    if total is None:
+        return partial
+    return total.add(partial, fill_value=0)
+
+
+hole_analytics = HoleAnalytics()
@@ -0,0 +1,131 @@
+import contextlib
+import cProfile
+import json
+import os
+import time
+import traceback
+from datetime import datetime
+from flask import current_app, has_app_context
+
+
+# Rejected rows kept in a report per reason, to show what was wrong without copying the file
+REJECTED_SAMPLE_LIMIT = 20
+
+
+# Telemetry of one import run.
+#
+# The importers wrap their stages in `telemetry.stage(name)` and count rows as they go; at the
+# end of the run the report is written as JSON to IMPORT_REPORT_DIR. With IMPORT_PROFILE set the
+# run is also profiled with cProfile, and the stats are saved next to the report. Outside a run,
+# e.g. in the worker processes of load_files, the calls do nothing.
+class ImportTelemetry:
+    def __init__(self):
+        self.report = None
+        self.last_report = None
+        self.start_time = None
+        self.profiler = None
+
+    def start(self, mode, filenames):
+        self.start_time = time.perf_counter()
+        self.report = {
+            'mode': mode,
+            'files': list(filenames),
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'status': 'running',
+            'error': None,
+            'rows': {'read': 0, 'skipped_before_last_import': 0, 'rejected': 0, 'superseded': 0, 'imported': 0},
+            'rejected': {},
+            'stages': {},
+        }
+        if has_app_context() and current_app.config.get('IMPORT_PROFILE'):
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if self.report is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage = self.report['stages'].setdefault(name, {'seconds': 0.0, 'calls': 0})
+            stage['seconds'] += time.perf_counter() - start
+            stage['calls'] += 1
+
+    def count(self, name, rows):
+        if self.report is not None:
+            self.report['rows'][name] += int(rows)
+
+    def reject(self, reason, rows, samples):
+        # `samples` describes some of the rejected rows, see describe_rows
+        if self.report is None:
+            return
+        rejected = self.report['rejected'].setdefault(reason, {'count': 0, 'samples': []})
+        rejected['count'] += int(rows)
+        rejected['samples'].extend(samples[:REJECTED_SAMPLE_LIMIT - len(rejected['samples'])])
+        self.report['rows']['rejected'] += int(rows)
+
+    def fail(self, exception):
+        if self.report is not None:
+            self.report['status'] = 'failed'
+            self.report['error'] = {
+                'type': type(exception).__name__,
+                'message': str(exception),
+                'traceback': traceback.format_exc(),
+            }
+
+    def finish(self, **extra):
+        report = self.report
+        if report is None:
+            return None
+        self.report = None
+
+        seconds = time.perf_counter() - self.start_time
+        if report['status'] == 'running':
+            report['status'] = 'ok'
+        report['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        report['seconds'] = round(seconds, 3)
+        report['rows_per_second'] = round(report['rows']['read'] / seconds) if seconds > 0 else 0
+        for stage in report['stages'].values():
+            stage['seconds'] = round(stage['seconds'], 4)
+        report.update(extra)
+
+        directory = current_app.config.get('IMPORT_REPORT_DIR') if has_app_context() else None
+        path = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"import-{datetime.now():%Y%m%d-%H%M%S-%f}-{report['mode']}.json")
+        if self.profiler is not None:
+            self.profiler.disable()
+            if path:
+                report['profile'] = path[:-len('.json')] + '.prof'
+                self.profiler.dump_stats(report['profile'])
+            self.profiler = None
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"Import report written to {path}")
+
+        self.last_report = report
+        return report
+
+
+def describe_rows(df, missing):
+    # Rejected rows as report samples; `missing` is a row x hole mask of the missing strokes
+    return [
+        {
+            'player': player,
+            'course': course,
+            'layout': layout,
+            'date': str(date),
+            'missing_holes': [int(hole) + 1 for hole in holes.nonzero()[0]],
+        }
+        for player, course, layout, date, holes in zip(
+            df['PlayerName'], df['CourseName'], df['LayoutName'], df['Päivämäärä'], missing
+        )
+    ]
+
+
+telemetry = ImportTelemetry()
@@ -0,0 +1,106 @@
+import os
+import shutil
+import threading
+import time
+from data_loader import load_data
+from models import ImportProgress
+
+
+# Background import of UDisc exports dropped into a directory.
+#
+# Each new CSV goes through the streaming import, which only keeps rows at or after
+# MetaData.last_processed_timestamp. A fully imported file is moved to `processed/`;
+# a file whose import failed keeps its checkpoint, and is skipped until it is modified or the
+# worker restarts, when the import resumes from the checkpoint.
+
+
+def pending_files(directory, settle_seconds):
+    # CSV files that have not been modified for a while, so they are not still being copied
+    now = time.time()
+    paths = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.lower().endswith('.csv') and os.path.isfile(path) and now - os.path.getmtime(path) >= settle_seconds:
+            paths.append(path)
+    return paths
+
+
+def file_state(path):
+    # A failed file is retried once this changes
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def import_pending(directory, settle_seconds=5, failed=None):
+    # `failed` maps the files whose import failed to their file_state, and is updated in place
+    failed = {} if failed is None else failed
+    processed_dir = os.path.join(directory, 'processed')
+    for path in pending_files(directory, settle_seconds):
+        state = file_state(path)
+        if failed.get(path) == state:
+            continue
+        failed.pop(path, None)
+        print(f"Importing {path}")
+        load_data(path, stream=True)
+        if ImportProgress.query.filter_by(filename=path).first() is None:
+            os.makedirs(processed_dir, exist_ok=True)
+            shutil.move(path, os.path.join(processed_dir, os.path.basename(path)))
+        else:
+            failed[path] = state
+            print(f"Import of {path} did not finish, it will be resumed once the file changes")
+
+
+def watch(app, directory, interval=10, settle_seconds=5, stop_event=None):
+    stop_event = stop_event or threading.Event()
+    failed = {}
+    print(f"Watching {directory} for UDisc exports")
+    while not stop_event.is_set():
+        try:
+            with app.app_context():
+                import_pending(directory, settle_seconds, failed)
+        except Exception as e:
+            print("Error in import worker:", str(e))
+        stop_event.wait(interval)
+
+
+def start_import_worker(app):
+    # Run the watcher in a daemon thread when IMPORT_DROP_DIR is configured
+    directory = app.config.get('IMPORT_DROP_DIR')
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=watch,
+        args=(app, directory, app.config.get('IMPORT_POLL_INTERVAL', 10)),
+        kwargs={'stop_event': stop_event},
+        name='import-worker',
+        daemon=True,
+    )
+    thread.start()
+    return stop_event
+
+
+# Starts the worker with the first request the app serves, so it runs under `python dgs.py`,
+# `flask run` with or without the reloader and WSGI servers alike, but not in CLI commands or
+# in the reloader's file watcher. Each serving process starts its own worker; with several
+# processes, leave IMPORT_DROP_DIR unset and run `flask import-worker` once instead.
+class ImportWorker:
+    def __init__(self):
+        self.app = None
+        self.stop_event = None
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        if app.config.get('IMPORT_DROP_DIR'):
+            self.app = app
+            app.before_request(self.start)
+
+    def start(self):
+        if self.stop_event is None:
+            with self.lock:
+                if self.stop_event is None:
+                    self.stop_event = start_import_worker(self.app)
+
+
+import_worker = ImportWorker()
@@ -0,0 +1,160 @@
+import json
+import logging
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from models import db
+
+
+# Upper bounds, in seconds, of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# Per-request SQL and timing instrumentation, off unless INSTRUMENTATION_ENABLED is set.
+#
+# SQLAlchemy cursor events time every statement run inside a request, and the Flask request
+# hooks add up the database time, the rest of the request (Python time) and the total. Each
+# request gets a Server-Timing header and a JSON log line, and its latency goes into a
+# histogram per route that /metrics exposes in the Prometheus text format.
+# The body of a streamed response is produced after the hooks run and is not included.
+class Instrumentation:
+    def __init__(self):
+        self.enabled = False
+        self.log_statements = False
+        self.logger = None
+        self.lock = threading.Lock()
+        self.routes = {}  # (method, route) -> RouteMetrics
+
+    def init_app(self, app):
+        self.enabled = app.config.get('INSTRUMENTATION_ENABLED', False)
+        self.log_statements = app.config.get('INSTRUMENTATION_LOG_STATEMENTS', False)
+        if not self.enabled:
+            return
+        self.logger = app.logger.getChild('requests')
+        self.logger.setLevel(logging.INFO)
+
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self.after_cursor_execute)
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+
+    #%%
+    # SQLAlchemy events
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+        # Statements outside a request, e.g. from an import, are not recorded
+        if has_request_context() and 'queries' in g:
+            g.queries.append((statement, elapsed))
+
+    #%%
+    # Flask request hooks
+
+    def before_request(self):
+        g.request_start_time = time.perf_counter()
+        g.queries = []
+
+    def after_request(self, response):
+        if 'request_start_time' not in g:
+            return response
+        total = time.perf_counter() - g.request_start_time
+        db_time = sum(elapsed for _, elapsed in g.queries)
+        python_time = max(total - db_time, 0.0)
+        route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={db_time * 1000:.2f};desc="{len(g.queries)} queries", '
+            f'app;dur={python_time * 1000:.2f}, total;dur={total * 1000:.2f}',
+        )
+
+        record = {
+            'method': request.method,
+            'route': route,
+            'path': request.full_path.rstrip('?'),
+            'status': response.status_code,
+            'queries': len(g.queries),
+            'db_ms': round(db_time * 1000, 3),
+            'python_ms': round(python_time * 1000, 3),
+            'total_ms': round(total * 1000, 3),
+        }
+        if self.log_statements:
+            record['statements'] = [
+                {'sql': statement, 'ms': round(elapsed * 1000, 3)} for statement, elapsed in g.queries
+            ]
+        self.logger.info(json.dumps(record))
+
+        with self.lock:
+            metrics = self.routes.setdefault((request.method, route), RouteMetrics())
+            metrics.observe(total, db_time, len(g.queries))
+        return response
+
+    #%%
+    # /metrics
+
+    def render_metrics(self):
+        # Prometheus text exposition format
+        lines = [
+            '# HELP dgs_request_duration_seconds Request latency by route.',
+            '# TYPE dgs_request_duration_seconds histogram',
+        ]
+        with self.lock:
+            routes = sorted(self.routes.items())
+            for (method, route), metrics in routes:
+                labels = f'method="{method}",route="{escape_label(route)}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, metrics.bucket_counts):
+                    cumulative += count
+                    lines.append(f'dgs_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'dgs_request_duration_seconds_bucket{{{labels},le="+Inf"}} {metrics.count}')
+                lines.append(f'dgs_request_duration_seconds_sum{{{labels}}} {metrics.total_seconds:.6f}')
+                lines.append(f'dgs_request_duration_seconds_count{{{labels}}} {metrics.count}')
+
+            lines += [
+                '# HELP dgs_request_db_seconds_total Time spent in SQL statements by route.',
+                '# TYPE dgs_request_db_seconds_total counter',
+            ]
+            for (method, route), metrics in routes:
+                labels = f'method="{method}",route="{escape_label(route)}"'
+                lines.append(f'dgs_request_db_seconds_total{{{labels}}} {metrics.db_seconds:.6f}')
+
+            lines += [
+                '# HELP dgs_request_queries_total SQL statements executed by route.',
+                '# TYPE dgs_request_queries_total counter',
+            ]
+            for (method, route), metrics in routes:
+                labels = f'method="{method}",route="{escape_label(route)}"'
+                lines.append(f'dgs_request_queries_total{{{labels}}} {metrics.queries}')
+        return '\n'.join(lines) + '\n'
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)  # requests per bucket, not cumulative
+        self.count = 0
+        self.total_seconds = 0.0
+        self.db_seconds = 0.0
+        self.queries = 0
+
+    def observe(self, seconds, db_seconds, queries):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+                break
+        self.count += 1
+        self.total_seconds += seconds
+        self.db_seconds += db_seconds
+        self.queries += queries
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+instrumentation = Instrumentation()
@@ -0,0 +1,47 @@
+"""player rating tables
+
+Revision ID: 3a9c5e17d4b8
+Revises: 8d41e6b3c2f7
+Create Date: 2026-10-18 15:05:12.640318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a9c5e17d4b8'
+down_revision = '8d41e6b3c2f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The tables start empty; fill them with `flask --app dgs refresh-stats`
+    op.create_table(
+        'player_rating',
+        sa.Column('player_id', sa.Integer(), nullable=False),
+        sa.Column('rating', sa.Float(), nullable=False),
+        sa.Column('rounds_counted', sa.Integer(), nullable=False),
+        sa.Column('rounds_considered', sa.Integer(), nullable=False),
+        sa.Column('last_played', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['player_id'], ['player.id']),
+        sa.PrimaryKeyConstraint('player_id'),
+    )
+    op.create_table(
+        'player_layout_handicap',
+        sa.Column('player_id', sa.Integer(), nullable=False),
+        sa.Column('layout_id', sa.Integer(), nullable=False),
+        sa.Column('handicap', sa.Float(), nullable=False),
+        sa.Column('rounds_counted', sa.Integer(), nullable=False),
+        sa.Column('rounds_considered', sa.Integer(), nullable=False),
+        sa.Column('last_played', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['layout_id'], ['layout.id']),
+        sa.ForeignKeyConstraint(['player_id'], ['player.id']),
+        sa.PrimaryKeyConstraint('player_id', 'layout_id'),
+    )
+
+
+def downgrade():
+    op.drop_table('player_layout_handicap')
+    op.drop_table('player_rating')
@@ -0,0 +1,61 @@
+"""player/layout statistics tables
+
+Revision ID: 5f0d2c7a9e41
+Revises: bc3ac1ac074e
+Create Date: 2026-10-18 11:02:15.228190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f0d2c7a9e41'
+down_revision = 'bc3ac1ac074e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The tables start empty; fill them with `flask --app dgs refresh-stats`
+    op.create_table(
+        'player_layout_stats',
+        sa.Column('player_id', sa.Integer(), nullable=False),
+        sa.Column('layout_id', sa.Integer(), nullable=False),
+        sa.Column('rounds_played', sa.Integer(), nullable=False),
+        sa.Column('best_total_score', sa.Integer(), nullable=False),
+        sa.Column('best_score_difference', sa.Integer(), nullable=False),
+        sa.Column('average_total_score', sa.Float(), nullable=False),
+        sa.Column('average_score_difference', sa.Float(), nullable=False),
+        sa.Column('last_played', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['layout_id'], ['layout.id']),
+        sa.ForeignKeyConstraint(['player_id'], ['player.id']),
+        sa.PrimaryKeyConstraint('player_id', 'layout_id'),
+    )
+    with op.batch_alter_table('player_layout_stats') as batch_op:
+        batch_op.create_index('ix_player_layout_stats_layout_id', ['layout_id'])
+
+    op.create_table(
+        'player_layout_hole_stats',
+        sa.Column('player_id', sa.Integer(), nullable=False),
+        sa.Column('layout_id', sa.Integer(), nullable=False),
+        sa.Column('hole_number', sa.Integer(), nullable=False),
+        sa.Column('rounds_played', sa.Integer(), nullable=False),
+        sa.Column('average_strokes', sa.Float(), nullable=False),
+        sa.Column('best_strokes', sa.Integer(), nullable=False),
+        sa.Column('eagles', sa.Integer(), nullable=False),
+        sa.Column('birdies', sa.Integer(), nullable=False),
+        sa.Column('pars', sa.Integer(), nullable=False),
+        sa.Column('bogeys', sa.Integer(), nullable=False),
+        sa.Column('double_bogeys', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['layout_id'], ['layout.id']),
+        sa.ForeignKeyConstraint(['player_id'], ['player.id']),
+        sa.PrimaryKeyConstraint('player_id', 'layout_id', 'hole_number'),
+    )
+
+
+def downgrade():
+    op.drop_table('player_layout_hole_stats')
+    with op.batch_alter_table('player_layout_stats') as batch_op:
+        batch_op.drop_index('ix_player_layout_stats_layout_id')
+    op.drop_table('player_layout_stats')
@@ -0,0 +1,26 @@
+"""scorecard history index
+
+Revision ID: 8d41e6b3c2f7
+Revises: 5f0d2c7a9e41
+Create Date: 2026-10-18 14:20:41.503117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41e6b3c2f7'
+down_revision = '5f0d2c7a9e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scorecard', schema=None) as batch_op:
+        batch_op.create_index('ix_scorecard_player_layout_date', ['player_id', 'layout_id', 'date'])
+
+
+def downgrade():
+    with op.batch_alter_table('scorecard', schema=None) as batch_op:
+        batch_op.drop_index('ix_scorecard_player_layout_date')
@@ -0,0 +1,128 @@
+"""layout_hole table, import_progress table and indexes
+
+Revision ID: bc3ac1ac074e
+Revises: 
+Create Date: 2026-10-18 10:12:41.503112
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bc3ac1ac074e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    # db.create_all() may already have created the empty table on an existing database
+    if not sa.inspect(bind).has_table('layout_hole'):
+        op.create_table(
+            'layout_hole',
+            sa.Column('layout_id', sa.Integer(), nullable=False),
+            sa.Column('hole_number', sa.Integer(), nullable=False),
+            sa.Column('par', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['layout_id'], ['layout.id']),
+            sa.PrimaryKeyConstraint('layout_id', 'hole_number'),
+        )
+
+    if not sa.inspect(bind).has_table('import_progress'):
+        op.create_table(
+            'import_progress',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('filename', sa.String(length=255), nullable=False),
+            sa.Column('file_size', sa.Integer(), nullable=False),
+            sa.Column('rows_committed', sa.Integer(), nullable=False),
+            sa.Column('max_timestamp', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('filename'),
+        )
+
+    # Move the JSON par values into one row per hole
+    layout_hole = sa.table(
+        'layout_hole',
+        sa.column('layout_id', sa.Integer),
+        sa.column('hole_number', sa.Integer),
+        sa.column('par', sa.Integer),
+    )
+    layouts = bind.execute(sa.text('SELECT id, par_values FROM layout WHERE par_values IS NOT NULL'))
+    rows = [
+        {'layout_id': layout_id, 'hole_number': hole_number, 'par': par}
+        for layout_id, par_values in layouts
+        for hole_number, par in enumerate(json.loads(par_values), start=1)
+    ]
+    op.execute(layout_hole.delete())
+    if rows:
+        op.bulk_insert(layout_hole, rows)
+
+    with op.batch_alter_table('layout') as batch_op:
+        batch_op.drop_column('par_values')
+        batch_op.create_unique_constraint('uq_layout_course_name', ['course_id', 'name'])
+        batch_op.create_index('ix_layout_name', ['name'])
+
+    with op.batch_alter_table('player') as batch_op:
+        batch_op.create_unique_constraint('uq_player_name', ['name'])
+
+    with op.batch_alter_table('course') as batch_op:
+        batch_op.create_unique_constraint('uq_course_name', ['name'])
+
+    with op.batch_alter_table('round') as batch_op:
+        batch_op.create_unique_constraint('uq_round_layout_date', ['layout_id', 'date'])
+        batch_op.create_index('ix_round_course_id', ['course_id'])
+
+    with op.batch_alter_table('scorecard') as batch_op:
+        batch_op.create_unique_constraint('uq_scorecard_player_round', ['player_id', 'round_id'])
+        batch_op.create_index('ix_scorecard_round_id', ['round_id'])
+        batch_op.create_index(
+            'ix_scorecard_player_layout_score', ['player_id', 'layout_id', 'score_difference']
+        )
+
+    with op.batch_alter_table('hole_score') as batch_op:
+        batch_op.create_unique_constraint('uq_hole_score_scorecard_hole', ['scorecard_id', 'hole_number'])
+
+
+def downgrade():
+    with op.batch_alter_table('hole_score') as batch_op:
+        batch_op.drop_constraint('uq_hole_score_scorecard_hole', type_='unique')
+
+    with op.batch_alter_table('scorecard') as batch_op:
+        batch_op.drop_index('ix_scorecard_player_layout_score')
+        batch_op.drop_index('ix_scorecard_round_id')
+        batch_op.drop_constraint('uq_scorecard_player_round', type_='unique')
+
+    with op.batch_alter_table('round') as batch_op:
+        batch_op.drop_index('ix_round_course_id')
+        batch_op.drop_constraint('uq_round_layout_date', type_='unique')
+
+    with op.batch_alter_table('course') as batch_op:
+        batch_op.drop_constraint('uq_course_name', type_='unique')
+
+    with op.batch_alter_table('player') as batch_op:
+        batch_op.drop_constraint('uq_player_name', type_='unique')
+
+    with op.batch_alter_table('layout') as batch_op:
+        batch_op.drop_index('ix_layout_name')
+        batch_op.drop_constraint('uq_layout_course_name', type_='unique')
+        batch_op.add_column(sa.Column('par_values', sa.String(), nullable=True))
+
+    # Fold the per-hole rows back into JSON strings
+    bind = op.get_bind()
+    par_values = {}
+    for layout_id, par in bind.execute(
+        sa.text('SELECT layout_id, par FROM layout_hole ORDER BY layout_id, hole_number')
+    ):
+        par_values.setdefault(layout_id, []).append(par)
+    for layout_id, values in par_values.items():
+        bind.execute(
+            sa.text('UPDATE layout SET par_values = :par_values WHERE id = :id'),
+            {'par_values': json.dumps(values), 'id': layout_id},
+        )
+
+    op.drop_table('layout_hole')
+    op.drop_table('import_progress')
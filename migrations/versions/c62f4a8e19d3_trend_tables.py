@@ -0,0 +1,53 @@
+"""trend tables
+
+Revision ID: c62f4a8e19d3
+Revises: 3a9c5e17d4b8
+Create Date: 2026-10-18 15:48:37.102954
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c62f4a8e19d3'
+down_revision = '3a9c5e17d4b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The tables start empty; fill them with `flask --app dgs refresh-stats`
+    op.create_table(
+        'player_layout_month',
+        sa.Column('player_id', sa.Integer(), nullable=False),
+        sa.Column('layout_id', sa.Integer(), nullable=False),
+        sa.Column('month', sa.String(length=7), nullable=False),
+        sa.Column('rounds_played', sa.Integer(), nullable=False),
+        sa.Column('total_score_difference', sa.Integer(), nullable=False),
+        sa.Column('best_score_difference', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['layout_id'], ['layout.id']),
+        sa.ForeignKeyConstraint(['player_id'], ['player.id']),
+        sa.PrimaryKeyConstraint('player_id', 'layout_id', 'month'),
+    )
+    op.create_table(
+        'scorecard_trend',
+        sa.Column('scorecard_id', sa.Integer(), nullable=False),
+        sa.Column('player_id', sa.Integer(), nullable=False),
+        sa.Column('layout_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.DateTime(), nullable=False),
+        sa.Column('score_difference', sa.Integer(), nullable=False),
+        sa.Column('moving_average', sa.Float(), nullable=False),
+        sa.Column('best_in_window', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['scorecard_id'], ['scorecard.id']),
+        sa.PrimaryKeyConstraint('scorecard_id'),
+    )
+    with op.batch_alter_table('scorecard_trend') as batch_op:
+        batch_op.create_index('ix_scorecard_trend_player_layout_date', ['player_id', 'layout_id', 'date'])
+
+
+def downgrade():
+    with op.batch_alter_table('scorecard_trend') as batch_op:
+        batch_op.drop_index('ix_scorecard_trend_player_layout_date')
+    op.drop_table('scorecard_trend')
+    op.drop_table('player_layout_month')
@@ -0,0 +1,28 @@
+"""import generation
+
+Revision ID: e47b1d9a2c50
+Revises: c62f4a8e19d3
+Create Date: 2026-10-18 17:05:12.418337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e47b1d9a2c50'
+down_revision = 'c62f4a8e19d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('meta_data') as batch_op:
+        batch_op.add_column(sa.Column('import_generation', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('import_since', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('meta_data') as batch_op:
+        batch_op.drop_column('import_since')
+        batch_op.drop_column('import_generation')
@@ -0,0 +1,37 @@
+"""nullable player/layout summaries
+
+Revision ID: f81c2d4b7a63
+Revises: e47b1d9a2c50
+Create Date: 2026-10-18 19:40:27.905114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f81c2d4b7a63'
+down_revision = 'e47b1d9a2c50'
+branch_labels = None
+depends_on = None
+
+SUMMARY_COLUMNS = [
+    ('best_total_score', sa.Integer()),
+    ('best_score_difference', sa.Integer()),
+    ('average_total_score', sa.Float()),
+    ('average_score_difference', sa.Float()),
+]
+
+
+def upgrade():
+    # Abandoned cards are no longer summarized; run `flask --app dgs refresh-stats` afterwards
+    with op.batch_alter_table('player_layout_stats') as batch_op:
+        for name, type_ in SUMMARY_COLUMNS:
+            batch_op.alter_column(name, existing_type=type_, nullable=True)
+
+
+def downgrade():
+    op.execute('DELETE FROM player_layout_stats WHERE best_total_score IS NULL')
+    with op.batch_alter_table('player_layout_stats') as batch_op:
+        for name, type_ in SUMMARY_COLUMNS:
+            batch_op.alter_column(name, existing_type=type_, nullable=False)
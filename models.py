@@ -5,7 +5,6 @@ from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey
 from datetime import datetime
 from sqlalchemy.ext.declarative import declarative_base
 from werkzeug.security import generate_password_hash, check_password_hash
-import json
 from flask_login import UserMixin
 
 db = SQLAlchemy()
@@ -17,6 +16,10 @@ class MetaData(db.Model):
     last_processed_timestamp = db.Column(
         db.DateTime, nullable=False, server_default=func.now()
     )
+    # Incremented by every import, including the ones that do not advance the timestamp
+    import_generation = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Earliest scorecard date the last import may have changed; NULL when it may have changed anything
+    import_since = db.Column(db.DateTime)
 
 def get_last_processed_timestamp():
     meta_data = MetaData.query.first()
@@ -38,6 +41,40 @@ def update_last_processed_timestamp(timestamp):
     db.session.commit()
 
 
+def get_import_state():
+    # (last_processed_timestamp, import_generation, import_since), or Nones before the first import
+    meta_data = MetaData.query.first()
+    if meta_data:
+        return meta_data.last_processed_timestamp, meta_data.import_generation, meta_data.import_since
+    return None, None, None
+
+
+def record_import(timestamp, since):
+    # Advance the timestamp and the import generation in one commit. Caches that watch the
+    # generation drop what changed from `since` onwards, or everything when `since` is None.
+    meta_data = MetaData.query.first()
+    if timestamp > meta_data.last_processed_timestamp:
+        meta_data.last_processed_timestamp = datetime.strptime(timestamp.strftime("%Y-%m-%d %H%M"), "%Y-%m-%d %H%M")
+    meta_data.import_generation += 1
+    meta_data.import_since = since
+    db.session.commit()
+
+
+def is_incremental_import(previous_generation, generation, since):
+    # True when a cache built at `previous_generation` missed exactly one import, and that import
+    # only changed scorecards dated from `since` onwards
+    return previous_generation is not None and generation == previous_generation + 1 and since is not None
+
+
+# Checkpoint of a streaming import, removed once the file has been fully imported
+class ImportProgress(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False, unique=True)
+    file_size = db.Column(db.Integer, nullable=False)
+    rows_committed = db.Column(db.Integer, nullable=False, default=0)
+    max_timestamp = db.Column(db.DateTime)
+
+
 #%%
 # Define database models
 
@@ -77,35 +114,65 @@ class RowProcessed(Base):
 
 
 class Player(BaseModel):
+    __table_args__ = (
+        db.UniqueConstraint('name', name='uq_player_name'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
 
 class Course(BaseModel):
+    __table_args__ = (
+        db.UniqueConstraint('name', name='uq_course_name'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
 
 class Layout(BaseModel):
+    __table_args__ = (
+        db.UniqueConstraint('course_id', 'name', name='uq_layout_course_name'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(255), nullable=False)
+    name = db.Column(db.String(255), nullable=False, index=True)
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
-    
-    # Add a column for par values as a JSON string
-    par_values = db.Column(db.String)  
 
     # Add a relationship to Course
     course = db.relationship('Course', foreign_keys=[course_id], backref=db.backref('layouts', lazy=True))
-    
+
+    # Par values are stored one row per hole in the LayoutHole table
+    holes = db.relationship(
+        'LayoutHole', order_by='LayoutHole.hole_number', cascade='all, delete-orphan', lazy=True
+    )
+
     def set_par_values(self, par_values):
-        # Convert the list to a JSON string before saving
-        self.par_values = json.dumps(par_values)
+        # Update the existing holes in place so the (layout_id, hole_number) key never clashes
+        existing = {hole.hole_number: hole for hole in self.holes}
+        for hole_number, par in enumerate(par_values, start=1):
+            if hole_number in existing:
+                existing[hole_number].par = par
+            else:
+                self.holes.append(LayoutHole(hole_number=hole_number, par=par))
+        for hole in list(self.holes):
+            if hole.hole_number > len(par_values):
+                self.holes.remove(hole)
 
     def get_par_values(self):
-        # Convert the JSON string back to a list when retrieving
-        return json.loads(self.par_values) if self.par_values else []
+        return [hole.par for hole in self.holes]
+
+class LayoutHole(BaseModel):
+    layout_id = db.Column(db.Integer, db.ForeignKey('layout.id'), primary_key=True)
+    hole_number = db.Column(db.Integer, primary_key=True)
+    par = db.Column(db.Integer, nullable=False)
 
 class Round(BaseModel):
+    __table_args__ = (
+        db.UniqueConstraint('layout_id', 'date', name='uq_round_layout_date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False, index=True)
     layout_id = db.Column(db.Integer, db.ForeignKey('layout.id'), nullable=False)
     date = db.Column(db.DateTime, nullable=False)
 
@@ -115,6 +182,16 @@ class Round(BaseModel):
 
 
 class Scorecard(BaseModel):
+    __table_args__ = (
+        # One card per player per round; also serves the lookups by player
+        db.UniqueConstraint('player_id', 'round_id', name='uq_scorecard_player_round'),
+        db.Index('ix_scorecard_round_id', 'round_id'),
+        # Best rounds of a player on a layout
+        db.Index('ix_scorecard_player_layout_score', 'player_id', 'layout_id', 'score_difference'),
+        # Scorecard history of a player on a layout, newest first
+        db.Index('ix_scorecard_player_layout_date', 'player_id', 'layout_id', 'date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
     round_id = db.Column(db.Integer, db.ForeignKey('round.id'), nullable=False)
@@ -128,11 +205,88 @@ class Scorecard(BaseModel):
 
 
 class HoleScore(BaseModel):
+    __table_args__ = (
+        db.UniqueConstraint('scorecard_id', 'hole_number', name='uq_hole_score_scorecard_hole'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     scorecard_id = db.Column(db.Integer, db.ForeignKey('scorecard.id'), nullable=False)
     hole_number = db.Column(db.Integer, nullable=False)
     strokes = db.Column(db.Integer, nullable=False)
 
+# Materialized statistics, refreshed by stats.refresh_statistics after each import
+class PlayerLayoutStats(BaseModel):
+    __table_args__ = (
+        db.Index('ix_player_layout_stats_layout_id', 'layout_id'),
+    )
+
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), primary_key=True)
+    layout_id = db.Column(db.Integer, db.ForeignKey('layout.id'), primary_key=True)
+    # Complete cards only; the bests and averages are NULL when every card was abandoned
+    rounds_played = db.Column(db.Integer, nullable=False)
+    best_total_score = db.Column(db.Integer)
+    best_score_difference = db.Column(db.Integer)
+    average_total_score = db.Column(db.Float)
+    average_score_difference = db.Column(db.Float)
+    last_played = db.Column(db.DateTime, nullable=False)
+
+
+class PlayerLayoutHoleStats(BaseModel):
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), primary_key=True)
+    layout_id = db.Column(db.Integer, db.ForeignKey('layout.id'), primary_key=True)
+    hole_number = db.Column(db.Integer, primary_key=True)
+    rounds_played = db.Column(db.Integer, nullable=False)
+    average_strokes = db.Column(db.Float, nullable=False)
+    best_strokes = db.Column(db.Integer, nullable=False)
+
+    # Score counts relative to the hole's par; rates are these divided by rounds_played
+    eagles = db.Column(db.Integer, nullable=False)  # eagle or better
+    birdies = db.Column(db.Integer, nullable=False)
+    pars = db.Column(db.Integer, nullable=False)
+    bogeys = db.Column(db.Integer, nullable=False)
+    double_bogeys = db.Column(db.Integer, nullable=False)  # double bogey or worse
+
+# Rolling ratings, refreshed by ratings.refresh_ratings after each import
+class PlayerRating(BaseModel):
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), primary_key=True)
+    rating = db.Column(db.Float, nullable=False)  # strokes over par per 18 holes
+    rounds_counted = db.Column(db.Integer, nullable=False)  # best rounds in the average
+    rounds_considered = db.Column(db.Integer, nullable=False)  # recent rounds they were picked from
+    last_played = db.Column(db.DateTime, nullable=False)
+
+
+class PlayerLayoutHandicap(BaseModel):
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), primary_key=True)
+    layout_id = db.Column(db.Integer, db.ForeignKey('layout.id'), primary_key=True)
+    handicap = db.Column(db.Float, nullable=False)  # strokes over the layout's par
+    rounds_counted = db.Column(db.Integer, nullable=False)
+    rounds_considered = db.Column(db.Integer, nullable=False)
+    last_played = db.Column(db.DateTime, nullable=False)
+
+# Date-bucketed trends, refreshed by trends.refresh_trends after each import
+class PlayerLayoutMonth(BaseModel):
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), primary_key=True)
+    layout_id = db.Column(db.Integer, db.ForeignKey('layout.id'), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)  # 'YYYY-MM'
+    rounds_played = db.Column(db.Integer, nullable=False)
+    total_score_difference = db.Column(db.Integer, nullable=False)  # sum over the month's rounds
+    best_score_difference = db.Column(db.Integer, nullable=False)
+
+
+# Rolling windows over the last rounds of a player on a layout, one row per scorecard
+class ScorecardTrend(BaseModel):
+    __table_args__ = (
+        db.Index('ix_scorecard_trend_player_layout_date', 'player_id', 'layout_id', 'date'),
+    )
+
+    scorecard_id = db.Column(db.Integer, db.ForeignKey('scorecard.id'), primary_key=True)
+    player_id = db.Column(db.Integer, nullable=False)
+    layout_id = db.Column(db.Integer, nullable=False)
+    date = db.Column(db.DateTime, nullable=False)
+    score_difference = db.Column(db.Integer, nullable=False)
+    moving_average = db.Column(db.Float, nullable=False)
+    best_in_window = db.Column(db.Integer, nullable=False)
+
 class User(db.Model, UserMixin):
     __bind_key__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,135 @@
+import time
+from sqlalchemy import delete, func, insert, select, tuple_
+from models import db, Player, Scorecard, LayoutHole, PlayerRating, PlayerLayoutHandicap
+from stats import complete_card, touched_pairs
+
+
+# A rating is the average of the best RATING_BEST_ROUNDS of the last RATING_RECENT_ROUNDS rounds.
+# After changing these, rebuild every rating with `flask --app dgs refresh-stats`.
+RATING_RECENT_ROUNDS = 20
+RATING_BEST_ROUNDS = 8
+
+# Ratings are scaled to this many holes so 9- and 24-hole layouts compare
+RATING_HOLES = 18
+
+
+def layout_pars():
+    # Par and hole count of every layout with par values
+    return (
+        select(
+            LayoutHole.layout_id,
+            func.sum(LayoutHole.par).label('par'),
+            func.count(LayoutHole.hole_number).label('holes'),
+        )
+        .group_by(LayoutHole.layout_id)
+        .subquery()
+    )
+
+
+def rated_rounds(where):
+    # Every complete card of the real players, with its strokes over the layout's par, raw and per
+    # RATING_HOLES holes
+    pars = layout_pars()
+    over_par = Scorecard.total_score - pars.c.par
+    return (
+        select(
+            Scorecard.id,
+            Scorecard.player_id,
+            Scorecard.layout_id,
+            Scorecard.date,
+            over_par.label('over_par'),
+            (over_par * float(RATING_HOLES) / pars.c.holes).label('normalized'),
+        )
+        .join(pars, pars.c.layout_id == Scorecard.layout_id)
+        .join(Player, Player.id == Scorecard.player_id)
+        .where(Player.name != 'Par', complete_card(), where)
+        .subquery()
+    )
+
+
+def best_of_recent(rounds, keys, value):
+    # Average of the best rounds among the recent ones, per group of `keys`
+    partition = [rounds.c[key] for key in keys]
+    recent = select(
+        *partition,
+        rounds.c.date,
+        rounds.c[value].label('value'),
+        func.row_number().over(partition_by=partition, order_by=(rounds.c.date.desc(), rounds.c.id.desc()))
+        .label('recency'),
+    ).subquery()
+
+    partition = [recent.c[key] for key in keys]
+    ranked = (
+        select(
+            *partition,
+            recent.c.date,
+            recent.c.value,
+            func.row_number().over(partition_by=partition, order_by=(recent.c.value, recent.c.recency))
+            .label('rank'),
+            func.count().over(partition_by=partition).label('considered'),
+            func.max(recent.c.date).over(partition_by=partition).label('last_played'),
+        )
+        .where(recent.c.recency <= RATING_RECENT_ROUNDS)
+        .subquery()
+    )
+
+    partition = [ranked.c[key] for key in keys]
+    return (
+        select(
+            *partition,
+            func.avg(ranked.c.value),
+            func.count(),
+            func.max(ranked.c.considered),
+            func.max(ranked.c.last_played),
+        )
+        .where(ranked.c.rank <= RATING_BEST_ROUNDS)
+        .group_by(*partition)
+    )
+
+
+def refresh_ratings(since=None):
+    # Recompute the ratings of the players, and the handicaps of the player/layout pairs, with
+    # scorecards dated at or after `since`; without a timestamp everything is rebuilt.
+    # Changed par values only reach the ratings of the other players on a rebuild.
+    # Errors are raised again, like those of refresh_statistics.
+    start_time = time.perf_counter()
+    pairs = touched_pairs(since)
+    players = select(pairs.subquery().c.player_id).distinct()
+    try:
+        refresh_player_ratings(pairs, players, since)
+        db.session.commit()
+        print(f"Ratings refreshed in {time.perf_counter() - start_time:.2f}s")
+    except Exception as e:
+        print("Error refreshing ratings:", str(e))
+        db.session.rollback()
+        raise
+
+
+def refresh_player_ratings(pairs, players, since):
+    stale_ratings = delete(PlayerRating)
+    stale_handicaps = delete(PlayerLayoutHandicap)
+    if since is not None:
+        stale_ratings = stale_ratings.where(PlayerRating.player_id.in_(players))
+        stale_handicaps = stale_handicaps.where(
+            tuple_(PlayerLayoutHandicap.player_id, PlayerLayoutHandicap.layout_id).in_(pairs)
+        )
+    db.session.execute(stale_ratings, execution_options={'synchronize_session': False})
+    db.session.execute(stale_handicaps, execution_options={'synchronize_session': False})
+
+    columns = ['rounds_counted', 'rounds_considered', 'last_played']
+    db.session.execute(
+        insert(PlayerRating).from_select(
+            ['player_id', 'rating'] + columns,
+            best_of_recent(rated_rounds(Scorecard.player_id.in_(players)), ['player_id'], 'normalized'),
+        )
+    )
+    db.session.execute(
+        insert(PlayerLayoutHandicap).from_select(
+            ['player_id', 'layout_id', 'handicap'] + columns,
+            best_of_recent(
+                rated_rounds(tuple_(Scorecard.player_id, Scorecard.layout_id).in_(pairs)),
+                ['player_id', 'layout_id'],
+                'over_par',
+            ),
+        )
+    )
@@ -0,0 +1,156 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request
+from models import db, Player, Course, Layout, Scorecard, get_import_state, is_incremental_import
+
+
+# LRU cache of JSON responses for the read-only endpoints.
+#
+# Every entry is tagged with the entities it depends on ('player:<name>', 'course:<name>',
+# 'layout:<course>|<layout>' or 'catalog'). The data only changes when an import advances
+# MetaData.import_generation, so the cache polls it and drops the entries tagged with the
+# players, courses and layouts with scorecards from MetaData.import_since onwards, or every
+# entry after a full import. Polling instead of a callback also catches imports that run in
+# another process.
+class ResponseCache:
+    def __init__(self, max_size=512, check_interval=1.0):
+        self.max_size = max_size
+        self.check_interval = check_interval
+        self.entries = OrderedDict()  # key -> (body, mimetype, etag, tags)
+        self.tagged_keys = {}  # tag -> set of keys
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        # Import the cached responses were built from
+        self.data_timestamp = None
+        self.data_generation = None
+        self.last_check = 0.0
+
+    def init_app(self, app):
+        self.max_size = app.config.get('RESPONSE_CACHE_SIZE', self.max_size)
+        self.check_interval = app.config.get('RESPONSE_CACHE_CHECK_INTERVAL', self.check_interval)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, mimetype, tags):
+        entry = (body, mimetype, hashlib.sha1(body).hexdigest(), tags)
+        if self.max_size <= 0:
+            return entry
+        with self.lock:
+            self.remove(key)
+            self.entries[key] = entry
+            for tag in tags:
+                self.tagged_keys.setdefault(tag, set()).add(key)
+            while len(self.entries) > self.max_size:
+                self.remove(next(iter(self.entries)))
+        return entry
+
+    def remove(self, key):
+        # Callers hold the lock
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[3]:
+            keys = self.tagged_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tagged_keys[tag]
+
+    def invalidate(self, tags=None):
+        # Drop the entries carrying any of the tags, or everything when no tags are given
+        with self.lock:
+            if tags is None:
+                self.entries.clear()
+                self.tagged_keys.clear()
+                return
+            for tag in tags:
+                for key in list(self.tagged_keys.get(tag, ())):
+                    self.remove(key)
+
+    def sync(self):
+        # Check whether an import has finished since the last check
+        now = time.monotonic()
+        if now - self.last_check < self.check_interval:
+            return
+        self.last_check = now
+
+        timestamp, generation, since = get_import_state()
+        previous = self.data_generation
+        if generation == previous:
+            return
+        self.data_timestamp = timestamp
+        self.data_generation = generation
+        if not is_incremental_import(previous, generation, since):
+            self.invalidate()
+            return
+
+        touched = (
+            db.session.query(Player.name, Course.name, Layout.name)
+            .select_from(Scorecard)
+            .join(Player, Player.id == Scorecard.player_id)
+            .join(Layout, Layout.id == Scorecard.layout_id)
+            .join(Course, Course.id == Layout.course_id)
+            .filter(Scorecard.date >= since)
+            .distinct()
+        )
+        tags = {'catalog'}
+        for player_name, course_name, layout_name in touched:
+            tags.update(player_tags(player_name))
+            tags.update(course_tags(course_name))
+            tags.update(layout_tags(course_name, layout_name))
+        self.invalidate(tags)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries)}
+
+    def cached(self, tags):
+        # Decorator for JSON views; `tags` receives the view arguments and returns the entry's tags
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                self.sync()
+                key = request.full_path
+                entry = self.get(key)
+                if entry is None:
+                    response = current_app.make_response(view(**kwargs))
+                    if response.status_code != 200:
+                        return response
+                    entry = self.put(key, response.get_data(), response.mimetype, tags(**kwargs))
+
+                body, mimetype, etag, _ = entry
+                response = current_app.response_class(body, mimetype=mimetype)
+                response.set_etag(etag)
+                if self.data_timestamp is not None:
+                    response.last_modified = self.data_timestamp
+                response.cache_control.no_cache = True  # browsers revalidate with If-None-Match
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
+
+
+def player_tags(player_name):
+    return [f'player:{player_name}']
+
+
+def course_tags(course_name):
+    return [f'course:{course_name}']
+
+
+def layout_tags(course_name, layout_name):
+    return [f'layout:{course_name}|{layout_name}']
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,230 @@
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from models import db
+
+
+# Maximum number of holes in a UDisc export
+MAX_HOLES = 24
+
+# One fixed-width record per scorecard; holes that were not played have -1 strokes, as an
+# abandoned card can have holes played in 0
+SCORECARD_DTYPE = np.dtype([
+    ('id', '<i8'),
+    ('player_id', '<i4'),
+    ('layout_id', '<i4'),
+    ('round_id', '<i4'),
+    ('total_score', '<i4'),
+    ('score_difference', '<i4'),
+    ('date', '<M8[s]'),
+    ('strokes', '<i2', (MAX_HOLES,)),
+])
+
+# Written to names.json; generations of another format are not read and the routes query the
+# database until the next import writes a new one. Format 1 marked unplayed holes with 0.
+SCORE_MAP_FORMAT = 2
+
+# Generations kept on disk: the current one and the one before, which readers may still map
+KEPT_GENERATIONS = 2
+
+
+# Scorecards and hole strokes in memory-mapped files, shared by every worker process.
+#
+# Each regeneration writes a new directory ("generation") under SCORE_MAP_DIR:
+#   scorecards.npy  SCORECARD_DTYPE records sorted by player, layout, score difference and id
+#   pair_keys.npy   player_id << 32 | layout_id of each record, for binary search
+#   ids.npy         scorecard ids in ascending order, and rows.npy the record of each
+#   pars.npy        layout id x hole matrix of par values, 0 where unknown
+#   names.json      player, course and layout names
+# and then points the 'current' file at it. The files are opened with np.load(mmap_mode='r'),
+# so the processes share one copy in the page cache instead of each holding its own.
+class ScoreMap:
+    def __init__(self, path):
+        self.path = path
+        self.scorecards = np.load(os.path.join(path, 'scorecards.npy'), mmap_mode='r')
+        self.pair_keys = np.load(os.path.join(path, 'pair_keys.npy'), mmap_mode='r')
+        self.ids = np.load(os.path.join(path, 'ids.npy'), mmap_mode='r')
+        self.rows = np.load(os.path.join(path, 'rows.npy'), mmap_mode='r')
+        self.pars = np.load(os.path.join(path, 'pars.npy'), mmap_mode='r')
+        with open(os.path.join(path, 'names.json')) as f:
+            names = json.load(f)
+        self.player_ids = dict(names['players'])  # player name -> id
+        self.layout_names = {layout_id: (course_name, name) for layout_id, course_name, name in names['layouts']}
+        self.layout_ids = {key: layout_id for layout_id, key in self.layout_names.items()}
+        self.format = names.get('format', 1)
+
+    def record(self, scorecard_id):
+        i = int(np.searchsorted(self.ids, scorecard_id))
+        if i == len(self.ids) or self.ids[i] != scorecard_id:
+            return None
+        return self.scorecards[self.rows[i]]
+
+    def hole_scores(self, scorecard_id):
+        # Same rows as the /hole_scores query, or None for a scorecard that is not in the map
+        record = self.record(scorecard_id)
+        if record is None:
+            return None
+        layout_id = int(record['layout_id'])
+        course_name, layout_name = self.layout_names[layout_id]
+        pars = self.pars[layout_id] if layout_id < len(self.pars) else np.zeros(MAX_HOLES, dtype=np.int16)
+        return [
+            {
+                'hole_number': int(hole) + 1,
+                'strokes': int(record['strokes'][hole]),
+                'par': int(pars[hole]) or None,
+                'layout_name': layout_name,
+                'course_name': course_name,
+            }
+            for hole in np.flatnonzero(record['strokes'] >= 0)
+        ]
+
+    def scorecard_data(self, player_name, course_name, layout_name, limit=None):
+        # A player's scorecards on a layout, best first, or None for unknown names
+        player_id = self.player_ids.get(player_name)
+        layout_id = self.layout_ids.get((course_name, layout_name))
+        if player_id is None or layout_id is None:
+            return None
+        key = (player_id << 32) | layout_id
+        start = int(np.searchsorted(self.pair_keys, key, side='left'))
+        end = int(np.searchsorted(self.pair_keys, key, side='right'))
+        records = self.scorecards[start:end][:limit]
+        return [
+            {
+                'id': int(record['id']),
+                'date': record['date'].item(),
+                'player_id': int(record['player_id']),
+                'round_id': int(record['round_id']),
+                'total_score': int(record['total_score']),
+                'score_difference': int(record['score_difference']),
+                'min_score_difference': int(record['score_difference']),
+                'hole_scores': record['strokes'][record['strokes'] >= 0].tolist(),
+            }
+            for record in records
+        ]
+
+
+def build_score_map(directory):
+    # Write a new generation from the database and make it the current one
+    start_time = time.perf_counter()
+    with db.engine.connect() as connection:
+        scorecards = pd.read_sql(
+            text('SELECT id, player_id, layout_id, round_id, total_score, score_difference, date FROM scorecard'),
+            connection,
+        )
+        hole_scores = pd.read_sql(text('SELECT scorecard_id, hole_number, strokes FROM hole_score'), connection)
+        players = pd.read_sql(text('SELECT id, name FROM player'), connection)
+        layouts = pd.read_sql(
+            text('SELECT layout.id, course.name AS course_name, layout.name FROM layout '
+                 'JOIN course ON course.id = layout.course_id'),
+            connection,
+        )
+        layout_holes = pd.read_sql(text('SELECT layout_id, hole_number, par FROM layout_hole'), connection)
+
+    scorecards = scorecards.sort_values(['player_id', 'layout_id', 'score_difference', 'id'])
+    records = np.zeros(len(scorecards), dtype=SCORECARD_DTYPE)
+    for column in ['id', 'player_id', 'layout_id', 'round_id', 'total_score', 'score_difference']:
+        records[column] = scorecards[column].to_numpy()
+    records['date'] = pd.to_datetime(scorecards['date']).to_numpy('datetime64[s]')
+    records['strokes'] = -1
+
+    id_order = np.argsort(records['id'])
+    ids = records['id'][id_order]
+    rows = id_order[np.searchsorted(ids, hole_scores['scorecard_id'].to_numpy())]
+    records['strokes'][rows, hole_scores['hole_number'].to_numpy() - 1] = hole_scores['strokes'].to_numpy()
+
+    layout_count = int(layouts['id'].max()) + 1 if not layouts.empty else 0
+    pars = np.zeros((layout_count, MAX_HOLES), dtype=np.int16)
+    pars[layout_holes['layout_id'].to_numpy(), layout_holes['hole_number'].to_numpy() - 1] = (
+        layout_holes['par'].to_numpy()
+    )
+
+    generation = f"{datetime.now():%Y%m%d%H%M%S%f}"
+    path = os.path.join(directory, generation)
+    os.makedirs(path)
+    np.save(os.path.join(path, 'scorecards.npy'), records)
+    np.save(
+        os.path.join(path, 'pair_keys.npy'),
+        (records['player_id'].astype(np.int64) << 32) | records['layout_id'].astype(np.int64),
+    )
+    np.save(os.path.join(path, 'ids.npy'), ids)
+    np.save(os.path.join(path, 'rows.npy'), id_order)
+    np.save(os.path.join(path, 'pars.npy'), pars)
+    with open(os.path.join(path, 'names.json'), 'w') as f:
+        json.dump(
+            {
+                'format': SCORE_MAP_FORMAT,
+                'players': [[name, int(player_id)] for player_id, name in zip(players['id'], players['name'])],
+                'layouts': [
+                    [int(layout_id), course_name, name]
+                    for layout_id, course_name, name in zip(layouts['id'], layouts['course_name'], layouts['name'])
+                ],
+            },
+            f,
+        )
+
+    # Readers follow the 'current' file, which is replaced atomically
+    pointer = os.path.join(directory, 'current')
+    with open(pointer + '.tmp', 'w') as f:
+        f.write(generation)
+    os.replace(pointer + '.tmp', pointer)
+
+    generations = sorted(name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name)))
+    for name in generations[:-KEPT_GENERATIONS]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    print(f"Score map of {len(records)} scorecards written in {time.perf_counter() - start_time:.2f}s")
+
+
+#%%
+# The map used by the Flask routes, reopened when a new generation appears
+
+
+class ScoreMapHolder:
+    def __init__(self, check_interval=1.0):
+        self.directory = None
+        self.check_interval = check_interval
+        self.map = None
+        self.generation = None
+        self.last_check = 0.0
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        # SCORE_MAP_DIR is None (disabled) or the directory the imports write the map to
+        self.directory = app.config.get('SCORE_MAP_DIR')
+        self.check_interval = app.config.get('SCORE_MAP_CHECK_INTERVAL', self.check_interval)
+
+    def get(self):
+        # None when disabled or before the first map is written; the routes then query the database
+        if not self.directory:
+            return None
+        with self.lock:
+            if time.monotonic() - self.last_check >= self.check_interval or self.map is None:
+                self.last_check = time.monotonic()
+                try:
+                    with open(os.path.join(self.directory, 'current')) as f:
+                        generation = f.read().strip()
+                except FileNotFoundError:
+                    return None
+                if generation != self.generation:
+                    mapped = ScoreMap(os.path.join(self.directory, generation))
+                    self.map = mapped if mapped.format == SCORE_MAP_FORMAT else None
+                    self.generation = generation
+            return self.map
+
+    def rebuild(self):
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            build_score_map(self.directory)
+        except Exception as e:
+            # The routes keep serving the previous map, or the database
+            print("Error writing score map:", str(e))
+
+
+score_map = ScoreMapHolder()
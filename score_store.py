@@ -0,0 +1,239 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from models import db, get_import_state
+
+
+# Maximum number of holes in a UDisc export
+MAX_HOLES = 24
+
+# Score relative to par is bucketed from eagle-or-better to triple-bogey-or-worse
+DISTRIBUTION_MIN = -2
+DISTRIBUTION_MAX = 3
+
+
+# Columnar, in-process copy of every scorecard.
+#
+# Row i of each array describes one scorecard; `strokes` is a scorecard x hole matrix where
+# holes that were not played are -1, as an abandoned card can have holes played in 0. Players
+# and layouts are referred to by integer codes, resolved from names through `player_index` and
+# `layout_index`.
+class ScoreStore:
+    def __init__(self, ids, dates, player_codes, layout_codes, total_scores, score_differences, strokes,
+                 player_index, layout_index, pars):
+        self.ids = ids
+        self.dates = dates
+        self.player_codes = player_codes
+        self.layout_codes = layout_codes
+        self.total_scores = total_scores
+        self.score_differences = score_differences
+        self.strokes = strokes
+        self.player_index = player_index  # player name -> code
+        self.layout_index = layout_index  # (course name, layout name) -> code
+        self.pars = pars  # layout code x hole matrix of par values, 0 where unknown
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_database(cls):
+        with db.engine.connect() as connection:
+            scorecards = pd.read_sql(
+                text(
+                    'SELECT id, player_id, layout_id, date, total_score, score_difference '
+                    'FROM scorecard ORDER BY id'
+                ),
+                connection,
+            )
+            hole_scores = pd.read_sql(text('SELECT scorecard_id, hole_number, strokes FROM hole_score'), connection)
+            players = pd.read_sql(text('SELECT id, name FROM player'), connection)
+            layouts = pd.read_sql(
+                text('SELECT layout.id, course.name AS course_name, layout.name FROM layout '
+                     'JOIN course ON course.id = layout.course_id'),
+                connection,
+            )
+            layout_holes = pd.read_sql(text('SELECT layout_id, hole_number, par FROM layout_hole'), connection)
+
+        ids = scorecards['id'].to_numpy(np.int64)
+        strokes = np.full((len(ids), MAX_HOLES), -1, dtype=np.int16)
+        rows = np.searchsorted(ids, hole_scores['scorecard_id'].to_numpy())
+        strokes[rows, hole_scores['hole_number'].to_numpy() - 1] = hole_scores['strokes'].to_numpy()
+
+        layout_count = int(layouts['id'].max()) + 1 if not layouts.empty else 0
+        pars = np.zeros((layout_count, MAX_HOLES), dtype=np.int16)
+        pars[layout_holes['layout_id'].to_numpy(), layout_holes['hole_number'].to_numpy() - 1] = (
+            layout_holes['par'].to_numpy()
+        )
+
+        return cls(
+            ids=ids,
+            dates=pd.to_datetime(scorecards['date']).to_numpy('datetime64[s]'),
+            player_codes=scorecards['player_id'].to_numpy(np.int32),
+            layout_codes=scorecards['layout_id'].to_numpy(np.int32),
+            total_scores=scorecards['total_score'].to_numpy(np.int32),
+            score_differences=scorecards['score_difference'].to_numpy(np.int32),
+            strokes=strokes,
+            player_index=dict(zip(players['name'], players['id'])),
+            layout_index=dict(zip(zip(layouts['course_name'], layouts['name']), layouts['id'])),
+            pars=pars,
+        )
+
+    @classmethod
+    def from_csv(cls, filename):
+        # Build the store straight from a UDisc export, without a database
+        df = pd.read_csv(filename)
+        df['PlayerName'] = df['PlayerName'].str.strip()
+        df['Päivämäärä'] = pd.to_datetime(df['Päivämäärä'], format='%Y-%m-%d %H%M')
+        hole_columns = [f'Hole{hole_number}' for hole_number in range(1, MAX_HOLES + 1)]
+
+        layout_codes, layout_keys = pd.MultiIndex.from_frame(df[['CourseName', 'LayoutName']]).factorize()
+        df['layout_code'] = layout_codes
+
+        # The last 'Par' row of each layout wins, like in the import
+        pars = np.zeros((len(layout_keys), MAX_HOLES), dtype=np.int16)
+        par_rows = df[df['PlayerName'] == 'Par'].drop_duplicates('layout_code', keep='last')
+        pars[par_rows['layout_code'].to_numpy()] = par_rows[hole_columns].fillna(0).to_numpy(np.int16)
+
+        # Skip cards with missing holes within the layout's par
+        hole_counts = (pars > 0).sum(axis=1)[df['layout_code'].to_numpy()]
+        within_layout = np.arange(1, MAX_HOLES + 1) <= hole_counts[:, None]
+        complete = ~(df[hole_columns].isna().to_numpy() & within_layout).any(axis=1)
+        df = df[complete]
+
+        player_codes, player_names = pd.factorize(df['PlayerName'])
+        strokes = df[hole_columns].fillna(-1).to_numpy(np.int16)
+        strokes[~(np.arange(1, MAX_HOLES + 1) <= hole_counts[complete][:, None])] = -1
+        is_par = (df['PlayerName'] == 'Par').to_numpy()
+
+        return cls(
+            ids=np.arange(1, len(df) + 1, dtype=np.int64),
+            dates=df['Päivämäärä'].to_numpy('datetime64[s]'),
+            player_codes=player_codes.astype(np.int32),
+            layout_codes=df['layout_code'].to_numpy(np.int32),
+            total_scores=np.where(is_par, 0, df['Kaikki'].fillna(0).to_numpy()).astype(np.int32),
+            score_differences=df['+/-'].fillna(0).to_numpy(np.int32),
+            strokes=strokes,
+            player_index={name: code for code, name in enumerate(player_names)},
+            layout_index={key: code for code, key in enumerate(layout_keys)},
+            pars=pars,
+        )
+
+    #%%
+    # Vectorized queries. Unknown players or layouts select nothing.
+
+    def select(self, player_name=None, course_name=None, layout_name=None):
+        mask = np.ones(len(self), dtype=bool)
+        if player_name is not None:
+            mask &= self.player_codes == self.player_index.get(player_name, -1)
+        if layout_name is not None:
+            mask &= self.layout_codes == self.layout_index.get((course_name, layout_name), -1)
+        return mask
+
+    def layout_par(self, course_name, layout_name):
+        code = self.layout_index.get((course_name, layout_name))
+        if code is None:
+            return np.zeros(0, dtype=np.int16)
+        par = self.pars[code]
+        return par[:int((par > 0).sum())]
+
+    def complete(self, rows, hole_count):
+        # Which of the rows are complete cards; abandoned ones, with holes scored 0 or not played,
+        # are left out of the averages like in the summary tables
+        return (self.strokes[rows, :hole_count] > 0).all(axis=1)
+
+    def hole_averages(self, player_name, course_name, layout_name):
+        par = self.layout_par(course_name, layout_name)
+        rows = np.flatnonzero(self.select(player_name, course_name, layout_name))
+        strokes = self.strokes[rows[self.complete(rows, len(par))], :len(par)]
+        if len(strokes) == 0:
+            return []
+        return strokes.mean(axis=0).tolist()
+
+    def best_rounds(self, player_name, course_name, layout_name, limit=None):
+        rows = np.flatnonzero(self.select(player_name, course_name, layout_name))
+        rows = rows[np.lexsort((self.ids[rows], self.score_differences[rows]))][:limit]
+        return [
+            {
+                'id': int(self.ids[row]),
+                'date': str(self.dates[row]),
+                'total_score': int(self.total_scores[row]),
+                'score_difference': int(self.score_differences[row]),
+                'hole_scores': self.strokes[row][self.strokes[row] >= 0].tolist(),
+            }
+            for row in rows
+        ]
+
+    def score_distribution(self, course_name, layout_name, player_name=None):
+        # Per hole, the number of scores at each offset from par between DISTRIBUTION_MIN and DISTRIBUTION_MAX
+        par = self.layout_par(course_name, layout_name)
+        rows = np.flatnonzero(self.select(player_name, course_name, layout_name))
+        strokes = self.strokes[rows[self.complete(rows, len(par))], :len(par)]
+        relative = np.clip(strokes - par, DISTRIBUTION_MIN, DISTRIBUTION_MAX) - DISTRIBUTION_MIN
+        width = DISTRIBUTION_MAX - DISTRIBUTION_MIN + 1
+        buckets = relative + np.arange(len(par)) * width
+        counts = np.bincount(buckets.ravel(), minlength=len(par) * width).reshape(len(par), width)
+        return {
+            'offsets': list(range(DISTRIBUTION_MIN, DISTRIBUTION_MAX + 1)),
+            'holes': counts.tolist(),
+        }
+
+    def trend(self, player_name, course_name, layout_name, window=5):
+        # Moving average of the score difference over the player's complete rounds in date order
+        rows = np.flatnonzero(self.select(player_name, course_name, layout_name))
+        rows = rows[self.complete(rows, len(self.layout_par(course_name, layout_name)))]
+        rows = rows[np.argsort(self.dates[rows], kind='stable')]
+        differences = self.score_differences[rows].astype(float)
+        window = max(1, min(window, len(differences)))
+        cumulative = np.cumsum(np.insert(differences, 0, 0.0))
+        moving_average = (cumulative[window:] - cumulative[:-window]) / window
+        return {
+            'dates': [str(date) for date in self.dates[rows]],
+            'score_differences': differences.tolist(),
+            'moving_average': [None] * (window - 1) + moving_average.tolist(),
+        }
+
+
+#%%
+# The store used by the Flask routes, reloaded after each import
+
+
+class ScoreStoreHolder:
+    def __init__(self, check_interval=1.0):
+        self.store = None
+        self.source = None
+        self.check_interval = check_interval
+        self.data_generation = None
+        self.last_check = 0.0
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        # SCORE_STORE_SOURCE is None (disabled), 'database' or the path of a UDisc CSV export
+        self.source = app.config.get('SCORE_STORE_SOURCE')
+        self.check_interval = app.config.get('SCORE_STORE_CHECK_INTERVAL', self.check_interval)
+
+    def get(self):
+        if not self.source:
+            return None
+        with self.lock:
+            if self.store is None:
+                self.load()
+            elif self.source == 'database' and time.monotonic() - self.last_check >= self.check_interval:
+                self.last_check = time.monotonic()
+                if get_import_state()[1] != self.data_generation:
+                    self.load()
+            return self.store
+
+    def load(self):
+        start_time = time.perf_counter()
+        if self.source == 'database':
+            self.data_generation = get_import_state()[1]
+            self.store = ScoreStore.from_database()
+        else:
+            self.store = ScoreStore.from_csv(self.source)
+        self.last_check = time.monotonic()
+        print(f"Score store loaded {len(self.store)} scorecards in {time.perf_counter() - start_time:.2f}s")
+
+
+score_store = ScoreStoreHolder()
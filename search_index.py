@@ -0,0 +1,114 @@
+import bisect
+import threading
+import time
+import unicodedata
+from models import db, Player, Course, Layout, get_import_state, is_incremental_import
+
+
+# Kinds of names in the index
+SEARCH_KINDS = ('player', 'course', 'layout')
+
+# Matching index entries of the wanted kinds ranked per search; a short prefix stops after this many
+SEARCH_SCAN_LIMIT = 1000
+
+
+def normalize(name):
+    # Searches ignore case, diacritics ('ä' matches 'a') and extra whitespace
+    decomposed = unicodedata.normalize('NFKD', name.casefold())
+    return ' '.join(''.join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+
+# Prefix index of player, course and layout names for typeahead search.
+#
+# Every name is indexed under its normalized form and under the suffix starting at each of its
+# words, so 'camp' finds 'Oittaan Ulkoilualue - Camping'. The entries are kept in one sorted list
+# and a search is a binary search for the first entry starting with the query, followed by a scan
+# while the entries still match. Players, courses and layouts are only ever added by imports, so
+# when MetaData.import_generation advances only the rows with new ids are indexed.
+class SearchIndex:
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self.entries = []  # sorted (key, word position, kind, id)
+        self.results = {}  # (kind, id) -> JSON of the match
+        self.max_ids = dict.fromkeys(SEARCH_KINDS, 0)
+        self.lock = threading.Lock()
+        self.data_generation = None
+        self.last_check = None
+
+    def init_app(self, app):
+        self.check_interval = app.config.get('SEARCH_INDEX_CHECK_INTERVAL', self.check_interval)
+
+    def sync(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.last_check is not None and now - self.last_check < self.check_interval:
+                return
+            first = self.last_check is None
+            self.last_check = now
+
+            _, generation, since = get_import_state()
+            if not first and generation == self.data_generation:
+                return
+            if not first and not is_incremental_import(self.data_generation, generation, since):
+                # The database may have been replaced, e.g. by a snapshot restore
+                self.entries = []
+                self.results = {}
+                self.max_ids = dict.fromkeys(SEARCH_KINDS, 0)
+            self.data_generation = generation
+            self.add_new_names()
+
+    def add_new_names(self):
+        start_time = time.perf_counter()
+        new_entries = []
+        players = Player.query.filter(Player.id > self.max_ids['player'], Player.name != 'Par')
+        for player in players:
+            new_entries += self.add('player', player.id, player.name, {'type': 'player', 'id': player.id,
+                                                                       'name': player.name})
+        for course in Course.query.filter(Course.id > self.max_ids['course']):
+            new_entries += self.add('course', course.id, course.name, {'type': 'course', 'id': course.id,
+                                                                       'name': course.name})
+        layouts = (
+            db.session.query(Layout.id, Layout.name, Course.id, Course.name)
+            .join(Course, Course.id == Layout.course_id)
+            .filter(Layout.id > self.max_ids['layout'])
+        )
+        for layout_id, layout_name, course_id, course_name in layouts:
+            new_entries += self.add('layout', layout_id, layout_name, {
+                'type': 'layout', 'id': layout_id, 'name': layout_name, 'course_id': course_id, 'course': course_name,
+            })
+        if new_entries:
+            # Readers keep using the old list until the new one is assigned
+            self.entries = sorted(self.entries + new_entries)
+            print(f"Search index: {len(new_entries)} entries added in {time.perf_counter() - start_time:.2f}s")
+
+    def add(self, kind, id, name, result):
+        self.results[(kind, id)] = result
+        self.max_ids[kind] = max(self.max_ids[kind], id)
+        words = normalize(name).split(' ')
+        return [(' '.join(words[position:]), position, kind, id) for position in range(len(words)) if words[position]]
+
+    def search(self, query, limit=10, kinds=None):
+        self.sync()
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        entries = self.entries
+        matches = {}
+        scanned = 0
+        # Only the entries of the wanted kinds count towards the scan limit
+        for i in range(bisect.bisect_left(entries, (prefix,)), len(entries)):
+            key, position, kind, id = entries[i]
+            if not key.startswith(prefix) or scanned == SEARCH_SCAN_LIMIT:
+                break
+            if kinds is not None and kind not in kinds:
+                continue
+            scanned += 1
+            # Names that start with the query rank above names with a later word that does
+            rank = (position > 0, len(key) + position, key)
+            if (kind, id) not in matches or rank < matches[(kind, id)]:
+                matches[(kind, id)] = rank
+        best = sorted(matches, key=matches.get)[:limit]
+        return [self.results[match] for match in best]
+
+
+search_index = SearchIndex()
@@ -0,0 +1,159 @@
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, insert, text
+from models import db, MetaData, ImportProgress, Player, Course, Layout, LayoutHole, Round, Scorecard, HoleScore
+from models import PlayerLayoutStats, PlayerLayoutHoleStats, PlayerRating, PlayerLayoutHandicap
+from models import PlayerLayoutMonth, ScorecardTrend
+from stats import refresh_statistics
+from ratings import refresh_ratings
+from trends import refresh_trends
+from data_loader import layout_cache
+from score_map import score_map
+
+
+# Snapshots of the statistics database as a NumPy .npz archive.
+#
+# Every table is stored column by column under '<table>.<column>', except the hole scores:
+# they are a scorecard x hole matrix of strokes, -1 where a hole was not played, in the order
+# of 'scorecard.id'. A hole can be played in 0 strokes, when a card was abandoned. Ids are
+# kept, so a restored database matches the exported one. The materialized statistics are not
+# stored; they are rebuilt after a restore.
+#
+#   flask --app dgs export-snapshot statistics.npz
+#   flask --app dgs import-snapshot statistics.npz
+
+SNAPSHOT_FORMAT = 2
+
+# Format 1 marked the holes that were not played with 0, which loses the holes scored 0
+READABLE_FORMATS = [1, 2]
+
+# Maximum number of holes in a UDisc export
+MAX_HOLES = 24
+
+# Rows per executemany batch on restore
+RESTORE_BATCH_SIZE = 10000
+
+# Tables in the order they are restored, with the columns stored for each
+SNAPSHOT_TABLES = [
+    (Player, ['id', 'name']),
+    (Course, ['id', 'name']),
+    (Layout, ['id', 'course_id', 'name']),
+    (LayoutHole, ['layout_id', 'hole_number', 'par']),
+    (Round, ['id', 'course_id', 'layout_id', 'date']),
+    (Scorecard, ['id', 'player_id', 'round_id', 'layout_id', 'total_score', 'score_difference', 'date']),
+]
+
+# Everything a restore replaces, children first
+RESTORED_MODELS = [
+    ScorecardTrend, PlayerLayoutMonth, PlayerLayoutHandicap, PlayerRating, PlayerLayoutHoleStats,
+    PlayerLayoutStats, HoleScore, Scorecard, Round, LayoutHole, Layout, Course, Player, ImportProgress,
+]
+
+
+def export_snapshot(filename):
+    start_time = time.perf_counter()
+    arrays = {'format': np.array(SNAPSHOT_FORMAT)}
+    with db.engine.connect() as connection:
+        for model, columns in SNAPSHOT_TABLES:
+            table = model.__tablename__
+            order = ', '.join(column.name for column in model.__table__.primary_key.columns)
+            df = pd.read_sql(text(f"SELECT {', '.join(columns)} FROM {table} ORDER BY {order}"), connection)
+            for column in columns:
+                arrays[f'{table}.{column}'] = column_array(df[column])
+
+        hole_scores = pd.read_sql(text('SELECT scorecard_id, hole_number, strokes FROM hole_score'), connection)
+
+    scorecard_ids = arrays['scorecard.id']
+    strokes = np.full((len(scorecard_ids), MAX_HOLES), -1, dtype=np.int16)
+    rows = np.searchsorted(scorecard_ids, hole_scores['scorecard_id'].to_numpy())
+    strokes[rows, hole_scores['hole_number'].to_numpy() - 1] = hole_scores['strokes'].to_numpy()
+    arrays['hole_score.strokes'] = strokes
+
+    timestamp = db.session.query(MetaData.last_processed_timestamp).scalar()
+    arrays['last_processed_timestamp'] = np.array(
+        np.datetime64(timestamp, 'us') if timestamp is not None else np.datetime64('NaT', 'us')
+    )
+
+    np.savez_compressed(filename, **arrays)
+    print(f"Exported {len(scorecard_ids)} scorecards to {filename} in {time.perf_counter() - start_time:.2f}s")
+
+
+def column_array(series):
+    # Names are fixed-width unicode, so the archive loads without pickle
+    if series.name == 'date':
+        return pd.to_datetime(series).to_numpy('datetime64[us]')
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(np.int64)
+    return series.to_numpy(dtype=str)
+
+
+def import_snapshot(filename):
+    # Replaces the whole statistics database with the snapshot in one transaction
+    start_time = time.perf_counter()
+    try:
+        with np.load(filename) as snapshot:
+            snapshot_format = int(snapshot['format'])
+            if snapshot_format not in READABLE_FORMATS:
+                raise ValueError(f"Unsupported snapshot format {snapshot_format}")
+
+            for model in RESTORED_MODELS:
+                db.session.execute(delete(model))
+
+            for model, columns in SNAPSHOT_TABLES:
+                table = model.__tablename__
+                values = [snapshot[f'{table}.{column}'].tolist() for column in columns]
+                insert_rows(model, [dict(zip(columns, row)) for row in zip(*values)])
+
+            strokes = snapshot['hole_score.strokes']
+            rows, holes = np.nonzero(strokes > 0 if snapshot_format == 1 else strokes >= 0)
+            scorecard_ids = snapshot['scorecard.id'][rows]
+            insert_rows(HoleScore, [
+                {'scorecard_id': scorecard_id, 'hole_number': hole_number, 'strokes': hole_strokes}
+                for scorecard_id, hole_number, hole_strokes in zip(
+                    scorecard_ids.tolist(), (holes + 1).tolist(), strokes[rows, holes].tolist()
+                )
+            ])
+
+            timestamp = snapshot['last_processed_timestamp'][()]
+
+        if db.session.get_bind().dialect.name == 'postgresql':
+            # Ids were inserted explicitly, so move the sequences past them
+            for model, columns in SNAPSHOT_TABLES:
+                if 'id' in columns:
+                    table = model.__tablename__
+                    db.session.execute(text(
+                        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                        f"COALESCE((SELECT max(id) FROM {table}), 0) + 1, false)"
+                    ))
+        db.session.commit()
+        print(f"Restored {len(strokes)} scorecards from {filename} in {time.perf_counter() - start_time:.2f}s")
+
+        # The restore is recorded after the refreshes, like an import, so anything that watches
+        # MetaData never sees the restored rounds without their statistics
+        layout_cache.invalidate()
+        refresh_statistics()
+        refresh_ratings()
+        refresh_trends()
+        score_map.rebuild()
+
+        meta_data = MetaData.query.first()
+        if meta_data is None:
+            meta_data = MetaData()
+            db.session.add(meta_data)
+        meta_data.last_processed_timestamp = (
+            pd.Timestamp(timestamp).to_pydatetime() if not np.isnat(timestamp) else datetime.min
+        )
+        # Every id may have changed, so the caches start over
+        meta_data.import_generation = (meta_data.import_generation or 0) + 1
+        meta_data.import_since = None
+        db.session.commit()
+    except Exception as e:
+        print("Error importing snapshot:", str(e))
+        db.session.rollback()
+
+
+def insert_rows(model, rows):
+    for offset in range(0, len(rows), RESTORE_BATCH_SIZE):
+        db.session.execute(insert(model), rows[offset:offset + RESTORE_BATCH_SIZE])
@@ -10,8 +10,14 @@ window.onload = function () {
         NUM_RESULTS: "num-results",
     };
     let currentData = null;
+    // Scorecards requested per page from /scorecards
+    const SCORECARD_PAGE_SIZE = 50;
     let par = null;
-    let selectedPlayerName = null;
+    // The /bootstrap tree, and its courses, layouts and players by id
+    let catalog = null;
+    const courseById = {};
+    const layoutById = {};
+    const playerById = {};
 
     // Map element IDs to their corresponding variables
     const elements = Object.fromEntries(
@@ -29,11 +35,10 @@ window.onload = function () {
     // Create an event for updates
     const updatedEvent = new Event("updated");
 
-    function fetchData(endpoint, selectElement, defaultOptionText) {
-        console.log("Fetching URL:", endpoint);
-    
+    // Fetch the course -> layout -> player tree once; the dropdowns are filled from it
+    function fetchBootstrap() {
         elements.LOADING_INDICATOR.style.display = "block";
-        return fetch(endpoint)
+        return fetch("/bootstrap")
             .then((response) => {
                 if (!response.ok) {
                     throw new Error("Network response was not ok");
@@ -41,12 +46,16 @@ window.onload = function () {
                 return response.json();
             })
             .then((data) => {
-                console.log(data);
-                if (data?.length > 0) {
-                    populateSelect(selectElement, data, defaultOptionText);
-                    // Store the selected player name after updating the dropdown
-                    selectedPlayerName = elements.PLAYER_NAME.options[elements.PLAYER_NAME.selectedIndex]?.text;
-                }
+                catalog = data;
+                catalog.courses.forEach((course) => {
+                    courseById[course.id] = course;
+                    course.layouts.forEach((layout) => {
+                        layoutById[layout.id] = layout;
+                    });
+                });
+                catalog.players.forEach((player) => {
+                    playerById[player.id] = player;
+                });
             })
             .catch((error) => {
                 console.error("There has been a problem with your fetch operation:", error);
@@ -71,6 +80,9 @@ window.onload = function () {
         for (let item of data) {
             let option = document.createElement("option");
             option.text = typeof item === "string" ? item : item.name;
+            if (item.id !== undefined) {
+                option.value = item.id;
+            }
             selectElement.appendChild(option);
         }
         
@@ -78,94 +90,74 @@ window.onload = function () {
     }
 
     function updateLayouts() {
-        let selectedCourseName = elements.COURSE_NAME.options[elements.COURSE_NAME.selectedIndex].text;
+        let course = courseById[elements.COURSE_NAME.value];
 
-        if (selectedCourseName === "Select a Course") {
+        if (!course) {
             console.log("No valid course selected");
             return;
         }
 
-        let fetchUrl = `/layouts_for_course/${encodeURIComponent(selectedCourseName)}`;
-        fetchData(fetchUrl, elements.LAYOUT_NAME, "Select a Layout");
+        populateSelect(elements.LAYOUT_NAME, course.layouts, "Select a Layout");
     }
 
     function updatePlayers() {
-        let selectedCourseName = elements.COURSE_NAME.options[elements.COURSE_NAME.selectedIndex]?.text;
-        let selectedLayoutName = elements.LAYOUT_NAME.options[elements.LAYOUT_NAME.selectedIndex]?.text;
-        selectedPlayerName = elements.PLAYER_NAME.options[elements.PLAYER_NAME.selectedIndex]?.text;
-    
-        console.log("Selected Course:", selectedCourseName);
-        console.log("Selected Layout:", selectedLayoutName);
-        console.log("Selected Player:", selectedPlayerName);
-    
-        // Check if both course and layout are selected before fetching players
-        if (selectedCourseName && selectedLayoutName) {
-            let fetchUrl = `/players_for_course_and_layout/${encodeURIComponent(
-                selectedCourseName
-            )}/${encodeURIComponent(selectedLayoutName)}`;
-            fetchData(fetchUrl, elements.PLAYER_NAME, "Select a Player")
-                .then(() => {
-                    // After updating players, reselect the previously selected player
-                    if (selectedPlayerName) {
-                        elements.PLAYER_NAME.value = selectedPlayerName;
-                    }
-                });
+        let layout = layoutById[elements.LAYOUT_NAME.value];
+        let selectedPlayerId = elements.PLAYER_NAME.value;
+
+        // Check if both course and layout are selected before listing players
+        if (layout) {
+            populateSelect(elements.PLAYER_NAME, layout.players.map((playerId) => playerById[playerId]), "Select a Player");
+            // After updating players, reselect the previously selected player
+            if (selectedPlayerId && layout.players.includes(Number(selectedPlayerId))) {
+                elements.PLAYER_NAME.value = selectedPlayerId;
+            }
         } else {
-            console.log("Please select a valid course and layout before fetching players.");
+            console.log("Please select a valid course and layout before listing players.");
+        }
+    }
+
+    // Limit the courses to the ones the selected player has played
+    function updateCoursesForPlayer() {
+        let playerId = Number(elements.PLAYER_NAME.value);
+        let selectedCourseId = elements.COURSE_NAME.value;
+        let courses = catalog.courses.filter((course) =>
+            course.layouts.some((layout) => layout.players.includes(playerId))
+        );
+        populateSelect(elements.COURSE_NAME, courses, "Select a Course");
+        if (courseById[selectedCourseId] && courses.includes(courseById[selectedCourseId])) {
+            elements.COURSE_NAME.value = selectedCourseId;
         }
     }
-    
-    
-    
     
     
     function handleScorecardForm(event) {
         event.preventDefault();
 
-        let selectedCourseName = elements.COURSE_NAME.options[elements.COURSE_NAME.selectedIndex].text;
-        let selectedLayoutName = elements.LAYOUT_NAME.options[elements.LAYOUT_NAME.selectedIndex].text;
-        let selectedPlayerName = elements.PLAYER_NAME.options[elements.PLAYER_NAME.selectedIndex]?.text;
+        let layout = layoutById[elements.LAYOUT_NAME.value];
+        let player = playerById[elements.PLAYER_NAME.value];
         let numResults = elements.NUM_RESULTS.value;
 
-            // Check if a valid course, layout, and player are selected
-    if (selectedCourseName === "Select a Course" || selectedLayoutName === "Select a Layout" || selectedPlayerName === "Select a Player") {
-        console.log("Please select a valid course, layout, and player.");
-        return;
-    }
+        // Check if a valid course, layout, and player are selected
+        if (!courseById[elements.COURSE_NAME.value] || !layout || !player) {
+            console.log("Please select a valid course, layout, and player.");
+            return;
+        }
 
+        // The par values come with the layout from /bootstrap
+        par = layout.par;
+        console.log(`Par: ${par}`);
 
-        // Fetch 'par' value
-        fetch(`/par/${encodeURIComponent(selectedCourseName)}/${encodeURIComponent(selectedLayoutName)}`)
-            .then(response => {
-                if (!response.ok) {
-                    throw new Error("Network response was not ok");
-                }
-                return response.json();
-            })
-            .then(parData => {
-                par = parData.par; // Set par here
-                console.log(`Par: ${par}`);
-
-                // Fetch scorecard data
-                let fetchUrl = `/scorecard_data/${encodeURIComponent(
-                    selectedPlayerName
-                )}/${encodeURIComponent(selectedCourseName)}/${encodeURIComponent(
-                    selectedLayoutName
-                )}/${encodeURIComponent(numResults)}`;
-
-                elements.LOADING_INDICATOR.style.display = "block";
-                console.log("Fetching scorecard data...");
-                return fetch(fetchUrl);
-            })
-            .then(response => {
-                if (!response.ok) {
-                    throw new Error("Network response was not ok");
+        // Fetch the scorecards one page at a time, best rounds first
+        let baseUrl = `/scorecards/${player.id}/${layout.id}`;
+
+        elements.LOADING_INDICATOR.style.display = "block";
+        console.log("Fetching scorecard data...");
+        currentData = [];
+        fetchScorecardPages(baseUrl, numResults, handleScorecardData)
+            .then(() => {
+                if (currentData.length === 0) {
+                    displayNoScorecardsMessage();
                 }
-                return response.json();
-            })
-            .then(data => {
-                currentData = data;
-                handleScorecardData(data, numResults, par); // Pass 'par' to handleScorecardData
             })
             .catch(error => {
                 console.error("There has been a problem with your fetch operation:", error);
@@ -176,33 +168,63 @@ window.onload = function () {
     }
 
 
-    function handleScorecardData(data, numResults, par) {
-        console.log("Processing data:", data);
+    // Fetch pages of scorecards until numResults are loaded or the history ends,
+    // passing each page to onPage as soon as it arrives
+    function fetchScorecardPages(baseUrl, numResults, onPage) {
+        let loaded = 0;
 
-        if (Array.isArray(data) && data.length > 0) {
-            if (numResults === "all") {
-                numResults = data.length;
+        function fetchPage(cursor) {
+            let size = numResults === "all" ? SCORECARD_PAGE_SIZE : Math.min(SCORECARD_PAGE_SIZE, numResults - loaded);
+            let url = `${baseUrl}?size=${size}`;
+            if (cursor) {
+                url += `&after=${encodeURIComponent(cursor)}`;
             }
-            data.sort((a, b) => a.total_score - b.total_score);
-            data = data.slice(0, numResults);
-
-            // Get selected names from dropdowns
-            const selectedPlayerName = elements.PLAYER_NAME.options[elements.PLAYER_NAME.selectedIndex].text;
-            const selectedCourseName = elements.COURSE_NAME.options[elements.COURSE_NAME.selectedIndex].text;
-            const selectedLayoutName = elements.LAYOUT_NAME.options[elements.LAYOUT_NAME.selectedIndex].text;
-
-            // Update player names and other details
-            data.forEach(scorecard => {
-                scorecard.player_name = selectedPlayerName;
-                scorecard.course_name = selectedCourseName;
-                scorecard.layout_name = selectedLayoutName;
-            });
+            return fetch(url)
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error("Network response was not ok");
+                    }
+                    return response.json();
+                })
+                .then(page => {
+                    loaded += page.scorecards.length;
+                    onPage(page.scorecards);
+                    if (page.next_cursor && (numResults === "all" || loaded < numResults)) {
+                        return fetchPage(page.next_cursor);
+                    }
+                });
+        }
+
+        return fetchPage(null);
+    }
 
-            displayScorecardResults(data, par); // Pass 'par' to displayScorecardResults
+
+    function handleScorecardData(scorecards) {
+        console.log("Processing data:", scorecards);
+
+        if (scorecards.length === 0) {
+            return;
+        }
+
+        // Get selected names from dropdowns
+        const selectedPlayerName = elements.PLAYER_NAME.options[elements.PLAYER_NAME.selectedIndex].text;
+        const selectedCourseName = elements.COURSE_NAME.options[elements.COURSE_NAME.selectedIndex].text;
+        const selectedLayoutName = elements.LAYOUT_NAME.options[elements.LAYOUT_NAME.selectedIndex].text;
+
+        // Update player names and other details
+        scorecards.forEach(scorecard => {
+            scorecard.player_name = selectedPlayerName;
+            scorecard.course_name = selectedCourseName;
+            scorecard.layout_name = selectedLayoutName;
+        });
+
+        // The first page creates the table, later pages add rows to it
+        if (currentData.length === 0) {
+            displayScorecardResults(scorecards);
         } else {
-            console.error("Invalid data format or empty response:", data);
-            displayNoScorecardsMessage();
+            appendScorecardRows(scorecards);
         }
+        currentData = currentData.concat(scorecards);
     }
 
 
@@ -231,8 +253,13 @@ window.onload = function () {
         thead.appendChild(headerRow);
         table.appendChild(thead);
 
-        // Body creation...
-        let tbody = document.createElement("tbody");
+        table.appendChild(document.createElement("tbody"));
+        resultsDiv.appendChild(table);
+        appendScorecardRows(data);
+    }
+
+    function appendScorecardRows(data) {
+        let tbody = document.querySelector("#scorecard-table tbody");
         data.forEach((scorecard) => {
             let row = document.createElement("tr");
             ["player_name", "course_name", "layout_name", "total_score", "score_difference", "date"].forEach((property) => {
@@ -252,31 +279,22 @@ window.onload = function () {
             });
             tbody.appendChild(row);
         });
-        table.appendChild(tbody);
-
-        resultsDiv.appendChild(table);
     }
 
 
 
     function init() {
         console.log("Initializing...");
-        // Add event listener for player selection
-        elements.PLAYER_NAME.addEventListener("change", function () {
-            // Fetch courses for the selected player
-            fetchData(`/courses_for_player/${encodeURIComponent(selectedPlayerName)}`, elements.COURSE_NAME, "Select a Course")
-                .then(() => {
-                    // Continue with other initialization logic...
-                    elements.COURSE_NAME.addEventListener("change", updateLayouts);
-                    elements.LAYOUT_NAME.addEventListener("change", updatePlayers);
-                    elements.SCORECARD_FORM.addEventListener("submit", handleScorecardForm);
-                });
+        fetchBootstrap().then(() => {
+            if (!catalog) {
+                return;
+            }
+            populateSelect(elements.COURSE_NAME, catalog.courses, "Select a Course");
+            elements.COURSE_NAME.addEventListener("change", updateLayouts);
+            elements.LAYOUT_NAME.addEventListener("change", updatePlayers);
+            elements.PLAYER_NAME.addEventListener("change", updateCoursesForPlayer);
+            elements.SCORECARD_FORM.addEventListener("submit", handleScorecardForm);
         });
-    
-        // Delay the initial fetching of courses for all players
-        setTimeout(function () {
-            fetchData("/courses_for_all_players/", elements.COURSE_NAME, "Select a Course");
-        }, 0);
     }
     
 
@@ -0,0 +1,128 @@
+import time
+from sqlalchemy import and_, case, delete, exists, func, insert, select, tuple_
+from sqlalchemy.orm import aliased
+from models import db, Scorecard, HoleScore, LayoutHole, PlayerLayoutStats, PlayerLayoutHoleStats
+
+
+# (player_id, layout_id) pairs that have scorecards dated at or after `since`, or all pairs
+def touched_pairs(since=None):
+    pairs = select(Scorecard.player_id, Scorecard.layout_id).distinct()
+    if since is not None:
+        pairs = pairs.where(Scorecard.date >= since)
+    return pairs
+
+
+def complete_card():
+    # True for a card with a score on every hole of its layout. Abandoned cards have holes with
+    # 0 strokes, or fewer hole scores than the layout has holes; the summaries leave them out.
+    holes = aliased(HoleScore)
+    hole_count = select(func.count()).where(holes.scorecard_id == Scorecard.id).correlate(Scorecard)
+    layout_holes = select(func.count()).where(LayoutHole.layout_id == Scorecard.layout_id).correlate(Scorecard)
+    unplayed_hole = exists().where(holes.scorecard_id == Scorecard.id, holes.strokes <= 0).correlate(Scorecard)
+    return and_(hole_count.scalar_subquery() >= layout_holes.scalar_subquery(), ~unplayed_hole)
+
+
+def player_layout_summary(pairs):
+    # Every pair gets a row, so the player is listed on the layout even when all of their cards were
+    # abandoned; the bests and averages of such a pair are NULL
+    cards = (
+        select(
+            Scorecard.id,
+            Scorecard.player_id,
+            Scorecard.layout_id,
+            Scorecard.total_score,
+            Scorecard.score_difference,
+            Scorecard.date,
+            complete_card().label('complete'),
+        )
+        .where(tuple_(Scorecard.player_id, Scorecard.layout_id).in_(pairs))
+        .subquery()
+    )
+
+    def of_complete(column):
+        return case((cards.c.complete, column))
+
+    return (
+        select(
+            cards.c.player_id,
+            cards.c.layout_id,
+            func.count(of_complete(cards.c.id)),
+            func.min(of_complete(cards.c.total_score)),
+            func.min(of_complete(cards.c.score_difference)),
+            func.avg(of_complete(cards.c.total_score)),
+            func.avg(of_complete(cards.c.score_difference)),
+            func.max(cards.c.date),
+        )
+        .group_by(cards.c.player_id, cards.c.layout_id)
+    )
+
+
+def player_layout_hole_summary(pairs):
+    strokes = HoleScore.strokes
+    par = LayoutHole.par
+
+    def count_where(condition):
+        return func.sum(case((condition, 1), else_=0))
+
+    return (
+        select(
+            Scorecard.player_id,
+            Scorecard.layout_id,
+            HoleScore.hole_number,
+            func.count(HoleScore.id),
+            func.avg(strokes),
+            func.min(strokes),
+            count_where(strokes <= par - 2),
+            count_where(strokes == par - 1),
+            count_where(strokes == par),
+            count_where(strokes == par + 1),
+            count_where(strokes >= par + 2),
+        )
+        .select_from(HoleScore)
+        .join(Scorecard, Scorecard.id == HoleScore.scorecard_id)
+        .outerjoin(
+            LayoutHole,
+            (LayoutHole.layout_id == Scorecard.layout_id) & (LayoutHole.hole_number == HoleScore.hole_number),
+        )
+        .where(tuple_(Scorecard.player_id, Scorecard.layout_id).in_(pairs), complete_card())
+        .group_by(Scorecard.player_id, Scorecard.layout_id, HoleScore.hole_number)
+    )
+
+
+def refresh_statistics(since=None):
+    # Recompute the summaries of every player/layout pair touched since the given timestamp.
+    # Without a timestamp all summaries are rebuilt. Errors are raised again after the rollback, so
+    # a failed refresh fails the import before it is recorded.
+    start_time = time.perf_counter()
+    pairs = touched_pairs(since)
+    try:
+        for model in (PlayerLayoutStats, PlayerLayoutHoleStats):
+            stale = delete(model)
+            if since is not None:
+                stale = stale.where(tuple_(model.player_id, model.layout_id).in_(pairs))
+            db.session.execute(stale, execution_options={'synchronize_session': False})
+
+        db.session.execute(
+            insert(PlayerLayoutStats).from_select(
+                [
+                    'player_id', 'layout_id', 'rounds_played', 'best_total_score', 'best_score_difference',
+                    'average_total_score', 'average_score_difference', 'last_played',
+                ],
+                player_layout_summary(pairs),
+            )
+        )
+        db.session.execute(
+            insert(PlayerLayoutHoleStats).from_select(
+                [
+                    'player_id', 'layout_id', 'hole_number', 'rounds_played', 'average_strokes', 'best_strokes',
+                    'eagles', 'birdies', 'pars', 'bogeys', 'double_bogeys',
+                ],
+                player_layout_hole_summary(pairs),
+            )
+        )
+        db.session.commit()
+        print(f"Statistics refreshed in {time.perf_counter() - start_time:.2f}s")
+    except Exception as e:
+        print("Error refreshing statistics:", str(e))
+        db.session.rollback()
+        raise
@@ -0,0 +1,162 @@
+import json
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+
+# The app modules live in the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# dgs creates its app on import, so the test databases are configured before that
+DATA_DIR = tempfile.mkdtemp(prefix='dgs-tests-')
+os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(DATA_DIR, 'statistics.db')
+os.environ['FLASK_SQLALCHEMY_BINDS'] = json.dumps({'users': 'sqlite:///' + os.path.join(DATA_DIR, 'users.db')})
+os.environ['FLASK_IMPORT_REPORT_DIR'] = os.path.join(DATA_DIR, 'import_reports')
+# The caches check for imports on every request
+for setting in ['RESPONSE_CACHE', 'SCORE_STORE', 'SCORE_MAP', 'HOLE_ANALYTICS', 'SEARCH_INDEX']:
+    os.environ[f'FLASK_{setting}_CHECK_INTERVAL'] = '0'
+
+# The UDisc export shipped with the repository
+EXPORT = os.path.join(ROOT, 'UDisc Scorecards.csv')
+
+
+def write_export(filename, pars, cards, course='Testirata', layout='Main'):
+    # A UDisc export of rounds on one layout. `cards` are (player, date, strokes per hole); every
+    # round also gets its 'Par' row, like in a real export.
+    import pandas as pd
+
+    rows = []
+    for date in sorted({date for _, date, _ in cards}):
+        for player, strokes in [('Par', pars)] + [(player, strokes) for player, day, strokes in cards if day == date]:
+            row = {
+                'PlayerName': player,
+                'CourseName': course,
+                'LayoutName': layout,
+                'Päivämäärä': date.strftime('%Y-%m-%d %H%M'),
+                'Kaikki': sum(strokes),
+                '+/-': None if player == 'Par' else sum(strokes) - sum(pars),
+            }
+            row.update({f'Hole{hole_number}': value for hole_number, value in enumerate(strokes, 1)})
+            rows.append(row)
+    columns = ['PlayerName', 'CourseName', 'LayoutName', 'Päivämäärä', 'Kaikki', '+/-']
+    pd.DataFrame(rows, columns=columns + [f'Hole{hole_number}' for hole_number in range(1, 25)]).to_csv(
+        filename, index=False
+    )
+    return str(filename)
+
+
+def imported_rows():
+    # Everything an import writes, by name instead of id
+    from models import db, Player, Course, Layout, LayoutHole, Round, Scorecard, HoleScore
+
+    holes = {}
+    for scorecard_id, hole_number, strokes in db.session.query(
+        HoleScore.scorecard_id, HoleScore.hole_number, HoleScore.strokes
+    ):
+        holes.setdefault(scorecard_id, {})[hole_number] = strokes
+    scorecards = sorted(
+        (player, course, layout, str(date), total_score, score_difference, sorted(holes.get(scorecard_id, {}).items()))
+        for scorecard_id, player, course, layout, date, total_score, score_difference in db.session.query(
+            Scorecard.id, Player.name, Course.name, Layout.name, Round.date, Scorecard.total_score,
+            Scorecard.score_difference,
+        )
+        .join(Player, Player.id == Scorecard.player_id)
+        .join(Round, Round.id == Scorecard.round_id)
+        .join(Layout, Layout.id == Round.layout_id)
+        .join(Course, Course.id == Layout.course_id)
+    )
+    pars = sorted(
+        db.session.query(Course.name, Layout.name, LayoutHole.hole_number, LayoutHole.par)
+        .join(Layout, Layout.id == LayoutHole.layout_id)
+        .join(Course, Course.id == Layout.course_id)
+    )
+    counts = {model.__tablename__: db.session.query(model).count() for model in [Player, Course, Layout, Round]}
+    return counts, pars, scorecards
+
+
+# The PostgreSQL tests run against this database when it is set, e.g.
+# DGS_TEST_POSTGRESQL_URI=postgresql+psycopg://postgres@localhost/dgs_test. Its tables are dropped.
+POSTGRESQL_URI = os.environ.get('DGS_TEST_POSTGRESQL_URI')
+
+
+@contextmanager
+def empty_database(app):
+    # An app context with empty tables
+    from models import db
+    from data_loader import layout_cache
+    from response_cache import response_cache
+    from score_store import score_store
+    from score_map import score_map
+    from hole_analytics import hole_analytics
+    from search_index import search_index
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        # The in-memory caches outlive the database of each test
+        layout_cache.invalidate()
+        for cache in [response_cache, score_store, score_map, hole_analytics, search_index]:
+            cache.__init__()
+            cache.init_app(app)
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def app():
+    # The Flask app on SQLite with empty tables, inside an app context
+    from dgs import app
+
+    with empty_database(app):
+        yield app
+
+
+@pytest.fixture
+def postgresql_app(monkeypatch):
+    # An app like the one in dgs.py on PostgreSQL, with empty tables. It has no routes.
+    if not POSTGRESQL_URI:
+        pytest.skip('DGS_TEST_POSTGRESQL_URI is not set')
+    from dgs import create_app
+
+    monkeypatch.setenv('FLASK_SQLALCHEMY_DATABASE_URI', POSTGRESQL_URI)
+    with empty_database(create_app()) as app:
+        yield app
+
+
+@pytest.fixture(params=['sqlite', 'postgresql'])
+def loader_app(request):
+    # The loader tests run on both storage backends
+    return request.getfixturevalue('app' if request.param == 'sqlite' else 'postgresql_app')
+
+
+@pytest.fixture
+def loaded_app(app):
+    # The app with the shipped export imported
+    from data_loader import load_data
+
+    load_data(EXPORT, bulk=True)
+    return app
+
+
+@pytest.fixture
+def count_queries():
+    # count_queries() collects the SQL statements run on the statistics database inside the block
+    from models import db
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    return counter
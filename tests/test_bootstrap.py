@@ -0,0 +1,57 @@
+from datetime import datetime
+from conftest import write_export
+from data_loader import load_data
+from models import db, Player, Course, Layout, LayoutHole, Round, Scorecard
+
+START = datetime(2023, 5, 1, 18, 0)
+
+
+def test_bootstrap_lists_courses_layouts_and_players(app, tmp_path):
+    exports = [
+        ('Testirata', 'Main', [3] * 9, [('Sami', START, [3] * 9)]),
+        ('Kivikko', 'Main', [3] * 9, [('Sami', START, [4] * 9), ('Sointu', START, [3] * 9)]),
+        ('Kivikko', 'Long', [3, 4, 5] * 6, [('Sointu', START, [3, 4, 5] * 6)]),
+    ]
+    for number, (course, layout, pars, cards) in enumerate(exports):
+        load_data(write_export(tmp_path / f'{number}.csv', pars, cards, course, layout), bulk=True)
+    ids = {player.name: player.id for player in Player.query}
+    layout_ids = {
+        (course.name, layout.name): layout.id
+        for layout, course in Layout.query.join(Course, Course.id == Layout.course_id).add_entity(Course)
+    }
+
+    catalog = app.test_client().get('/bootstrap').get_json()
+
+    assert set(catalog) == {'courses', 'players'}
+    assert [course['name'] for course in catalog['courses']] == ['Kivikko', 'Testirata']
+    kivikko = catalog['courses'][0]
+    assert kivikko['id'] == Course.query.filter_by(name='Kivikko').one().id
+    # The 'Par' cards are listed like a player, as the form has always done
+    assert kivikko['layouts'] == [
+        {'id': layout_ids[('Kivikko', 'Long')], 'name': 'Long', 'par': [3, 4, 5] * 6,
+         'players': sorted([ids['Par'], ids['Sointu']])},
+        {'id': layout_ids[('Kivikko', 'Main')], 'name': 'Main', 'par': [3] * 9,
+         'players': sorted([ids['Par'], ids['Sami'], ids['Sointu']])},
+    ]
+    assert catalog['courses'][1]['layouts'][0]['players'] == sorted([ids['Par'], ids['Sami']])
+
+    # Every player id of a layout resolves to a listed player, sorted by name
+    players = {player['id']: player['name'] for player in catalog['players']}
+    assert [player['name'] for player in catalog['players']] == sorted(players.values())
+    assert set(players.values()) == {'Par', 'Sami', 'Sointu'}
+    for course in catalog['courses']:
+        for layout in course['layouts']:
+            assert set(layout['players']) <= set(players)
+
+
+def test_bootstrap_matches_the_export(loaded_app):
+    catalog = loaded_app.test_client().get('/bootstrap').get_json()
+    layouts = [layout for course in catalog['courses'] for layout in course['layouts']]
+
+    played_courses = db.session.query(Round.course_id).distinct()
+    assert {course['id'] for course in catalog['courses']} == {course_id for (course_id,) in played_courses}
+    for layout in layouts:
+        played = db.session.query(Scorecard.player_id).filter(Scorecard.layout_id == layout['id']).distinct()
+        assert layout['players'] == sorted(player_id for (player_id,) in played), layout['name']
+        pars = LayoutHole.query.filter_by(layout_id=layout['id']).order_by(LayoutHole.hole_number)
+        assert layout['par'] == [hole.par for hole in pars]
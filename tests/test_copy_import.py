@@ -0,0 +1,18 @@
+from conftest import EXPORT, imported_rows
+from data_loader import load_data
+from import_telemetry import telemetry
+
+
+def test_copy_import_matches_the_chunked_import(app, postgresql_app):
+    # postgresql_app's context is the current one; the chunked import runs on SQLite
+    load_data(EXPORT, bulk=True)
+    assert telemetry.last_report['mode'] == 'copy'
+    assert telemetry.last_report['status'] == 'ok', telemetry.last_report['error']
+    copied = imported_rows()
+    copy_rows = telemetry.last_report['rows']
+
+    with app.app_context():
+        load_data(EXPORT, bulk=True)
+        assert telemetry.last_report['mode'] == 'bulk'
+        assert telemetry.last_report['rows'] == copy_rows
+        assert imported_rows() == copied
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+import pandas as pd
+import pytest
+import hole_analytics
+from conftest import write_export
+from data_loader import load_data
+from hole_analytics import LayoutAnalytics
+from models import db, Player, LayoutHole, Scorecard, HoleScore
+from score_store import DISTRIBUTION_MIN, DISTRIBUTION_MAX
+
+
+def busiest_layout():
+    return (
+        db.session.query(Scorecard.layout_id).group_by(Scorecard.layout_id)
+        .order_by(db.func.count(Scorecard.id).desc()).limit(1).scalar()
+    )
+
+
+def hole_scores(layout_id):
+    # Hole scores of the real players' complete cards with the hole's par
+    scores = pd.read_sql(
+        db.session.query(
+            Scorecard.id.label('scorecard_id'), Scorecard.player_id, HoleScore.hole_number, HoleScore.strokes,
+            LayoutHole.par,
+        )
+        .join(Scorecard, Scorecard.id == HoleScore.scorecard_id)
+        .join(Player, Player.id == Scorecard.player_id)
+        .join(LayoutHole, (LayoutHole.layout_id == Scorecard.layout_id)
+              & (LayoutHole.hole_number == HoleScore.hole_number))
+        .filter(Scorecard.layout_id == layout_id, Player.name != 'Par')
+        .statement,
+        db.session.connection(),
+    )
+    holes = LayoutHole.query.filter_by(layout_id=layout_id).count()
+    cards = scores.groupby('scorecard_id')['strokes'].agg(['min', 'size'])
+    complete = cards.index[(cards['min'] > 0) & (cards['size'] == holes)]
+    return scores[scores['scorecard_id'].isin(complete)]
+
+
+def test_holes_match_a_direct_computation(loaded_app):
+    layout_id = busiest_layout()
+    analytics = LayoutAnalytics.from_database(layout_id)
+    scores = hole_scores(layout_id)
+
+    for hole in analytics.holes:
+        strokes = scores[scores['hole_number'] == hole['hole_number']]
+        assert hole['rounds'] == len(strokes)
+        assert hole['average_strokes'] == pytest.approx(strokes['strokes'].mean())
+        assert hole['stdev'] == pytest.approx(strokes['strokes'].std(ddof=0))
+        offsets = (strokes['strokes'] - strokes['par']).clip(DISTRIBUTION_MIN, DISTRIBUTION_MAX)
+        assert hole['distribution'] == [
+            int((offsets == offset).sum()) for offset in range(DISTRIBUTION_MIN, DISTRIBUTION_MAX + 1)
+        ]
+
+    # Strokes gained: the field average minus the player's average on each hole
+    player_id, player_scores = next(iter(scores.groupby('player_id')))
+    averages = player_scores.groupby('hole_number')['strokes'].mean()
+    expected = [hole['average_strokes'] - averages[hole['hole_number']] for hole in analytics.holes]
+    assert analytics.strokes_gained[player_id] == pytest.approx(expected)
+
+
+def test_small_batches_add_up_to_the_same_result(loaded_app, monkeypatch):
+    layout_id = busiest_layout()
+    whole = LayoutAnalytics.from_database(layout_id)
+    monkeypatch.setattr(hole_analytics, 'HOLE_BATCH_SIZE', 7)
+    batched = LayoutAnalytics.from_database(layout_id)
+
+    for hole, batched_hole in zip(whole.holes, batched.holes):
+        assert batched_hole == pytest.approx(hole)
+    assert batched.strokes_gained.keys() == whole.strokes_gained.keys()
+    for player_id, gained in whole.strokes_gained.items():
+        assert batched.strokes_gained[player_id] == pytest.approx(gained, nan_ok=True)
+
+
+def test_offsets_match_the_score_store(loaded_app):
+    response = loaded_app.test_client().get(f'/hole_analytics/{busiest_layout()}')
+    analytics = response.get_json()
+    assert analytics['offsets'] == list(range(DISTRIBUTION_MIN, DISTRIBUTION_MAX + 1))
+    assert all(len(hole['distribution']) == len(analytics['offsets']) for hole in analytics['holes'])
+
+
+def test_abandoned_cards_are_left_out(app, tmp_path):
+    start = datetime(2023, 5, 1, 18, 0)
+    cards = [
+        ('Sami', start, [4, 3, 3]),
+        ('Sointu', start, [2, 3, 3]),
+        # Abandoned after the first hole, the others are scored 0
+        ('Sami', start + timedelta(days=1), [3, 0, 0]),
+    ]
+    load_data(write_export(tmp_path / 'rounds.csv', [3, 3, 3], cards), bulk=True)
+    analytics = LayoutAnalytics.from_database(LayoutHole.query.first().layout_id)
+
+    assert [hole['rounds'] for hole in analytics.holes] == [2, 2, 2]
+    assert [hole['average_to_par'] for hole in analytics.holes] == [0.0, 0.0, 0.0]
+    # Only the birdie and the bogey on the first hole, no eagles from the 0-stroke holes
+    offsets = list(range(DISTRIBUTION_MIN, DISTRIBUTION_MAX + 1))
+    assert analytics.holes[0]['distribution'][offsets.index(-1)] == 1
+    assert analytics.holes[0]['distribution'][offsets.index(1)] == 1
+    assert analytics.holes[1]['distribution'][offsets.index(0)] == 2
+
+
+def test_export_has_no_zero_stroke_averages(loaded_app):
+    abandoned = db.session.query(Scorecard.layout_id).join(HoleScore, HoleScore.scorecard_id == Scorecard.id)
+    for (layout_id,) in abandoned.filter(HoleScore.strokes <= 0).distinct():
+        for hole in LayoutAnalytics.from_database(layout_id).holes:
+            assert hole['average_strokes'] >= 1, (layout_id, hole['hole_number'])
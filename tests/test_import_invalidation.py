@@ -0,0 +1,46 @@
+import pandas as pd
+from conftest import EXPORT
+from data_loader import load_files
+from hole_analytics import hole_analytics
+from models import db, Course, Layout, get_import_state
+from search_index import search_index
+
+
+def older_rounds(tmp_path):
+    # The first round of the export again, dated years earlier: once on its own course and once
+    # on a course of its own
+    df = pd.read_csv(EXPORT)
+    first_round = df[df['Päivämäärä'] == df['Päivämäärä'].iloc[0]]
+    first_round = first_round[first_round['PlayerName'].isin(['Par', 'Sami'])]
+    moved = first_round.assign(CourseName='Vanha Rata')
+    rounds = pd.concat([first_round, moved]).assign(**{'Päivämäärä': '2001-06-01 1200'})
+    filename = tmp_path / 'older.csv'
+    rounds.to_csv(filename, index=False)
+    return str(filename), first_round['CourseName'].iloc[0], first_round['LayoutName'].iloc[0]
+
+
+def test_full_import_of_older_rounds_refreshes_the_caches(loaded_app, tmp_path):
+    filename, course_name, layout_name = older_rounds(tmp_path)
+    layout_id = (
+        db.session.query(Layout.id).join(Course, Course.id == Layout.course_id)
+        .filter(Course.name == course_name, Layout.name == layout_name).scalar()
+    )
+    client = loaded_app.test_client()
+    assert 'Vanha Rata' not in client.get('/courses_for_player/Sami').get_json()
+    assert search_index.search('vanha') == []
+    rounds = hole_analytics.get(layout_id).holes[0]['rounds']
+    timestamp, generation, _ = get_import_state()
+
+    load_files([filename], workers=1, incremental=False)
+
+    # The timestamp stays put, the generation tells the caches that anything may have changed
+    assert get_import_state() == (timestamp, generation + 1, None)
+    assert 'Vanha Rata' in client.get('/courses_for_player/Sami').get_json()
+    assert [match['name'] for match in search_index.search('vanha', kinds=['course'])] == ['Vanha Rata']
+    assert hole_analytics.get(layout_id).holes[0]['rounds'] == rounds + 1
+
+
+def test_incremental_import_records_where_it_started(loaded_app, tmp_path):
+    timestamp, generation, _ = get_import_state()
+    load_files([EXPORT], workers=1)
+    assert get_import_state() == (timestamp, generation + 1, timestamp)
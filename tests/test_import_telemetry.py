@@ -0,0 +1,78 @@
+import importlib
+import json
+import os
+import pandas as pd
+import pytest
+from conftest import EXPORT
+from data_loader import load_data
+from import_telemetry import telemetry
+from models import get_import_state
+
+
+def test_report_accounts_for_every_row(app):
+    load_data(EXPORT, bulk=True)
+    report = telemetry.last_report
+    assert report['status'] == 'ok'
+    rows = report['rows']
+    assert rows['read'] == len(pd.read_csv(EXPORT))
+    assert rows['read'] == (
+        rows['skipped_before_last_import'] + rows['rejected'] + rows['superseded'] + rows['imported']
+    )
+    assert {'csv_parse', 'entity_resolution', 'scorecard_upsert', 'hole_insert', 'statistics'} <= set(report['stages'])
+
+    directory = app.config['IMPORT_REPORT_DIR']
+    newest = max(os.listdir(directory))
+    with open(os.path.join(directory, newest)) as f:
+        assert json.load(f)['rows'] == rows
+
+
+@pytest.mark.parametrize('mode', ['row', 'bulk', 'stream'])
+def test_rows_with_missing_holes_are_rejected_with_samples(app, tmp_path, mode):
+    df = pd.read_csv(EXPORT)
+    first_round = df[df['Päivämäärä'] == df['Päivämäärä'].iloc[0]].copy()
+    player = first_round.index[first_round['PlayerName'] != 'Par'][0]
+    first_round.loc[player, 'Hole3'] = None
+    filename = tmp_path / 'missing.csv'
+    first_round.to_csv(filename, index=False)
+
+    load_data(str(filename), bulk=mode == 'bulk', stream=mode == 'stream')
+    report = telemetry.last_report
+    assert report['rows']['rejected'] == 1
+    assert report['rows']['imported'] == len(first_round) - 1
+    [sample] = report['rejected']['missing_holes']['samples']
+    assert sample['player'].strip() == first_round.loc[player, 'PlayerName'].strip()
+    assert sample['missing_holes'] == [3]
+
+
+def test_failed_import_records_the_error(app, tmp_path):
+    load_data(str(tmp_path / 'missing.csv'), bulk=True)
+    report = telemetry.last_report
+    assert report['status'] == 'failed'
+    assert report['error']['type'] == 'FileNotFoundError'
+    assert 'Traceback' in report['error']['traceback']
+
+
+@pytest.mark.parametrize('summary', ['stats.player_layout_summary', 'ratings.best_of_recent', 'trends.monthly_summary'])
+def test_failed_refresh_fails_the_import(app, tmp_path, monkeypatch, summary):
+    df = pd.read_csv(EXPORT)
+    first_day = df['Päivämäärä'].str[:10] == df['Päivämäärä'].iloc[0][:10]
+    df[first_day].to_csv(tmp_path / 'first.csv', index=False)
+    load_data(str(tmp_path / 'first.csv'), bulk=True)
+    state = get_import_state()
+
+    def fail(*args):
+        raise RuntimeError('refresh failed')
+
+    module, name = summary.split('.')
+    monkeypatch.setattr(importlib.import_module(module), name, fail)
+    load_data(EXPORT, bulk=True)
+    report = telemetry.last_report
+    assert report['status'] == 'failed'
+    assert report['error']['message'] == 'refresh failed'
+    # The import is not recorded, so the caches keep their state and the next import reads the rows again
+    assert get_import_state() == state
+
+    monkeypatch.undo()
+    load_data(EXPORT, bulk=True)
+    assert telemetry.last_report['status'] == 'ok'
+    assert get_import_state()[1] == state[1] + 1
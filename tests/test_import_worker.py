@@ -0,0 +1,58 @@
+import os
+import shutil
+import time
+from conftest import EXPORT
+from import_worker import import_pending, import_worker
+from models import db, Scorecard
+
+
+def test_worker_starts_with_the_first_request(app, tmp_path, monkeypatch):
+    from dgs import create_app
+
+    drop = tmp_path / 'drop'
+    monkeypatch.setenv('FLASK_IMPORT_DROP_DIR', str(drop))
+    monkeypatch.setenv('FLASK_IMPORT_POLL_INTERVAL', '1')
+    monkeypatch.setattr(import_worker, 'stop_event', None)
+    web_app = create_app()
+    assert import_worker.stop_event is None
+
+    try:
+        web_app.test_client().get('/')
+        assert import_worker.stop_event is not None
+
+        # An export that has not been modified for a while is picked up by the next scan
+        export = drop / 'export.csv'
+        shutil.copy(EXPORT, export)
+        past = time.time() - 60
+        os.utime(export, (past, past))
+        deadline = time.monotonic() + 60
+        while not (drop / 'processed' / 'export.csv').exists() and time.monotonic() < deadline:
+            time.sleep(0.2)
+        assert (drop / 'processed' / 'export.csv').exists()
+        db.session.rollback()
+        assert Scorecard.query.count() > 0
+    finally:
+        import_worker.stop_event.set()
+
+
+def test_failed_files_are_skipped_until_they_change(app, tmp_path, monkeypatch):
+    drop = tmp_path / 'drop'
+    drop.mkdir()
+    reports = tmp_path / 'reports'
+    monkeypatch.setitem(app.config, 'IMPORT_REPORT_DIR', str(reports))
+    export = drop / 'export.csv'
+    export.write_text('PlayerName,CourseName\nSami,Testirata\n')
+
+    failed = {}
+    import_pending(str(drop), settle_seconds=0, failed=failed)
+    import_pending(str(drop), settle_seconds=0, failed=failed)
+    assert list(failed) == [str(export)]
+    assert len(os.listdir(reports)) == 1
+
+    # The fixed export is imported on the next poll
+    shutil.copy(EXPORT, export)
+    import_pending(str(drop), settle_seconds=0, failed=failed)
+    assert failed == {}
+    assert (drop / 'processed' / 'export.csv').exists()
+    assert len(os.listdir(reports)) == 2
+    assert Scorecard.query.count() > 0
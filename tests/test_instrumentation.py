@@ -0,0 +1,74 @@
+import json
+import logging
+import re
+import pytest
+from flask import jsonify
+from instrumentation import instrumentation
+from models import Player, Course
+
+
+def probe():
+    # Exactly two SQL statements
+    return jsonify(players=Player.query.count(), courses=Course.query.count())
+
+
+@pytest.fixture
+def instrumented_app(app, monkeypatch):
+    # A second app with instrumentation on; the singleton is restored afterwards
+    from dgs import create_app, metrics
+
+    monkeypatch.setenv('FLASK_INSTRUMENTATION_ENABLED', 'true')
+    monkeypatch.setenv('FLASK_INSTRUMENTATION_LOG_STATEMENTS', 'true')
+    for name in ['enabled', 'log_statements', 'logger']:
+        monkeypatch.setattr(instrumentation, name, getattr(instrumentation, name))
+    monkeypatch.setattr(instrumentation, 'routes', {})
+    web_app = create_app()
+    web_app.add_url_rule('/probe', view_func=probe)
+    web_app.add_url_rule('/metrics', view_func=metrics)
+    return web_app
+
+
+def test_metrics_are_not_found_when_disabled(app):
+    assert not instrumentation.enabled
+    assert app.test_client().get('/metrics').status_code == 404
+
+
+def test_server_timing_and_request_log(instrumented_app, caplog):
+    with caplog.at_level(logging.INFO):
+        response = instrumented_app.test_client().get('/probe?x=1')
+    assert response.status_code == 200
+
+    timing = response.headers['Server-Timing']
+    assert re.fullmatch(
+        r'db;dur=[\d.]+;desc="2 queries", app;dur=[\d.]+, total;dur=[\d.]+', timing
+    ), timing
+    durations = dict(re.findall(r'(\w+);dur=([\d.]+)', timing))
+    assert float(durations['total']) >= float(durations['db'])
+
+    [record] = [json.loads(message) for message in caplog.messages if message.startswith('{')]
+    assert {key: record[key] for key in ['method', 'route', 'path', 'status', 'queries']} == {
+        'method': 'GET', 'route': '/probe', 'path': '/probe?x=1', 'status': 200, 'queries': 2,
+    }
+    assert [statement['sql'].split()[0] for statement in record['statements']] == ['SELECT', 'SELECT']
+
+
+def test_metrics_in_prometheus_format(instrumented_app):
+    client = instrumented_app.test_client()
+    client.get('/probe')
+    client.get('/probe')
+    client.get('/missing')
+
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    lines = response.get_data(as_text=True).splitlines()
+    labels = 'method="GET",route="/probe"'
+    assert f'dgs_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in lines
+    assert f'dgs_request_duration_seconds_count{{{labels}}} 2' in lines
+    assert f'dgs_request_queries_total{{{labels}}} 4' in lines
+    assert f'dgs_request_duration_seconds_count{{method="GET",route="<unmatched>"}} 1' in lines
+
+    # The buckets are cumulative
+    prefix = 'dgs_request_duration_seconds_bucket{' + labels
+    buckets = [int(line.rsplit(' ', 1)[1]) for line in lines if line.startswith(prefix)]
+    assert buckets == sorted(buckets)
+    assert all(line.startswith('#') or re.fullmatch(r'\w+\{[^}]*\} [\d.]+', line) for line in lines)
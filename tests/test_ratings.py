@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+from conftest import write_export
+from data_loader import load_data
+from models import db, Player, Scorecard, HoleScore, PlayerRating, PlayerLayoutHandicap
+from ratings import refresh_ratings, RATING_RECENT_ROUNDS, RATING_BEST_ROUNDS
+
+# A 9-hole layout, so ratings are the handicaps scaled to 18 holes
+PARS = [3] * 9
+START = datetime(2023, 5, 1, 18, 0)
+
+
+def strokes(over_par):
+    # Birdies from the first hole on, or every stroke over par on the first hole
+    holes = list(PARS)
+    if over_par >= 0:
+        holes[0] += over_par
+    for hole in range(-over_par):
+        holes[hole] -= 1
+    return holes
+
+
+def rounds(over_pars):
+    # One card per day
+    return [('Sami', START + timedelta(days=day), strokes(over_par)) for day, over_par in enumerate(over_pars)]
+
+
+def best_of_recent(over_pars):
+    recent = over_pars[-RATING_RECENT_ROUNDS:]
+    return sum(sorted(recent)[:RATING_BEST_ROUNDS]) / RATING_BEST_ROUNDS
+
+
+def rating(player_name):
+    return PlayerRating.query.join(Player, Player.id == PlayerRating.player_id).filter(Player.name == player_name).one()
+
+
+def handicap(player_name):
+    return (
+        PlayerLayoutHandicap.query.join(Player, Player.id == PlayerLayoutHandicap.player_id)
+        .filter(Player.name == player_name).one()
+    )
+
+
+def test_best_rounds_of_the_recent_ones(app, tmp_path):
+    # The oldest rounds are the best ones, but they are no longer recent
+    over_pars = [-4, -4, -4, -4, -4] + [(day * 7) % 11 - 3 for day in range(RATING_RECENT_ROUNDS)]
+    load_data(write_export(tmp_path / 'rounds.csv', PARS, rounds(over_pars)), bulk=True)
+
+    expected = best_of_recent(over_pars)
+    assert handicap('Sami').handicap == expected
+    assert handicap('Sami').rounds_counted == RATING_BEST_ROUNDS
+    assert handicap('Sami').rounds_considered == RATING_RECENT_ROUNDS
+    assert rating('Sami').rating == expected * 2
+
+
+def test_incremental_refresh_matches_a_rebuild(app, tmp_path):
+    over_pars = [(day * 5) % 9 - 2 for day in range(30)]
+    cards = rounds(over_pars)
+    load_data(write_export(tmp_path / 'first.csv', PARS, cards[:12]), bulk=True)
+    load_data(write_export(tmp_path / 'second.csv', PARS, cards[12:]), bulk=True)
+    incremental = handicap('Sami').handicap
+    refresh_ratings()
+    assert handicap('Sami').handicap == incremental == best_of_recent(over_pars)
+
+
+def test_incomplete_cards_are_not_rated(app, tmp_path):
+    over_pars = [1, 2, 0, 3, 1, 2, 4, 0, 1, 2]
+    # Abandoned after the first hole: the other holes have 0 strokes and the total is far under par
+    abandoned = ('Sami', START + timedelta(days=len(over_pars)), [3] + [0] * 8)
+    load_data(write_export(tmp_path / 'rounds.csv', PARS, rounds(over_pars) + [abandoned]), bulk=True)
+    assert handicap('Sami').handicap == best_of_recent(over_pars)
+    assert handicap('Sami').rounds_considered == len(over_pars)
+
+    # A card with fewer hole scores than the layout has holes is not rated either; the oldest is
+    # one of the complete cards, not the abandoned one
+    short = (
+        Scorecard.query.join(Player, Player.id == Scorecard.player_id)
+        .filter(Player.name == 'Sami').order_by(Scorecard.date).first()
+    )
+    HoleScore.query.filter_by(scorecard_id=short.id, hole_number=9).delete()
+    db.session.commit()
+    refresh_ratings()
+    assert handicap('Sami').rounds_considered == len(over_pars) - 1
+
+
+def test_abandoned_cards_in_the_export_are_not_rated(loaded_app):
+    # The export has cards with 0 strokes on most holes; a pair with only such cards has no handicap
+    unplayed = db.session.query(HoleScore.scorecard_id).filter(HoleScore.strokes == 0)
+    complete_pairs = set(
+        db.session.query(Scorecard.player_id, Scorecard.layout_id).filter(~Scorecard.id.in_(unplayed)).distinct()
+    )
+    assert unplayed.count() > 0
+    assert set(db.session.query(PlayerLayoutHandicap.player_id, PlayerLayoutHandicap.layout_id)) <= complete_pairs
+    assert db.session.query(db.func.min(PlayerLayoutHandicap.handicap)).scalar() > -20
@@ -0,0 +1,56 @@
+from datetime import datetime
+import pytest
+from conftest import EXPORT
+from data_loader import load_data, load_files
+from import_telemetry import telemetry
+from models import db, MetaData, Player, Course, Layout, LayoutHole, Round, Scorecard, HoleScore
+from models import PlayerLayoutStats
+
+
+TABLES = [Player, Course, Layout, LayoutHole, Round, Scorecard, HoleScore, PlayerLayoutStats]
+
+# On PostgreSQL 'bulk' is the COPY import
+IMPORTS = {
+    'row': lambda filename: load_data(filename),
+    'bulk': lambda filename: load_data(filename, bulk=True),
+    'stream': lambda filename: load_data(filename, stream=True),
+    'files': lambda filename: load_files([filename], workers=1),
+    'files_full': lambda filename: load_files([filename], workers=1, incremental=False),
+}
+
+# The row-by-row import commits every row, so it only gets the first lines of the export
+ROW_MODE_LINES = 200
+
+
+def row_counts():
+    return {model.__tablename__: db.session.query(model).count() for model in TABLES}
+
+
+def import_ok(mode, filename):
+    IMPORTS[mode](filename)
+    assert telemetry.last_report['status'] == 'ok', telemetry.last_report['error']
+
+
+@pytest.mark.parametrize('mode', IMPORTS)
+def test_reimporting_the_same_export_changes_nothing(loader_app, tmp_path, mode):
+    filename = EXPORT
+    if mode == 'row':
+        filename = tmp_path / 'excerpt.csv'
+        with open(EXPORT, encoding='utf-8') as f:
+            filename.write_text(''.join(f.readlines()[:ROW_MODE_LINES + 1]), encoding='utf-8')
+        filename = str(filename)
+
+    import_ok(mode, filename)
+    imported = row_counts()
+    assert imported['scorecard'] > 0 and imported['hole_score'] > 0
+
+    # Only the rows from the last timestamp onwards are read again
+    import_ok(mode, filename)
+    assert row_counts() == imported
+
+    # With the timestamp rewound every row goes through the upserts again
+    MetaData.query.first().last_processed_timestamp = datetime.min
+    db.session.commit()
+    import_ok(mode, filename)
+    assert telemetry.last_report['rows']['imported'] > 0
+    assert row_counts() == imported
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from conftest import write_export
+from data_loader import load_data
+from models import get_import_state
+from response_cache import response_cache
+
+PARS = [3] * 9
+START = datetime(2023, 5, 1, 18, 0)
+
+
+def load_rounds(tmp_path, name, cards, course='Testirata'):
+    load_data(write_export(tmp_path / name, PARS, cards, course), bulk=True)
+
+
+def cached_paths():
+    return [key.rstrip('?') for key in response_cache.entries]
+
+
+def test_conditional_requests(app, tmp_path):
+    load_rounds(tmp_path, 'rounds.csv', [('Sami', START, PARS)])
+    client = app.test_client()
+
+    response = client.get('/courses_for_player/Sami')
+    assert response.get_json() == ['Testirata']
+    etag = response.headers['ETag']
+    assert response.last_modified.replace(tzinfo=None) == get_import_state()[0]
+    assert 'no-cache' in response.headers['Cache-Control']
+
+    revalidated = client.get('/courses_for_player/Sami', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.get_data() == b''
+    assert client.get('/courses_for_player/Sami', headers={'If-None-Match': '"stale"'}).status_code == 200
+    since = client.get('/courses_for_player/Sami', headers={'If-Modified-Since': response.headers['Last-Modified']})
+    assert since.status_code == 304
+
+
+def test_least_recently_used_entries_are_evicted(app, tmp_path, monkeypatch):
+    load_rounds(tmp_path, 'rounds.csv', [('Sami', START, PARS), ('Sointu', START, PARS), ('Eero', START, PARS)])
+    monkeypatch.setattr(response_cache, 'max_size', 2)
+    client = app.test_client()
+
+    client.get('/courses_for_player/Sami')
+    client.get('/courses_for_player/Sointu')
+    hits = response_cache.hits
+    client.get('/courses_for_player/Sami')
+    assert response_cache.hits == hits + 1
+
+    client.get('/courses_for_player/Eero')
+    assert cached_paths() == ['/courses_for_player/Sami', '/courses_for_player/Eero']
+    assert response_cache.tagged_keys.keys() == {'player:Sami', 'player:Eero'}
+
+
+def test_incremental_import_drops_the_touched_entries(app, tmp_path):
+    load_rounds(tmp_path, 'first.csv', [('Sami', START, PARS), ('Sointu', START, PARS)])
+    client = app.test_client()
+    client.get('/courses_for_player/Sami')
+    client.get('/courses_for_player/Sointu')
+    client.get('/courses_for_all_players/')
+
+    # A newer round of Sami on another course
+    load_rounds(tmp_path, 'second.csv', [('Sami', START + timedelta(days=1), PARS)], course='Kivikko')
+    client.get('/courses_for_player/Sointu')
+    assert cached_paths() == ['/courses_for_player/Sointu']
+
+    hits = response_cache.hits
+    assert sorted(client.get('/courses_for_player/Sami').get_json()) == ['Kivikko', 'Testirata']
+    assert sorted(client.get('/courses_for_all_players/').get_json()) == ['Kivikko', 'Testirata']
+    assert response_cache.hits == hits
@@ -0,0 +1,76 @@
+from models import db, Player, Course, Layout, Round, Scorecard, HoleScore
+from response_cache import response_cache
+from score_map import score_map
+
+
+def as_json(app, data):
+    # The mapped records go through the same JSON encoding as the routes
+    return app.json.loads(app.json.dumps(data))
+
+
+def test_mapped_responses_match_the_database(loaded_app, tmp_path, monkeypatch):
+    monkeypatch.setattr(score_map, 'directory', str(tmp_path))
+    score_map.rebuild()
+    mapped = score_map.get()
+    assert mapped is not None
+
+    # The routes query the database when the map is disabled
+    monkeypatch.setattr(score_map, 'directory', None)
+    client = loaded_app.test_client()
+
+    # Abandoned cards have holes played in 0 strokes
+    abandoned = db.session.query(HoleScore.scorecard_id).filter(HoleScore.strokes == 0).first()[0]
+    played = db.session.query(HoleScore).filter_by(scorecard_id=abandoned).count()
+    assert len(mapped.hole_scores(abandoned)) == played
+    assert 0 in [hole['strokes'] for hole in mapped.hole_scores(abandoned)]
+    for (scorecard_id,) in db.session.query(Scorecard.id):
+        expected = client.get(f'/hole_scores/{scorecard_id}').get_json()
+        assert as_json(loaded_app, mapped.hole_scores(scorecard_id)) == expected, scorecard_id
+
+    pairs = (
+        db.session.query(Player.name, Course.name, Layout.name)
+        .join(Scorecard, Scorecard.player_id == Player.id)
+        .join(Round, Round.id == Scorecard.round_id)
+        .join(Layout, Layout.id == Round.layout_id)
+        .join(Course, Course.id == Round.course_id)
+        .distinct()
+    )
+    for names in pairs:
+        if any('/' in name for name in names):
+            # Not routable, e.g. 'Tali Talvileiska / Winter Layout'
+            continue
+        expected = client.get('/scorecard_data/{}/{}/{}/all'.format(*names)).get_json()
+        # The database leaves ties in score difference in any order
+        expected.sort(key=lambda scorecard: (scorecard['score_difference'], scorecard['id']))
+        assert as_json(loaded_app, mapped.scorecard_data(*names)) == expected, names
+
+
+def test_mapped_hole_scores_skip_the_response_cache(loaded_app, tmp_path, monkeypatch):
+    monkeypatch.setattr(score_map, 'directory', str(tmp_path))
+    score_map.rebuild()
+    scorecard_id = db.session.query(Scorecard.id).first()[0]
+    expected = as_json(loaded_app, score_map.get().hole_scores(scorecard_id))
+
+    def no_database():
+        raise AssertionError('the response cache was used')
+
+    monkeypatch.setattr(response_cache, 'sync', no_database)
+    client = loaded_app.test_client()
+    assert client.get(f'/hole_scores/{scorecard_id}').get_json() == expected
+    assert len(response_cache.entries) == 0
+
+    # A scorecard missing from the map still goes to the database
+    monkeypatch.setattr(response_cache, 'sync', lambda: None)
+    missing = db.session.query(Scorecard.id).order_by(Scorecard.id.desc()).first()[0] + 1
+    assert client.get(f'/hole_scores/{missing}').status_code == 404
+
+
+def test_maps_of_the_old_format_are_not_read(loaded_app, tmp_path, monkeypatch):
+    monkeypatch.setattr(score_map, 'directory', str(tmp_path))
+    monkeypatch.setattr(score_map, 'generation', None)
+    score_map.rebuild()
+    generation = (tmp_path / 'current').read_text()
+    names = tmp_path / generation / 'names.json'
+    names.write_text(names.read_text().replace('"format": 2, ', ''))
+
+    assert score_map.get() is None
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from conftest import EXPORT
+from models import db, Player, Course, Layout, Scorecard, HoleScore
+from score_store import ScoreStore
+
+
+def pairs():
+    # Player, course and layout names of every scorecard
+    return (
+        db.session.query(Player.name, Course.name, Layout.name)
+        .join(Scorecard, Scorecard.player_id == Player.id)
+        .join(Layout, Layout.id == Scorecard.layout_id)
+        .join(Course, Course.id == Layout.course_id)
+    )
+
+
+def abandoned_pair():
+    # A player and layout with a card that has holes scored 0
+    return (
+        pairs().join(HoleScore, HoleScore.scorecard_id == Scorecard.id)
+        .filter(HoleScore.strokes == 0).order_by(Scorecard.id).first()
+    )
+
+
+def complete_strokes(player_name, course_name, layout_name):
+    # Strokes of the pair's cards without a hole scored 0, as a scorecard x hole matrix
+    cards = {}
+    rows = (
+        db.session.query(HoleScore.scorecard_id, HoleScore.strokes)
+        .join(Scorecard, Scorecard.id == HoleScore.scorecard_id)
+        .join(Player, Player.id == Scorecard.player_id)
+        .join(Layout, Layout.id == Scorecard.layout_id)
+        .join(Course, Course.id == Layout.course_id)
+        .filter(Player.name == player_name, Course.name == course_name, Layout.name == layout_name)
+        .order_by(HoleScore.scorecard_id, HoleScore.hole_number)
+    )
+    for scorecard_id, strokes in rows:
+        cards.setdefault(scorecard_id, []).append(strokes)
+    return np.array([strokes for strokes in cards.values() if min(strokes) > 0])
+
+
+def test_hole_scores_match_the_database(loaded_app):
+    store = ScoreStore.from_database()
+    assert (store.strokes == 0).any()
+    for names in pairs().distinct():
+        for scorecard in store.best_rounds(*names):
+            strokes = (
+                db.session.query(HoleScore.strokes).filter_by(scorecard_id=scorecard['id'])
+                .order_by(HoleScore.hole_number)
+            )
+            assert scorecard['hole_scores'] == [value for (value,) in strokes], scorecard['id']
+
+
+@pytest.mark.parametrize('source', ['database', 'csv'])
+def test_analytics_leave_out_abandoned_cards(loaded_app, source):
+    store = ScoreStore.from_database() if source == 'database' else ScoreStore.from_csv(EXPORT)
+    names = abandoned_pair()
+    strokes = complete_strokes(*names)
+
+    assert store.hole_averages(*names) == pytest.approx(strokes.mean(axis=0).tolist())
+    distribution = store.score_distribution(names[1], names[2], names[0])
+    assert [sum(counts) for counts in distribution['holes']] == [len(strokes)] * strokes.shape[1]
+    assert len(store.trend(*names)['score_differences']) == len(strokes)
@@ -0,0 +1,47 @@
+from urllib.parse import quote
+from sqlalchemy import func
+from models import db, Player, Course, Layout, Scorecard, HoleScore
+
+
+def busiest_pair():
+    # Player, course and layout names of the pair with the most scorecards
+    return (
+        db.session.query(Player.name, Course.name, Layout.name)
+        .select_from(Scorecard)
+        .join(Player, Player.id == Scorecard.player_id)
+        .join(Layout, Layout.id == Scorecard.layout_id)
+        .join(Course, Course.id == Layout.course_id)
+        .filter(Player.name != 'Par')
+        .group_by(Player.name, Course.name, Layout.name)
+        .order_by(func.count(Scorecard.id).desc())
+        .first()
+    )
+
+
+def test_query_count_does_not_grow_with_scorecards(loaded_app, count_queries):
+    client = loaded_app.test_client()
+    path = '/scorecard_data/' + '/'.join(quote(name) for name in busiest_pair())
+
+    with count_queries() as one_card:
+        response = client.get(path + '/1')
+    assert len(response.get_json()) == 1
+
+    with count_queries() as all_cards:
+        response = client.get(path + '/all')
+    scorecards = response.get_json()
+    assert len(scorecards) > 10
+
+    assert len(all_cards) == len(one_card)
+
+
+def test_hole_scores_match_the_hole_score_rows(loaded_app):
+    client = loaded_app.test_client()
+    path = '/scorecard_data/' + '/'.join(quote(name) for name in busiest_pair()) + '/all'
+
+    for scorecard in client.get(path).get_json():
+        strokes = (
+            db.session.query(HoleScore.strokes)
+            .filter_by(scorecard_id=scorecard['id'])
+            .order_by(HoleScore.hole_number)
+        )
+        assert scorecard['hole_scores'] == [row.strokes for row in strokes]
@@ -0,0 +1,85 @@
+import json
+from datetime import datetime, timedelta
+import pytest
+from conftest import write_export
+from data_loader import load_data
+from models import db, Player, Layout, Scorecard
+
+PARS = [3] * 9
+START = datetime(2023, 5, 1, 18, 0)
+ROUNDS = 23
+PAGE_SIZE = 5
+
+
+@pytest.fixture
+def history(app, tmp_path):
+    # Sami's rounds with only three different scores, and seven of them moved to the same time, so
+    # a page ends in the middle of the tie
+    cards = [('Sami', START + timedelta(days=day), [3 + day % 3] + [3] * 8) for day in range(ROUNDS)]
+    load_data(write_export(tmp_path / 'rounds.csv', PARS, cards), bulk=True)
+    sami = Scorecard.query.join(Player, Player.id == Scorecard.player_id).filter(Player.name == 'Sami')
+    for scorecard in sami.order_by(Scorecard.id).limit(7):
+        scorecard.date = START + timedelta(days=30)
+    db.session.commit()
+    return sami.all()
+
+
+def base_url():
+    player_id = Player.query.filter_by(name='Sami').one().id
+    return f'/scorecards/{player_id}/{Layout.query.one().id}'
+
+
+def follow_pages(client, url):
+    ids = []
+    pages = 0
+    cursor = None
+    # A cursor that does not move on would loop forever
+    while pages <= ROUNDS:
+        page = client.get(url + (f'&after={cursor}' if cursor else '')).get_json()
+        ids += [scorecard['id'] for scorecard in page['scorecards']]
+        pages += 1
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids, pages
+    raise AssertionError(f'more than {ROUNDS} pages')
+
+
+@pytest.mark.parametrize('order', ['score', 'date'])
+def test_pages_cover_every_scorecard_once(app, history, order):
+    if order == 'score':
+        expected = sorted(history, key=lambda scorecard: (scorecard.score_difference, scorecard.id))
+    else:
+        expected = sorted(history, key=lambda scorecard: (scorecard.date, scorecard.id), reverse=True)
+
+    ids, pages = follow_pages(app.test_client(), f'{base_url()}?order={order}&size={PAGE_SIZE}')
+    assert ids == [scorecard.id for scorecard in expected]
+    assert pages == -(-ROUNDS // PAGE_SIZE)
+
+
+def test_pages_by_name_and_by_id_match(app, history):
+    client = app.test_client()
+    by_id = client.get(f'{base_url()}?order=date&size={PAGE_SIZE}').get_json()
+    by_name = client.get(f'/scorecards/Sami/Testirata/Main?order=date&size={PAGE_SIZE}').get_json()
+    assert by_name == by_id
+    assert all(len(scorecard['hole_scores']) == len(PARS) for scorecard in by_id['scorecards'])
+
+
+@pytest.mark.parametrize('order', ['score', 'date'])
+def test_stream_continues_after_the_cursor(app, history, order):
+    client = app.test_client()
+    url = f'{base_url()}?order={order}'
+    everything, _ = follow_pages(client, f'{url}&size={PAGE_SIZE}')
+    first_page = client.get(f'{url}&size={PAGE_SIZE}').get_json()
+
+    response = client.get(f"{url}&format=ndjson&after={first_page['next_cursor']}")
+    assert response.mimetype == 'application/x-ndjson'
+    streamed = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [scorecard['id'] for scorecard in streamed] == everything[PAGE_SIZE:]
+    assert all(len(scorecard['hole_scores']) == len(PARS) for scorecard in streamed)
+
+
+@pytest.mark.parametrize('query', [
+    'after=garbage', 'after=x:1', 'order=date&after=yesterday:1', 'after=1:x', 'order=name', 'size=0',
+])
+def test_invalid_requests(app, history, query):
+    assert app.test_client().get(f'{base_url()}?{query}').status_code == 400
@@ -0,0 +1,75 @@
+from datetime import datetime
+import pytest
+from conftest import write_export
+from data_loader import load_data
+import search_index as search_module
+from search_index import normalize, search_index
+
+PARS = [3] * 9
+START = datetime(2023, 5, 1, 18, 0)
+
+
+def load_course(tmp_path, course, players, layout='Main'):
+    filename = tmp_path / f'{course}.csv'
+    load_data(write_export(filename, PARS, [(player, START, PARS) for player in players], course, layout), bulk=True)
+
+
+def names(results):
+    return [result['name'] for result in results]
+
+
+def test_normalize():
+    assert normalize('  Äijä   ÖKKÖNEN ') == 'aija okkonen'
+    assert normalize('Oittaan Ulkoilualue\t- Camping') == 'oittaan ulkoilualue - camping'
+
+
+def test_prefix_and_word_start_matching(app, tmp_path):
+    load_course(tmp_path, 'Oittaan Ulkoilualue - Camping', ['Äijä Ökkönen', 'Sami'])
+    load_course(tmp_path, 'Kivikko', ['Samuli'], layout='Camp Loop')
+
+    assert names(search_index.search('OITT')) == ['Oittaan Ulkoilualue - Camping']
+    assert names(search_index.search('aija')) == ['Äijä Ökkönen']
+    assert names(search_index.search('okk')) == ['Äijä Ökkönen']
+    # A word in the middle of a name matches too, but names starting with the query come first
+    assert names(search_index.search('camp')) == ['Camp Loop', 'Oittaan Ulkoilualue - Camping']
+    # Shorter names rank first among the names starting with the query
+    assert names(search_index.search('sam')) == ['Sami', 'Samuli']
+    # Only the start of a word matches, and the 'Par' rows are not players
+    assert search_index.search('amping') == []
+    assert search_index.search('par') == []
+    assert search_index.search('   ') == []
+
+
+def test_kinds_and_limit(app, tmp_path):
+    load_course(tmp_path, 'Sammalmäki', ['Sami', 'Samuli'], layout='Samba')
+    client = app.test_client()
+
+    assert names(client.get('/search?q=sam').get_json()) == ['Sami', 'Samba', 'Samuli', 'Sammalmäki']
+    assert names(client.get('/search?q=sam&type=player').get_json()) == ['Sami', 'Samuli']
+    assert names(client.get('/search?q=sam&type=course&type=layout').get_json()) == ['Samba', 'Sammalmäki']
+    assert names(client.get('/search?q=sam&limit=1').get_json()) == ['Sami']
+    layout = client.get('/search?q=samba').get_json()[0]
+    assert layout['type'] == 'layout' and layout['course'] == 'Sammalmäki'
+
+
+def test_kinds_are_filtered_before_the_scan_limit(app, tmp_path, monkeypatch):
+    # The player names sort before the course, and fill the scan limit on their own
+    load_course(tmp_path, 'Sammalmäki', [f'Sam {number:02}' for number in range(10)])
+    monkeypatch.setattr(search_module, 'SEARCH_SCAN_LIMIT', 5)
+
+    assert names(search_index.search('sam', kinds=['course'])) == ['Sammalmäki']
+    assert len(search_index.search('sam', kinds=['player'])) == 5
+    assert len(search_index.search('sam')) == 5
+
+
+@pytest.mark.parametrize('query', ['q=sam&limit=0', 'q=sam&type=round'])
+def test_invalid_search(app, query):
+    assert app.test_client().get(f'/search?{query}').status_code == 400
+
+
+def test_imports_add_new_names(app, tmp_path):
+    load_course(tmp_path, 'Kivikko', ['Sami'])
+    assert names(search_index.search('s')) == ['Sami']
+
+    load_course(tmp_path, 'Siilinjärvi', ['Sami', 'Sointu'])
+    assert names(search_index.search('s')) == ['Sami', 'Sointu', 'Siilinjärvi']
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import snapshot
+from sqlalchemy import text
+from models import db, HoleScore, PlayerLayoutStats, get_import_state
+from snapshot import export_snapshot, import_snapshot, RESTORED_MODELS, SNAPSHOT_TABLES
+
+
+def table_contents():
+    # Only the ids of the snapshot tables are kept, the other tables are compared without theirs
+    kept_ids = {model.__tablename__ for model, columns in SNAPSHOT_TABLES if 'id' in columns}
+    contents = {}
+    for model in RESTORED_MODELS:
+        table = model.__tablename__
+        df = pd.read_sql(text(f'SELECT * FROM {table}'), db.session.connection())
+        if table not in kept_ids:
+            df = df.drop(columns=['id'], errors='ignore')
+        contents[table] = df.sort_values(list(df.columns)).reset_index(drop=True)
+    return contents
+
+
+def test_round_trip_restores_every_row(loaded_app, tmp_path):
+    exported = table_contents()
+    # Abandoned cards have holes scored 0, which a restore must keep
+    assert (exported['hole_score']['strokes'] == 0).any()
+
+    filename = tmp_path / 'statistics.npz'
+    export_snapshot(filename)
+    import_snapshot(filename)
+
+    restored = table_contents()
+    assert {table: len(df) for table, df in restored.items()} == {table: len(df) for table, df in exported.items()}
+    for table, df in exported.items():
+        if table == 'import_progress':
+            # Import progress is not part of a snapshot
+            continue
+        pd.testing.assert_frame_equal(restored[table], df, check_dtype=False, obj=table)
+
+
+def test_format_1_snapshot_still_loads(loaded_app, tmp_path):
+    filename = tmp_path / 'statistics.npz'
+    export_snapshot(filename)
+    with np.load(filename) as snapshot:
+        arrays = dict(snapshot)
+    arrays['format'] = np.array(1)
+    arrays['hole_score.strokes'] = np.maximum(arrays['hole_score.strokes'], 0)
+    np.savez_compressed(filename, **arrays)
+
+    played = HoleScore.query.filter(HoleScore.strokes > 0).count()
+    import_snapshot(filename)
+    assert HoleScore.query.count() == played
+
+
+def test_restore_is_recorded_after_the_refreshes(loaded_app, tmp_path, monkeypatch):
+    filename = tmp_path / 'statistics.npz'
+    export_snapshot(filename)
+    generation = get_import_state()[1]
+
+    def fail(since=None):
+        raise RuntimeError('refresh failed')
+
+    monkeypatch.setattr(snapshot, 'refresh_trends', fail)
+    import_snapshot(filename)
+    assert get_import_state()[1] == generation
+
+    monkeypatch.undo()
+    recorded = []
+    refresh_statistics = snapshot.refresh_statistics
+
+    def refresh_and_check(since=None):
+        refresh_statistics(since)
+        recorded.append(get_import_state()[1])
+
+    monkeypatch.setattr(snapshot, 'refresh_statistics', refresh_and_check)
+    import_snapshot(filename)
+    assert recorded == [generation]
+    assert get_import_state()[1] == generation + 1
+    assert get_import_state()[2] is None
+    assert PlayerLayoutStats.query.count() > 0
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+from conftest import write_export
+from data_loader import load_data
+from models import db, Player, Scorecard, HoleScore, PlayerLayoutStats, PlayerLayoutHoleStats
+
+PARS = [3] * 9
+START = datetime(2023, 5, 1, 18, 0)
+
+
+def summary(player_name):
+    player = Player.query.filter_by(name=player_name).one()
+    return PlayerLayoutStats.query.filter_by(player_id=player.id).one()
+
+
+def hole_summaries(player_name):
+    player = Player.query.filter_by(name=player_name).one()
+    return PlayerLayoutHoleStats.query.filter_by(player_id=player.id).order_by(PlayerLayoutHoleStats.hole_number).all()
+
+
+def test_abandoned_cards_are_not_best_scores(loader_app, tmp_path):
+    played = [('Sami', START, [4] + [3] * 8), ('Sami', START + timedelta(days=1), [2] + [3] * 8)]
+    # Abandoned after the first hole: the other holes have 0 strokes
+    abandoned = [('Sami', START + timedelta(days=2), [3] + [0] * 8), ('Sointu', START, [3] + [0] * 8)]
+    load_data(write_export(tmp_path / 'rounds.csv', PARS, played + abandoned), bulk=True)
+
+    stats = summary('Sami')
+    assert (stats.rounds_played, stats.best_total_score, stats.best_score_difference) == (2, 26, -1)
+    assert stats.average_total_score == 27
+    assert stats.last_played == START + timedelta(days=2)
+
+    holes = hole_summaries('Sami')
+    assert [hole.rounds_played for hole in holes] == [2] * 9
+    assert min(hole.best_strokes for hole in holes) == 2
+    assert sum(hole.eagles for hole in holes) == 0
+    assert holes[1].average_strokes == 3
+
+    # A player with only abandoned cards keeps a row, which lists them on the layout, without bests
+    # or averages
+    stats = summary('Sointu')
+    assert (stats.rounds_played, stats.best_total_score, stats.average_score_difference) == (0, None, None)
+    assert hole_summaries('Sointu') == []
+
+
+def test_export_summaries_skip_zero_stroke_holes(loaded_app):
+    zero_strokes = db.session.query(HoleScore.scorecard_id).filter(HoleScore.strokes <= 0)
+    abandoned = db.session.query(Scorecard.player_id, Scorecard.layout_id).filter(Scorecard.id.in_(zero_strokes))
+    assert abandoned.count() > 0
+    for player_id, layout_id in abandoned:
+        stats = db.session.get(PlayerLayoutStats, (player_id, layout_id))
+        assert stats.best_total_score is None or stats.best_total_score > 20
+    assert PlayerLayoutHoleStats.query.filter(PlayerLayoutHoleStats.best_strokes <= 0).count() == 0
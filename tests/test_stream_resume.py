@@ -0,0 +1,45 @@
+import pandas as pd
+import data_loader
+from conftest import EXPORT, empty_database, imported_rows
+from data_loader import load_data, stream_load_data
+from import_telemetry import telemetry
+from models import ImportProgress, PlayerLayoutStats, get_import_state
+
+CHUNK_SIZE = 100
+FAILING_CHUNK = 4
+
+
+def statistics():
+    return sorted(
+        tuple(getattr(stats, column.key) for column in PlayerLayoutStats.__table__.columns)
+        for stats in PlayerLayoutStats.query
+    )
+
+
+def test_resumed_import_matches_a_one_shot_load(app, monkeypatch):
+    upsert_scorecards = data_loader.upsert_scorecards
+    calls = []
+
+    def fail_mid_file(chunk, layout_holes):
+        calls.append(len(chunk))
+        if len(calls) == FAILING_CHUNK:
+            raise RuntimeError('disk full')
+        upsert_scorecards(chunk, layout_holes)
+
+    monkeypatch.setattr(data_loader, 'upsert_scorecards', fail_mid_file)
+    stream_load_data(EXPORT, chunk_size=CHUNK_SIZE)
+    assert telemetry.last_report['status'] == 'failed'
+    # The chunks before the failing one are committed with their checkpoint, the import is not recorded
+    assert ImportProgress.query.one().rows_committed == (FAILING_CHUNK - 1) * CHUNK_SIZE
+    assert get_import_state()[1] == 0
+
+    monkeypatch.undo()
+    stream_load_data(EXPORT, chunk_size=CHUNK_SIZE)
+    assert telemetry.last_report['status'] == 'ok'
+    assert telemetry.last_report['rows']['read'] == len(pd.read_csv(EXPORT)) - (FAILING_CHUNK - 1) * CHUNK_SIZE
+    assert ImportProgress.query.count() == 0
+    resumed = imported_rows(), statistics()
+
+    with empty_database(app):
+        load_data(EXPORT, bulk=True)
+        assert (imported_rows(), statistics()) == resumed
@@ -0,0 +1,108 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+import pandas as pd
+import pytest
+from conftest import write_export
+from data_loader import load_data
+from models import db, Player, Layout, Scorecard, PlayerLayoutMonth, ScorecardTrend
+from trends import refresh_trends, seasonal_summary, TREND_WINDOW
+
+PARS = [3] * 9
+
+
+def cards(count, start=datetime(2022, 11, 20, 17, 0)):
+    # One card every four days, from par to four over
+    return [
+        ('Sami', start + timedelta(days=4 * day), [3 + (day * 3) % 5] + [3] * 8)
+        for day in range(count)
+    ]
+
+
+def trend_rows():
+    return pd.read_sql(
+        db.session.query(ScorecardTrend).order_by(ScorecardTrend.date).statement, db.session.connection()
+    )
+
+
+def test_rolling_windows(app, tmp_path):
+    load_data(write_export(tmp_path / 'rounds.csv', PARS, cards(3 * TREND_WINDOW)), bulk=True)
+    trends = trend_rows()
+
+    rolling = trends['score_difference'].rolling(TREND_WINDOW, min_periods=1)
+    assert len(trends) == 3 * TREND_WINDOW
+    assert trends['moving_average'].tolist() == pytest.approx(rolling.mean().tolist())
+    assert trends['best_in_window'].tolist() == rolling.min().astype(int).tolist()
+
+
+def test_months_and_seasons(app, tmp_path):
+    load_data(write_export(tmp_path / 'rounds.csv', PARS, cards(3 * TREND_WINDOW)), bulk=True)
+    trends = trend_rows()
+    months = PlayerLayoutMonth.query.order_by(PlayerLayoutMonth.month).all()
+
+    by_month = trends.groupby(trends['date'].dt.strftime('%Y-%m'))['score_difference']
+    assert [month.month for month in months] == list(by_month.groups)
+    assert [month.rounds_played for month in months] == by_month.size().tolist()
+    assert [month.total_score_difference for month in months] == by_month.sum().tolist()
+    assert [month.best_score_difference for month in months] == by_month.min().tolist()
+
+    # The rounds of November 2022 are in the autumn, December 2022 to February 2023 are the winter of 2023
+    seasons = seasonal_summary(months)
+    assert [(season['year'], season['season']) for season in seasons] == [
+        (2022, 'autumn'), (2023, 'winter'), (2023, 'spring'),
+    ]
+    assert sum(season['rounds_played'] for season in seasons) == len(trends)
+
+
+def test_december_belongs_to_the_next_winter():
+    Month = namedtuple('Month', 'month rounds_played total_score_difference best_score_difference')
+    seasons = seasonal_summary([
+        Month('2022-12', 2, 4, 1), Month('2023-01', 1, -1, -1), Month('2023-02', 1, 3, 3), Month('2023-03', 1, 0, 0),
+    ])
+    assert seasons == [
+        {'year': 2023, 'season': 'winter', 'rounds_played': 4, 'average_score_difference': 1.5,
+         'best_score_difference': -1},
+        {'year': 2023, 'season': 'spring', 'rounds_played': 1, 'average_score_difference': 0.0,
+         'best_score_difference': 0},
+    ]
+
+
+def test_incremental_refresh_matches_a_rebuild(app, tmp_path):
+    rounds = cards(2 * TREND_WINDOW + 3)
+    load_data(write_export(tmp_path / 'first.csv', PARS, rounds[:TREND_WINDOW + 2]), bulk=True)
+    load_data(write_export(tmp_path / 'second.csv', PARS, rounds[TREND_WINDOW + 2:]), bulk=True)
+    incremental = trend_rows()
+    months = [(month.month, month.rounds_played, month.total_score_difference) for month in PlayerLayoutMonth.query]
+
+    refresh_trends()
+    pd.testing.assert_frame_equal(trend_rows(), incremental)
+    assert sorted(months) == sorted(
+        (month.month, month.rounds_played, month.total_score_difference) for month in PlayerLayoutMonth.query
+    )
+
+
+def test_abandoned_cards_are_left_out(app, tmp_path):
+    rounds = cards(TREND_WINDOW)
+    # Abandoned after the first hole, in the month of the last round
+    abandoned = ('Sami', rounds[-1][1] + timedelta(hours=1), [3] + [0] * 8)
+    load_data(write_export(tmp_path / 'rounds.csv', PARS, rounds + [abandoned]), bulk=True)
+    trends = trend_rows()
+
+    sami = Scorecard.query.join(Player, Player.id == Scorecard.player_id).filter(Player.name == 'Sami')
+    assert sami.count() == len(rounds) + 1
+    assert len(trends) == len(rounds)
+    assert trends['best_in_window'].min() >= 0
+    assert sum(month.rounds_played for month in PlayerLayoutMonth.query) == len(rounds)
+    assert min(month.best_score_difference for month in PlayerLayoutMonth.query) >= 0
+
+
+def test_rolling_endpoint_returns_the_newest_points_oldest_first(app, tmp_path):
+    load_data(write_export(tmp_path / 'rounds.csv', PARS, cards(2 * TREND_WINDOW)), bulk=True)
+    player_id = Player.query.filter_by(name='Sami').one().id
+    layout_id = Layout.query.one().id
+
+    response = app.test_client().get(f'/trends/{player_id}/{layout_id}/rolling?points=5')
+    points = response.get_json()['points']
+    newest = trend_rows().tail(5)
+    assert [point['scorecard_id'] for point in points] == newest['scorecard_id'].tolist()
+    assert [point['moving_average'] for point in points] == pytest.approx(newest['moving_average'].tolist())
+    assert app.test_client().get(f'/trends/{player_id}/{layout_id}/rolling?points=0').status_code == 400
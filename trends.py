@@ -0,0 +1,142 @@
+import time
+from sqlalchemy import delete, func, insert, select, tuple_
+from models import db, Player, Scorecard, PlayerLayoutMonth, ScorecardTrend
+from stats import complete_card, touched_pairs
+
+
+# Rounds in the rolling windows of ScorecardTrend.
+# After changing this, rebuild the trends with `flask --app dgs refresh-stats`.
+TREND_WINDOW = 10
+
+# Season of each month; December belongs to the winter of the following year
+SEASONS = {
+    12: 'winter', 1: 'winter', 2: 'winter',
+    3: 'spring', 4: 'spring', 5: 'spring',
+    6: 'summer', 7: 'summer', 8: 'summer',
+    9: 'autumn', 10: 'autumn', 11: 'autumn',
+}
+
+
+def month_of(column):
+    # 'YYYY-MM' of a timestamp; SQLite and PostgreSQL format dates differently
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.strftime('%Y-%m', column)
+
+
+# Both summaries skip abandoned cards, whose 0-stroke holes would look like very good rounds
+def monthly_summary(pairs, since):
+    month = month_of(Scorecard.date)
+    query = (
+        select(
+            Scorecard.player_id,
+            Scorecard.layout_id,
+            month,
+            func.count(Scorecard.id),
+            func.sum(Scorecard.score_difference),
+            func.min(Scorecard.score_difference),
+        )
+        .join(Player, Player.id == Scorecard.player_id)
+        .where(Player.name != 'Par', tuple_(Scorecard.player_id, Scorecard.layout_id).in_(pairs), complete_card())
+        .group_by(Scorecard.player_id, Scorecard.layout_id, month)
+    )
+    if since is not None:
+        query = query.where(Scorecard.date >= since.replace(day=1, hour=0, minute=0, second=0, microsecond=0))
+    return query
+
+
+def rolling_summary(pairs, since):
+    # The windows look back over the whole history of a pair, but only rows from `since` are returned
+    window = {
+        'partition_by': (Scorecard.player_id, Scorecard.layout_id),
+        'order_by': (Scorecard.date, Scorecard.id),
+        'rows': (-(TREND_WINDOW - 1), 0),
+    }
+    rounds = (
+        select(
+            Scorecard.id,
+            Scorecard.player_id,
+            Scorecard.layout_id,
+            Scorecard.date,
+            Scorecard.score_difference,
+            func.avg(Scorecard.score_difference).over(**window).label('moving_average'),
+            func.min(Scorecard.score_difference).over(**window).label('best_in_window'),
+        )
+        .join(Player, Player.id == Scorecard.player_id)
+        .where(Player.name != 'Par', tuple_(Scorecard.player_id, Scorecard.layout_id).in_(pairs), complete_card())
+        .subquery()
+    )
+    query = select(*rounds.c)
+    if since is not None:
+        query = query.where(rounds.c.date >= since)
+    return query
+
+
+def refresh_trends(since=None):
+    # Recompute the months and rolling windows from `since` onwards for the player/layout pairs
+    # with scorecards dated at or after it. Without a timestamp everything is rebuilt.
+    # A failure is raised again, so the import is not recorded either.
+    start_time = time.perf_counter()
+    pairs = touched_pairs(since)
+    try:
+        stale_months = delete(PlayerLayoutMonth)
+        stale_rounds = delete(ScorecardTrend)
+        if since is not None:
+            stale_months = stale_months.where(
+                tuple_(PlayerLayoutMonth.player_id, PlayerLayoutMonth.layout_id).in_(pairs),
+                PlayerLayoutMonth.month >= since.strftime('%Y-%m'),
+            )
+            stale_rounds = stale_rounds.where(
+                tuple_(ScorecardTrend.player_id, ScorecardTrend.layout_id).in_(pairs),
+                ScorecardTrend.date >= since,
+            )
+        db.session.execute(stale_months, execution_options={'synchronize_session': False})
+        db.session.execute(stale_rounds, execution_options={'synchronize_session': False})
+
+        db.session.execute(
+            insert(PlayerLayoutMonth).from_select(
+                ['player_id', 'layout_id', 'month', 'rounds_played', 'total_score_difference',
+                 'best_score_difference'],
+                monthly_summary(pairs, since),
+            )
+        )
+        db.session.execute(
+            insert(ScorecardTrend).from_select(
+                ['scorecard_id', 'player_id', 'layout_id', 'date', 'score_difference', 'moving_average',
+                 'best_in_window'],
+                rolling_summary(pairs, since),
+            )
+        )
+        db.session.commit()
+        print(f"Trends refreshed in {time.perf_counter() - start_time:.2f}s")
+    except Exception as e:
+        print("Error refreshing trends:", str(e))
+        db.session.rollback()
+        raise
+
+
+def seasonal_summary(months):
+    # Seasons from PlayerLayoutMonth rows in month order
+    seasons = []
+    for month in months:
+        year, month_number = int(month.month[:4]), int(month.month[5:])
+        name = SEASONS[month_number]
+        if month_number == 12:
+            year += 1
+        if not seasons or (seasons[-1]['year'], seasons[-1]['season']) != (year, name):
+            seasons.append({'year': year, 'season': name, 'rounds_played': 0, 'total': 0, 'best': None})
+        season = seasons[-1]
+        season['rounds_played'] += month.rounds_played
+        season['total'] += month.total_score_difference
+        if season['best'] is None or month.best_score_difference < season['best']:
+            season['best'] = month.best_score_difference
+    return [
+        {
+            'year': season['year'],
+            'season': season['season'],
+            'rounds_played': season['rounds_played'],
+            'average_score_difference': season['total'] / season['rounds_played'],
+            'best_score_difference': season['best'],
+        }
+        for season in seasons
+    ]